@@ -0,0 +1,24 @@
+"""
+Benchmarks for the bot's hot paths, these run without discord,
+lavalink or the database being reachable
+"""
+
+import os
+
+# `bot.env` parses these when the bot package is imported
+BENCHMARK_ENV = {
+    "BOT_PREFIX": "!",
+    "BOT_TOKEN": "benchmark",
+    "BOT_WEBHOOK_URL": "https://discord.com/api/webhooks/0/benchmark",
+    "POSTGRES_DB": "benchmark",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PASSWORD": "benchmark",
+    "POSTGRES_USER": "benchmark",
+    "LAVALINK_HOST": "localhost",
+    "LAVALINK_PORT": "2333",
+    "LAVALINK_REST_URL": "http://localhost:2333",
+    "LAVALINK_PASSWORD": "benchmark",
+}
+
+for key, value in BENCHMARK_ENV.items():
+    os.environ.setdefault(key, value)
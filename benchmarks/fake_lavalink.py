@@ -0,0 +1,451 @@
+"""
+A stand-in for a Lavalink v3 node, speaking enough of its websocket
+and REST protocol for `wavelink` to drive players against it
+
+Tracks are made up from the query, their ids being the base64 encoded
+info so `decodetrack` works without any storage. Playback runs faster
+than real time by `time_scale` and ends with the `TrackEndEvent` and
+`stats` updates a real node would send
+
+Run with `python -m benchmarks.fake_lavalink [--port N] [--time-scale N]`
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import contextlib
+import hashlib
+import json
+import os
+import random
+import resource
+import time
+from collections import Counter
+from typing import Optional
+
+from aiohttp import WSMsgType, web
+
+SEARCH_RESULTS = 5
+PLAYLIST_SIZE = (10, 50)
+TRACK_LENGTH = (120_000, 360_000)
+
+
+def encode_track(info: dict) -> str:
+    return base64.b64encode(json.dumps(info).encode()).decode()
+
+
+def decode_track(track_id: str) -> dict:
+    return json.loads(base64.b64decode(track_id))
+
+
+def make_track(query: str, index: int) -> dict:
+    """Makes up the track, the same query always giving the same tracks"""
+    rng = random.Random(f"{query}#{index}")
+    identifier = hashlib.sha1(f"{query}#{index}".encode()).hexdigest()[:11]
+    info = {
+        "identifier": identifier,
+        "isSeekable": True,
+        "author": f"Artist {rng.randrange(1000)}",
+        "length": rng.randrange(*TRACK_LENGTH),
+        "isStream": False,
+        "position": 0,
+        "title": f"Track {identifier}",
+        "uri": f"https://www.youtube.com/watch?v={identifier}",
+        "sourceName": "youtube",
+    }
+    return {"track": encode_track(info), "info": info}
+
+
+def load_tracks(query: str, no_match_rate: float) -> dict:
+    """Answers `/loadtracks` the way lavalink does for youtube"""
+    result = {"loadType": "NO_MATCHES", "playlistInfo": {}, "tracks": []}
+    if random.Random(query).random() < no_match_rate:
+        return result
+
+    if query.startswith(("ytsearch:", "scsearch:")):
+        result["loadType"] = "SEARCH_RESULT"
+        result["tracks"] = [make_track(query, i) for i in range(SEARCH_RESULTS)]
+
+    elif "list=" in query or "/playlist" in query:
+        size = random.Random(query).randint(*PLAYLIST_SIZE)
+        result["loadType"] = "PLAYLIST_LOADED"
+        result["playlistInfo"] = {"name": f"Playlist {query[-8:]}", "selectedTrack": -1}
+        result["tracks"] = [make_track(query, i) for i in range(size)]
+
+    elif query.startswith(("http://", "https://")):
+        result["loadType"] = "TRACK_LOADED"
+        result["tracks"] = [make_track(query, 0)]
+
+    return result
+
+
+class FakePlayer:
+    """The playback state of one guild"""
+
+    def __init__(self, node: "FakeLavalink", socket: "Connection", guild_id: str):
+        self.node = node
+        self.socket = socket
+        self.guild_id = guild_id
+        self.track: Optional[str] = None
+        self.length = 0
+        self.end_time = 0
+        self.paused = False
+        self.volume = 100
+        self.bands: dict = {}
+        self.voice: Optional[dict] = None
+        # Position in the track when the clock was last started
+        self._position = 0
+        self._started = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def position(self) -> int:
+        if self.track is None:
+            return 0
+        if self.paused:
+            return self._position
+        elapsed = (time.monotonic() - self._started) * 1000 * self.node.time_scale
+        return min(int(self._position + elapsed), self.end_time)
+
+    def _schedule_end(self) -> None:
+        self._cancel_end()
+        if self.track is None or self.paused:
+            return
+        remaining = (self.end_time - self._position) / 1000 / self.node.time_scale
+        self._timer = asyncio.get_event_loop().call_later(
+            max(remaining, 0), self._end, "FINISHED"
+        )
+
+    def _cancel_end(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _event(self, event_type: str, **data) -> None:
+        self.node.events[event_type] += 1
+        # `sentAt` isn't sent by lavalink, it lets clients tell how late events are
+        self.socket.send(
+            op="event",
+            type=event_type,
+            guildId=self.guild_id,
+            track=self.track,
+            sentAt=time.time(),
+            **data,
+        )
+
+    def _end(self, reason: str) -> None:
+        self._cancel_end()
+        if self.track is None:
+            return
+
+        self.node.events[f"TrackEndEvent.{reason}"] += 1
+        self._event("TrackEndEvent", reason=reason)
+        self.track = None
+
+    def _fail(self) -> None:
+        self._event(
+            "TrackExceptionEvent",
+            error="Something broke when playing the track.",
+            exception={"message": "Simulated failure", "severity": "COMMON"},
+        )
+        self._end("LOAD_FAILED")
+
+    def play(self, data: dict) -> None:
+        if self.track is not None and data.get("noReplace"):
+            return
+        if self.track is not None:
+            self._end("REPLACED")
+
+        info = decode_track(data["track"])
+        self.track = data["track"]
+        self.length = info["length"]
+        self.end_time = min(int(data.get("endTime") or self.length), self.length)
+        self._position = min(int(data.get("startTime") or 0), self.end_time)
+        self._started = time.monotonic()
+        self.paused = False
+        self._event("TrackStartEvent")
+
+        if random.random() < self.node.failure_rate:
+            self._timer = asyncio.get_event_loop().call_later(0.05, self._fail)
+        else:
+            self._schedule_end()
+
+    def stop(self) -> None:
+        self._end("STOPPED")
+
+    def pause(self, pause: bool) -> None:
+        if pause == self.paused:
+            return
+        self._position = self.position
+        self._started = time.monotonic()
+        self.paused = pause
+        self._schedule_end()
+
+    def seek(self, position: int) -> None:
+        if self.track is None:
+            return
+        self._position = min(max(position, 0), self.end_time)
+        self._started = time.monotonic()
+        self._schedule_end()
+
+    def destroy(self) -> None:
+        self._end("CLEANUP")
+
+    def state(self) -> dict:
+        return {
+            "op": "playerUpdate",
+            "guildId": self.guild_id,
+            "state": {
+                "time": int(time.time() * 1000),
+                "position": self.position,
+                "connected": self.voice is not None,
+            },
+        }
+
+
+class Connection:
+    """A websocket connection of a client, owning its players"""
+
+    def __init__(self, node: "FakeLavalink", ws: web.WebSocketResponse):
+        self.node = node
+        self.ws = ws
+        self.players: dict[str, FakePlayer] = {}
+        self._outbox: asyncio.Queue = asyncio.Queue()
+
+    def send(self, **data) -> None:
+        # Sent in order by a single writer, like lavalink's session
+        self._outbox.put_nowait(data)
+
+    async def _write(self) -> None:
+        while True:
+            data = await self._outbox.get()
+            await self.ws.send_str(json.dumps(data))
+
+    def player(self, guild_id: str) -> FakePlayer:
+        if (player := self.players.get(guild_id)) is None:
+            player = self.players[guild_id] = FakePlayer(self.node, self, guild_id)
+        return player
+
+    def handle(self, data: dict) -> None:
+        op = data.get("op")
+        self.node.ops[op] += 1
+        guild_id = data.get("guildId")
+
+        if op == "voiceUpdate":
+            self.player(guild_id).voice = data.get("event")
+        elif op == "play":
+            self.player(guild_id).play(data)
+        elif op == "stop":
+            self.player(guild_id).stop()
+        elif op == "pause":
+            self.player(guild_id).pause(bool(data.get("pause")))
+        elif op == "seek":
+            self.player(guild_id).seek(int(data.get("position", 0)))
+        elif op == "volume":
+            self.player(guild_id).volume = int(data.get("volume", 100))
+        elif op == "equalizer":
+            player = self.player(guild_id)
+            for band in data.get("bands", []):
+                player.bands[band["band"]] = band["gain"]
+        elif op == "destroy":
+            if (player := self.players.pop(guild_id, None)) is not None:
+                player.destroy()
+
+    async def _updates(self) -> None:
+        while True:
+            await asyncio.sleep(self.node.update_interval)
+            for player in self.players.values():
+                if player.track is not None:
+                    self.send(**player.state())
+
+    async def _stats(self) -> None:
+        while True:
+            self.send(**self.node.stats())
+            await asyncio.sleep(self.node.stats_interval)
+
+    async def run(self) -> None:
+        tasks = [
+            asyncio.create_task(coro)
+            for coro in (self._write(), self._updates(), self._stats())
+        ]
+        try:
+            async for msg in self.ws:
+                if msg.type == WSMsgType.TEXT:
+                    self.handle(json.loads(msg.data))
+        finally:
+            for task in tasks:
+                task.cancel()
+            for player in self.players.values():
+                player.destroy()
+
+
+class FakeLavalink:
+    """The node, serving the websocket and the REST api on one port"""
+
+    def __init__(
+        self,
+        password: str = "youshallnotpass",
+        time_scale: float = 30.0,
+        rest_latency: float = 0.02,
+        stats_interval: float = 60.0,
+        update_interval: float = 5.0,
+        failure_rate: float = 0.0,
+        no_match_rate: float = 0.02,
+    ) -> None:
+        self.password = password
+        self.time_scale = time_scale
+        self.rest_latency = rest_latency
+        self.stats_interval = stats_interval
+        self.update_interval = update_interval
+        self.failure_rate = failure_rate
+        self.no_match_rate = no_match_rate
+
+        self.connections: list[Connection] = []
+        self.ops: Counter = Counter()
+        self.events: Counter = Counter()
+        self.requests: Counter = Counter()
+        self._started = time.monotonic()
+        self._cpu = (time.monotonic(), time.process_time())
+
+    @property
+    def players(self) -> list[FakePlayer]:
+        return [p for c in self.connections for p in c.players.values()]
+
+    def stats(self) -> dict:
+        players = self.players
+        playing = sum(p.track is not None and not p.paused for p in players)
+
+        # Load of the process since the last stats
+        now, cpu = time.monotonic(), time.process_time()
+        load = (cpu - self._cpu[1]) / max(now - self._cpu[0], 1e-9)
+        self._cpu = (now, cpu)
+
+        cores = os.cpu_count() or 1
+        used = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return {
+            "op": "stats",
+            "players": len(players),
+            "playingPlayers": playing,
+            "uptime": int((now - self._started) * 1000),
+            "memory": {
+                "free": 0,
+                "used": used,
+                "allocated": used,
+                "reservable": used * 4,
+            },
+            "cpu": {
+                "cores": cores,
+                "systemLoad": os.getloadavg()[0] / cores,
+                "lavalinkLoad": load / cores,
+            },
+            # 50 frames a second are sent to each playing player
+            "frameStats": {
+                "sent": playing * 3000,
+                "nulled": 0,
+                "deficit": 0,
+            },
+        }
+
+    def _authorized(self, request: web.Request) -> bool:
+        return request.headers.get("Authorization") == self.password
+
+    async def _rest_delay(self) -> None:
+        if self.rest_latency:
+            await asyncio.sleep(random.expovariate(1 / self.rest_latency))
+
+    async def websocket(self, request: web.Request) -> web.StreamResponse:
+        if not self._authorized(request):
+            raise web.HTTPUnauthorized()
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connection = Connection(self, ws)
+        self.connections.append(connection)
+        try:
+            await connection.run()
+        finally:
+            self.connections.remove(connection)
+        return ws
+
+    async def loadtracks(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            raise web.HTTPUnauthorized()
+
+        self.requests["loadtracks"] += 1
+        await self._rest_delay()
+        identifier = request.query.get("identifier", "")
+        return web.json_response(load_tracks(identifier, self.no_match_rate))
+
+    async def decodetrack(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            raise web.HTTPUnauthorized()
+
+        self.requests["decodetrack"] += 1
+        await self._rest_delay()
+        try:
+            info = decode_track(request.query["track"])
+        except (KeyError, ValueError, binascii.Error):
+            return web.json_response(
+                {"status": 500, "error": "Failed to decode the track"}, status=500
+            )
+        return web.json_response(info)
+
+    async def benchmark(self, _: web.Request) -> web.Response:
+        """Not part of lavalink, reports what the node has seen"""
+        return web.json_response(
+            {
+                "players": len(self.players),
+                "ops": self.ops,
+                "events": self.events,
+                "requests": self.requests,
+            }
+        )
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.websocket)
+        app.router.add_get("/loadtracks", self.loadtracks)
+        app.router.add_get("/decodetrack", self.decodetrack)
+        app.router.add_get("/benchmark", self.benchmark)
+        return app
+
+
+async def serve(node: FakeLavalink, host: str, port: int) -> None:
+    runner = web.AppRunner(node.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2333)
+    parser.add_argument("--password", default="youshallnotpass")
+    parser.add_argument("--time-scale", type=float, default=30.0)
+    parser.add_argument("--rest-latency", type=float, default=0.02)
+    parser.add_argument("--stats-interval", type=float, default=60.0)
+    parser.add_argument("--update-interval", type=float, default=5.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--no-match-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    node = FakeLavalink(
+        password=args.password,
+        time_scale=args.time_scale,
+        rest_latency=args.rest_latency,
+        stats_interval=args.stats_interval,
+        update_interval=args.update_interval,
+        failure_rate=args.failure_rate,
+        no_match_rate=args.no_match_rate,
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(node, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
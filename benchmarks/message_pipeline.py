@@ -0,0 +1,369 @@
+"""
+End to end benchmark of the message pipeline, from `Bot.on_message`
+through prefix resolution and `process_commands` to a cog command
+
+Guilds, channels, members and messages are real discord.py objects built
+from gateway payloads, the guild models come from an in-memory store and
+messages sent by commands never leave the process
+
+Run with `python -m benchmarks.message_pipeline [--messages N] [--guilds N]`
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Optional
+
+import discord
+from discord.ext import commands
+
+from bot.core import Bot
+from bot.core.helpers import BotConfig, LoopMonitorConfig
+from bot.utils.bettercog import BetterCog
+
+BOT_ID = 1
+TIMESTAMP = "2021-08-01T00:00:00+00:00"
+PREFIXES = ("!", "!", "!", "?", "hb ")
+
+# Weights of the kinds of messages replayed, chat being the bulk of them
+MESSAGE_MIX = {
+    "chat": 0.93,
+    "ping": 0.025,
+    "echo": 0.02,
+    "info": 0.015,
+    "unknown": 0.005,
+    "mention": 0.005,
+}
+STAGES = ("on_message", "get_prefix", "get_context", "invoke", "send")
+
+
+class Timings:
+    """Collects the duration of every stage of the pipeline"""
+
+    def __init__(self) -> None:
+        self.samples = defaultdict(list)
+        self.enabled = True
+
+    def record(self, stage: str, start: float) -> None:
+        if self.enabled:
+            self.samples[stage].append(time.perf_counter() - start)
+
+
+TIMINGS = Timings()
+
+
+class BenchmarkContext(commands.Context):
+    """Context which times sending messages"""
+
+    async def send(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().send(*args, **kwargs)
+        finally:
+            TIMINGS.record("send", start)
+
+
+class BenchmarkBot(Bot):
+    """`Bot` with its stages timed and guild models kept in memory"""
+
+    def __init__(self, config: BotConfig, guild_store: dict):
+        super().__init__(config)
+        self.guild_store = guild_store
+
+    async def _load_guild_model(self, guild_id: int):
+        # Yields once like a database round-trip would
+        await asyncio.sleep(0)
+        guild_model = self.guild_store[guild_id]
+        self._prefix_index[guild_id] = guild_model.prefix
+        return guild_model
+
+    async def on_message(self, message: discord.Message) -> None:
+        start = time.perf_counter()
+        try:
+            await super().on_message(message)
+        finally:
+            TIMINGS.record("on_message", start)
+
+    async def get_prefix(self, message: discord.Message):
+        start = time.perf_counter()
+        try:
+            return await super().get_prefix(message)
+        finally:
+            TIMINGS.record("get_prefix", start)
+
+    async def get_context(self, message: discord.Message, *, cls=None):
+        start = time.perf_counter()
+        try:
+            return await super().get_context(message, cls=cls or BenchmarkContext)
+        finally:
+            TIMINGS.record("get_context", start)
+
+    async def invoke(self, ctx: commands.Context) -> None:
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            TIMINGS.record("invoke", start)
+
+    async def on_command_error(self, ctx: commands.Context, error: Exception) -> None:
+        # Only unknown commands are expected to fail
+        if not isinstance(error, commands.CommandNotFound):
+            raise error
+
+
+class Commands(BetterCog):
+    """The commands replayed by the benchmark"""
+
+    @commands.command()
+    async def ping(self, ctx: commands.Context) -> None:
+        await ctx.send("pong")
+
+    @commands.command()
+    async def echo(self, ctx: commands.Context, *, text: str) -> None:
+        await ctx.send(discord.utils.escape_mentions(text))
+
+    @commands.command()
+    @commands.guild_only()
+    async def info(
+        self, ctx: commands.Context, member: Optional[discord.Member] = None
+    ) -> None:
+        member = member or ctx.author
+        embed = discord.Embed(title=str(member), description=f"ID: {member.id}")
+        embed.add_field(name="Joined", value=str(member.joined_at))
+        await ctx.send(embed=embed)
+
+
+def user_payload(user_id: int) -> dict:
+    return {
+        "id": str(user_id),
+        "username": f"user{user_id}",
+        "discriminator": f"{user_id % 10000:04}",
+        "avatar": None,
+        "bot": user_id == BOT_ID,
+    }
+
+
+def member_payload(user_id: int) -> dict:
+    return {
+        "user": user_payload(user_id),
+        "roles": [],
+        "joined_at": TIMESTAMP,
+        "deaf": False,
+        "mute": False,
+    }
+
+
+def message_payload(
+    message_id: int, channel_id: int, author_id: int, content: str
+) -> dict:
+    return {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "type": 0,
+        "content": content,
+        "author": user_payload(author_id),
+        "attachments": [],
+        "embeds": [],
+        "mentions": [],
+        "mention_roles": [],
+        "pinned": False,
+        "mention_everyone": False,
+        "tts": False,
+        "timestamp": TIMESTAMP,
+        "edited_timestamp": None,
+    }
+
+
+def make_message(
+    channel: discord.TextChannel, message_id: int, author_id: int, content: str
+) -> discord.Message:
+    """Builds the message as it arrives in a MESSAGE_CREATE"""
+    return discord.Message(
+        state=channel._state,  # pylint: disable=W0212
+        channel=channel,
+        data={
+            **message_payload(message_id, channel.id, author_id, content),
+            "guild_id": str(channel.guild.id),
+            "member": member_payload(author_id),
+        },
+    )
+
+
+def guild_payload(guild_id: int, members: int) -> dict:
+    """The guild as it arrives in a GUILD_CREATE"""
+    return {
+        "id": str(guild_id),
+        "name": f"guild{guild_id}",
+        "owner_id": str(guild_id * 1000),
+        "member_count": members + 1,
+        "roles": [
+            {
+                "id": str(guild_id),
+                "name": "@everyone",
+                "permissions": "104324673",
+                "position": 0,
+                "color": 0,
+                "hoist": False,
+                "managed": False,
+                "mentionable": False,
+            }
+        ],
+        "channels": [
+            {
+                "id": str(guild_id * 10),
+                "type": 0,
+                "name": "general",
+                "position": 0,
+                "permission_overwrites": [],
+            }
+        ],
+        "members": [
+            member_payload(BOT_ID),
+            *(member_payload(guild_id * 1000 + i) for i in range(members)),
+        ],
+    }
+
+
+def make_bot(guilds: int, members: int, loop_monitor: bool) -> BenchmarkBot:
+    guild_store = {
+        guild_id: SimpleNamespace(
+            id=guild_id, pk=guild_id, prefix=PREFIXES[guild_id % len(PREFIXES)]
+        )
+        for guild_id in range(1, guilds + 1)
+    }
+    config = BotConfig(
+        prefix="!",
+        token="benchmark",
+        log_webhook_url="https://discord.com/api/webhooks/0/benchmark",
+        dev_env=False,
+        load_jishaku=False,
+        webhook_log_level=None,
+        loop_monitor=LoopMonitorConfig() if loop_monitor else None,
+    )
+    bot = BenchmarkBot(config, guild_store)
+    bot.add_cog(Commands(bot))
+
+    # pylint: disable=W0212
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID))
+    for guild_id in guild_store:
+        state._add_guild(
+            discord.Guild(state=state, data=guild_payload(guild_id, members))
+        )
+
+    async def send_message(channel_id, content, **kwargs):
+        data = message_payload(0, channel_id, BOT_ID, content or "")
+        if kwargs.get("embed"):
+            data["embeds"].append(kwargs["embed"])
+        return data
+
+    bot.http.send_message = send_message
+    bot.lock_bot = False
+    return bot
+
+
+def make_messages(bot: BenchmarkBot, count: int, members: int, seed: int = 0) -> list:
+    """Builds a mix of chat and commands, a few guilds being the busiest"""
+    rng = random.Random(seed)
+    guilds = list(bot.guilds)
+    # Activity across guilds follows a zipf like distribution
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(guilds))]
+    kinds, kind_weights = zip(*MESSAGE_MIX.items())
+
+    messages = []
+    for message_id in range(count):
+        guild = rng.choices(guilds, weights)[0]
+        prefix = bot.guild_store[guild.id].prefix
+        author_id = guild.id * 1000 + rng.randrange(members)
+        content = {
+            "chat": "just chatting about things",
+            "ping": f"{prefix}ping",
+            "echo": f"{prefix}echo hello <@{author_id}> there",
+            "info": f"{prefix}info",
+            "unknown": f"{prefix}doesnotexist",
+            "mention": f"<@!{BOT_ID}>",
+        }[rng.choices(kinds, kind_weights)[0]]
+
+        messages.append(
+            make_message(guild.text_channels[0], message_id, author_id, content)
+        )
+
+    return messages
+
+
+def percentiles(samples: list) -> tuple:
+    if len(samples) < 2:
+        return (samples[0],) * 3 if samples else (0.0,) * 3
+    quantiles = statistics.quantiles(samples, n=100)
+    return quantiles[49], quantiles[94], quantiles[98]
+
+
+async def replay(bot: BenchmarkBot, messages: list) -> float:
+    """Returns the messages/sec handled by `on_message`"""
+    start = time.perf_counter()
+    for message in messages:
+        await bot.on_message(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--guilds", type=int, default=2_000)
+    parser.add_argument("--members", type=int, default=20)
+    parser.add_argument("--loop-monitor", action="store_true")
+    args = parser.parse_args()
+
+    bot = make_bot(args.guilds, args.members, args.loop_monitor)
+    messages = make_messages(bot, args.messages, args.members)
+
+    # Warms the guild cache so the timed run measures the steady state
+    TIMINGS.enabled = False
+    await replay(bot, make_messages(bot, args.guilds * 2, args.members, seed=1))
+    TIMINGS.enabled = True
+
+    collections = [stats["collections"] for stats in gc.get_stats()]
+    throughput = await replay(bot, messages)
+    collections = [
+        stats["collections"] - before
+        for stats, before in zip(gc.get_stats(), collections)
+    ]
+
+    # Allocations are measured on a separate run as tracing is slow
+    TIMINGS.enabled = False
+    sample = messages[: min(len(messages), 20_000)]
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    await replay(bot, sample)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sys.getallocatedblocks() - blocks
+
+    print(
+        f"{args.messages:,} messages across {args.guilds:,} guilds, "
+        f"{1 - MESSAGE_MIX['chat']:.0%} commands"
+    )
+    print(f"throughput: {throughput:,.0f} msg/s\n")
+    print(f"{'stage':<14}{'calls':>10}{'p50 (us)':>12}{'p95 (us)':>12}{'p99 (us)':>12}")
+    for stage in STAGES:
+        samples = TIMINGS.samples[stage]
+        p50, p95, p99 = (value * 1e6 for value in percentiles(samples))
+        print(f"{stage:<14}{len(samples):>10,}{p50:>12.1f}{p95:>12.1f}{p99:>12.1f}")
+
+    print(
+        f"\nallocation peak:     {peak / 1024:,.0f} KiB over {len(sample):,} messages"
+    )
+    print(f"retained blocks:     {retained / len(sample):.2f} per message")
+    await bot.close()
+    print(f"gc collections:      {' / '.join(map(str, collections))} (gen 0 / 1 / 2)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
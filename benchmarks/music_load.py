@@ -0,0 +1,505 @@
+"""
+Load test of the music cog against `benchmarks.fake_lavalink`
+
+Every guild runs a music session, a listener sitting in a voice channel
+sends music commands with a think time between them while the tracks
+play, end and advance through the queue. Voice connections are answered
+by a fake gateway and messages sent by the bot never leave the process
+
+Reports the latency of the commands, how late lavalink events are
+handled, the lag of the event loop and how the memory grows
+
+Run with `python -m benchmarks.music_load [--guilds N] [--duration SECONDS]`
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import random
+import resource
+import socket
+import sys
+import time
+import traceback
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import Optional
+
+import aiohttp
+import discord
+from discord.ext import commands
+
+from bot.cogs.music.music import Music
+from bot.cogs.music.utils import EQ_PRESETS
+from bot.cogs.music.utils.types import OPTIONS
+from bot.core.helpers import BotConfig, LavalinkConfig
+
+from .message_pipeline import (
+    BOT_ID,
+    TIMINGS,
+    BenchmarkBot,
+    guild_payload,
+    make_message,
+    member_payload,
+    message_payload,
+    percentiles,
+    user_payload,
+)
+
+PASSWORD = "benchmark"
+VOICE_LATENCY = 0.05
+REACTION_DELAY = 0.5
+LOOP_LAG_INTERVAL = 0.05
+
+# Weights of the commands sent once a session is playing
+COMMAND_MIX = {
+    "play_url": 12,
+    "play_search": 6,
+    "play_playlist": 3,
+    "playmany": 3,
+    "queue": 10,
+    "playing": 10,
+    "volume": 6,
+    "seek": 5,
+    "eq": 4,
+    "adveq": 4,
+    "skip": 10,
+    "previous": 2,
+    "pause": 5,
+    "resume": 5,
+    "shuffle": 3,
+}
+
+MESSAGE_IDS = itertools.count(1)
+
+
+def command_content(kind: str, rng: random.Random) -> str:
+    url = "https://www.youtube.com/watch?v={}".format
+    return {
+        "play_url": lambda: f"play {url(rng.randrange(100_000))}",
+        "play_search": lambda: f"play song number {rng.randrange(5_000)}",
+        "play_playlist": lambda: (
+            f"play https://www.youtube.com/playlist?list=PL{rng.randrange(500)}"
+        ),
+        "playmany": lambda: "playmany "
+        + " ".join(url(rng.randrange(100_000)) for _ in range(3)),
+        "queue": lambda: "queue",
+        "playing": lambda: "playing",
+        "volume": lambda: rng.choice(
+            ["volume up", "volume down", f"volume {rng.randrange(10, 150)}"]
+        ),
+        "seek": lambda: f"seek {rng.randrange(3)}:{rng.randrange(60):02}",
+        "eq": lambda: f"eq {rng.choice(list(EQ_PRESETS))}",
+        "adveq": lambda: f"adveq 63={rng.randint(-10, 10)} 1000={rng.randint(-10, 10)}",
+        "skip": lambda: "skip",
+        "previous": lambda: "previous",
+        "pause": lambda: "pause",
+        "resume": lambda: "play",
+        "shuffle": lambda: "shuffle",
+        "disconnect": lambda: "disconnect",
+    }[kind]()
+
+
+def rss() -> int:
+    """Returns the resident memory of the process in bytes"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Only the peak is known outside of linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoadBot(BenchmarkBot):
+    """`BenchmarkBot` counting the errors of the music commands"""
+
+    def __init__(self, config: BotConfig, guild_store: dict):
+        super().__init__(config, guild_store)
+        self.command_errors: Counter = Counter()
+        # Time from lavalink sending an event to it being handled
+        self.event_lag: list[float] = []
+
+    async def on_command_error(self, ctx: commands.Context, error: Exception) -> None:
+        if isinstance(error, commands.CommandInvokeError):
+            error = error.original
+            # Bugs rather than user errors, the first of each kind is shown
+            if type(error).__name__ not in self.command_errors:
+                traceback.print_exception(
+                    type(error), error, error.__traceback__, file=sys.stderr
+                )
+        self.command_errors[type(error).__name__] += 1
+
+
+class FakeGateway:
+    """Answers voice state updates the way discord's gateway does"""
+
+    open = False
+
+    def __init__(self, bot: LoadBot):
+        self.bot = bot
+
+    async def voice_state(
+        self, guild_id, channel_id, self_mute=False, self_deaf=False
+    ) -> None:
+        asyncio.create_task(
+            self._answer(int(guild_id), channel_id, self_mute, self_deaf)
+        )
+
+    async def _answer(self, guild_id, channel_id, self_mute, self_deaf) -> None:
+        await asyncio.sleep(VOICE_LATENCY)
+        data = {
+            "guild_id": str(guild_id),
+            "channel_id": channel_id and str(channel_id),
+            "user_id": str(BOT_ID),
+            "session_id": "benchmark",
+            "deaf": False,
+            "mute": False,
+            "self_deaf": self_deaf,
+            "self_mute": self_mute,
+            "suppress": False,
+            "member": member_payload(BOT_ID),
+        }
+        self.bot.dispatch("socket_response", {"t": "VOICE_STATE_UPDATE", "d": data})
+        self.bot._connection.parse_voice_state_update(data)  # pylint: disable=W0212
+
+        if channel_id is not None:
+            self.bot.dispatch(
+                "socket_response",
+                {
+                    "t": "VOICE_SERVER_UPDATE",
+                    "d": {
+                        "token": "benchmark",
+                        "guild_id": str(guild_id),
+                        "endpoint": "benchmark.discord.media:443",
+                    },
+                },
+            )
+
+
+class Session:
+    """A listener in a guild sending music commands"""
+
+    def __init__(self, bot: LoadBot, guild: discord.Guild, rng: random.Random):
+        self.bot = bot
+        self.guild = guild
+        self.rng = rng
+        self.channel = guild.text_channels[0]
+        self.member = guild.get_member(guild.id * 1000)
+        self.tasks: set[asyncio.Task] = set()
+        self._replied: Optional[asyncio.Future] = None
+
+    def replied(self) -> None:
+        if self._replied is not None and not self._replied.done():
+            self._replied.set_result(None)
+
+    def react(self, message_id: int, emoji: str) -> None:
+        # Picks the offered track after a moment like a person would
+        reaction = discord.Reaction(
+            message=SimpleNamespace(id=message_id),
+            data={"count": 1, "me": False},
+            emoji=emoji,
+        )
+        asyncio.get_event_loop().call_later(
+            REACTION_DELAY, self.bot.dispatch, "reaction_add", reaction, self.member
+        )
+
+    async def command(self, kind: str, latencies: dict) -> None:
+        """Times the command until its first reply, or until it returns"""
+        message = make_message(
+            self.channel,
+            next(MESSAGE_IDS),
+            self.member.id,
+            self.bot.config.prefix + command_content(kind, self.rng),
+        )
+        self._replied = asyncio.get_event_loop().create_future()
+
+        start = time.perf_counter()
+        # Handled in a task like discord.py does, paginators keep running
+        task = asyncio.create_task(self.bot.on_message(message))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        await asyncio.wait({task, self._replied}, return_when=asyncio.FIRST_COMPLETED)
+        latencies[kind].append(time.perf_counter() - start)
+
+    async def run(self, args, latencies: dict, gaps: list) -> None:
+        kinds, weights = zip(*COMMAND_MIX.items())
+        deadline = time.monotonic() + args.duration
+
+        await asyncio.sleep(self.rng.uniform(0, args.ramp))
+        await self.command(self.rng.choice(["play_url", "play_playlist"]), latencies)
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.rng.expovariate(1 / args.think_time))
+            await self.command(self.rng.choices(kinds, weights)[0], latencies)
+
+        music: Music = self.bot.get_cog("Music")
+        if (player := music.find_player(self.guild.id)) is not None:
+            gaps.extend(player.transition_gaps)
+        await self.command("disconnect", latencies)
+
+        for task in self.tasks:
+            task.cancel()
+
+
+def make_bot(guilds: int, listeners: int) -> LoadBot:
+    guild_store = {
+        guild_id: SimpleNamespace(id=guild_id, pk=guild_id, prefix="!")
+        for guild_id in range(1, guilds + 1)
+    }
+    config = BotConfig(
+        prefix="!",
+        token="benchmark",
+        log_webhook_url="https://discord.com/api/webhooks/0/benchmark",
+        dev_env=False,
+        load_jishaku=False,
+        webhook_log_level=None,
+    )
+    bot = LoadBot(config, guild_store)
+
+    # pylint: disable=W0212
+    state = bot._connection
+    # Listeners are counted from the cached members in the voice channel
+    state.member_cache_flags = discord.MemberCacheFlags.all()
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID))
+
+    for guild_id in guild_store:
+        data = guild_payload(guild_id, listeners)
+        voice_channel_id = guild_id * 10 + 1
+        data["channels"].append(
+            {
+                "id": str(voice_channel_id),
+                "type": 2,
+                "name": "music",
+                "position": 1,
+                "bitrate": 64000,
+                "user_limit": 0,
+                "permission_overwrites": [],
+            }
+        )
+        data["voice_states"] = [
+            {
+                "user_id": str(guild_id * 1000 + i),
+                "channel_id": str(voice_channel_id),
+                "session_id": f"listener{i}",
+                "deaf": False,
+                "mute": False,
+                "self_deaf": False,
+                "self_mute": False,
+                "suppress": False,
+            }
+            for i in range(listeners)
+        ]
+        state._add_guild(discord.Guild(state=state, data=data))
+
+    bot.ws = FakeGateway(bot)
+    bot._ready.set()
+    bot.lock_bot = False
+    return bot
+
+
+def patch_http(bot: LoadBot, sessions: dict) -> None:
+    """Answers the requests of the music commands without sending them"""
+    choice = next(iter(OPTIONS))
+
+    async def send_message(channel_id, content, **kwargs):
+        sessions[channel_id].replied()
+        data = message_payload(next(MESSAGE_IDS), channel_id, BOT_ID, content or "")
+        if kwargs.get("embed"):
+            data["embeds"].append(kwargs["embed"])
+        return data
+
+    async def edit_message(channel_id, message_id, **fields):
+        sessions[channel_id].replied()
+        return message_payload(message_id, channel_id, BOT_ID, fields.get("content"))
+
+    async def add_reaction(channel_id, message_id, emoji):
+        if emoji == choice and (session := sessions.get(channel_id)):
+            session.react(message_id, emoji)
+
+    async def ignore(*_, **__):
+        pass
+
+    http = bot.http
+    http.send_message = send_message
+    http.edit_message = edit_message
+    http.add_reaction = add_reaction
+    http.delete_message = http.remove_reaction = http.clear_reactions = ignore
+
+
+def time_events(bot: LoadBot, node) -> None:
+    """Times the events of the node from lavalink sending them to being handled"""
+    websocket = node._websocket  # pylint: disable=W0212
+    process_data = websocket.process_data
+
+    async def timed_process_data(data: dict):
+        await process_data(data)
+        if (sent_at := data.get("sentAt")) is not None:
+            bot.event_lag.append(time.time() - sent_at)
+
+    websocket.process_data = timed_process_data
+
+
+async def sample_loop(lags: list, memory: list) -> None:
+    loop = asyncio.get_event_loop()
+    for tick in itertools.count():
+        expected = loop.time() + LOOP_LAG_INTERVAL
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lags.append(max(loop.time() - expected, 0.0))
+        if tick % 20 == 0:
+            memory.append(rss())
+
+
+async def start_fake_lavalink(args) -> tuple:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    # Run in its own process so it doesn't add to the bot's memory and lag
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.fake_lavalink",
+        f"--port={port}",
+        f"--password={PASSWORD}",
+        f"--time-scale={args.time_scale}",
+        f"--rest-latency={args.rest_latency}",
+        f"--failure-rate={args.failure_rate}",
+        "--stats-interval=5",
+        stdout=asyncio.subprocess.DEVNULL,
+    )
+
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            await asyncio.sleep(0.1)
+        else:
+            writer.close()
+            return process, "127.0.0.1", port
+
+    process.kill()
+    raise RuntimeError("The fake lavalink node didn't start")
+
+
+def print_latencies(title: str, samples: dict, unit: float = 1e3) -> None:
+    print(f"\n{title:<16}{'count':>9}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}")
+    for name, values in samples.items():
+        if values:
+            p50, p95, p99 = (value * unit for value in percentiles(values))
+            print(f"{name:<16}{len(values):>9,}{p50:>11.1f}{p95:>11.1f}{p99:>11.1f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=1_000)
+    parser.add_argument("--listeners", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--think-time", type=float, default=3.0)
+    parser.add_argument("--ramp", type=float, default=10.0)
+    parser.add_argument("--time-scale", type=float, default=30.0)
+    parser.add_argument("--rest-latency", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    parser.add_argument(
+        "--lavalink", help="HOST:PORT of a running node instead of the fake one"
+    )
+    parser.add_argument("--password", default=PASSWORD)
+    args = parser.parse_args()
+
+    process: Optional[asyncio.subprocess.Process] = None
+    if args.lavalink:
+        host, _, port = args.lavalink.rpartition(":")
+        port = int(port)
+    else:
+        process, host, port = await start_fake_lavalink(args)
+
+    TIMINGS.enabled = False
+    bot = make_bot(args.guilds, max(args.listeners, 1))
+    music = Music(bot)
+    # Lyrics would be prefetched from the internet for every track
+    music.lyrics = None
+    bot.add_cog(music)
+
+    node = await bot.lavalink_pool.add_node(
+        LavalinkConfig(
+            host=host,
+            port=port,
+            rest_url=f"http://{host}:{port}",
+            password=args.password,
+            identifier="LOAD",
+        )
+    )
+    time_events(bot, node)
+
+    sessions = {
+        guild.text_channels[0].id: Session(bot, guild, random.Random(guild.id))
+        for guild in bot.guilds
+    }
+    patch_http(bot, sessions)
+
+    gc.collect()
+    memory_before, objects_before = rss(), len(gc.get_objects())
+    loop_lag, memory = [], []
+    sampler = asyncio.create_task(sample_loop(loop_lag, memory))
+
+    latencies, gaps = defaultdict(list), []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(session.run(args, latencies, gaps) for session in sessions.values())
+    )
+    elapsed = time.perf_counter() - start
+
+    sampler.cancel()
+    # Lets the disconnects and their events settle
+    await asyncio.sleep(1)
+    gc.collect()
+    memory_after, objects_after = rss(), len(gc.get_objects())
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://{host}:{port}/benchmark") as resp:
+            node_report = await resp.json() if resp.status == 200 else None
+
+    commands_sent = sum(map(len, latencies.values()))
+    print(
+        f"{args.guilds:,} guilds for {args.duration:.0f}s, "
+        f"{commands_sent:,} commands at {commands_sent / elapsed:,.0f}/s"
+    )
+
+    print_latencies("command", dict(sorted(latencies.items())))
+    print_latencies(
+        "lavalink",
+        {
+            "event lag": bot.event_lag,
+            "transition": gaps,
+            "loop lag": loop_lag,
+        },
+    )
+    print(f"loop lag max:   {max(loop_lag, default=0) * 1e3:.1f}ms")
+
+    mib = 1024 * 1024
+    print(
+        f"\nmemory:         {memory_before / mib:,.1f} MiB before, "
+        f"{max(memory, default=0) / mib:,.1f} MiB peak, "
+        f"{memory_after / mib:,.1f} MiB after"
+    )
+    print(f"objects:        {objects_after - objects_before:+,} after the sessions")
+    print(f"players left:   {len(bot.wavelink_client.players):,}")
+
+    if bot.command_errors:
+        print(f"\ncommand errors: {dict(bot.command_errors.most_common())}")
+    if node_report:
+        print(f"lavalink ops:   {node_report['ops']}")
+        print(f"events:         {node_report['events']}")
+        print(f"rest requests:  {node_report['requests']}")
+
+    await bot.close()
+    # Not closed by the bot, it would keep reconnecting to the node
+    node._websocket._task.cancel()  # pylint: disable=W0212
+    await bot.wavelink_client.session.close()
+    if process is not None:
+        process.terminate()
+        await process.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Benchmarks messages/sec through `Bot.on_message` with and without
+the synchronous prefix pre-filter
+
+Run with `python -m benchmarks.prefix_filter`
+"""
+
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from bot.core import Bot
+from bot.core.helpers import BotConfig, ModelCacheConfig
+
+GUILDS = 1000
+MESSAGES = 200_000
+COMMAND_RATIO = 0.02
+
+
+class BenchmarkBot(Bot):
+    """`Bot` which resolves the prefix but never invokes a command"""
+
+    async def process_commands(self, message) -> None:
+        await self.get_prefix(message)
+
+
+def make_bot(prefix_prefilter: bool) -> BenchmarkBot:
+    """Builds a bot with every guild already in the cache"""
+    bot = BenchmarkBot(
+        BotConfig(
+            prefix="!",
+            token="benchmark",
+            log_webhook_url="https://discord.com/api/webhooks/0/benchmark",
+            dev_env=False,
+            load_jishaku=False,
+            prefix_prefilter=prefix_prefilter,
+            guild_cache=ModelCacheConfig(maxsize=GUILDS, ttl=None),
+        )
+    )
+    # pylint: disable=W0212
+    bot._connection.user = SimpleNamespace(id=1, mention="<@1>")
+    bot.lock_bot = False
+    for guild_id in range(GUILDS):
+        bot._cache_guild_model(SimpleNamespace(id=guild_id, pk=guild_id, prefix="!"))
+    return bot
+
+
+def make_messages() -> list:
+    """Builds a mix of chat and command messages across the guilds"""
+    rng = random.Random(0)
+    guilds = [SimpleNamespace(id=guild_id) for guild_id in range(GUILDS)]
+    author = SimpleNamespace(bot=False)
+    return [
+        SimpleNamespace(
+            content="!play something" if rng.random() < COMMAND_RATIO else "hello",
+            guild=rng.choice(guilds),
+            author=author,
+        )
+        for _ in range(MESSAGES)
+    ]
+
+
+async def run(prefix_prefilter: bool, messages: list) -> float:
+    """Returns the messages/sec handled by `on_message`"""
+    bot = make_bot(prefix_prefilter)
+    start = time.perf_counter()
+    for message in messages:
+        await bot.on_message(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    messages = make_messages()
+    without_filter = await run(False, messages)
+    with_filter = await run(True, messages)
+    print(f"{MESSAGES} messages, {COMMAND_RATIO:.0%} commands, {GUILDS} guilds")
+    print(f"without pre-filter: {without_filter:>12,.0f} msg/s")
+    print(f"with pre-filter:    {with_filter:>12,.0f} msg/s")
+    print(f"speedup:            {with_filter / without_filter:>12.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+Microbenchmarks of the `Queue` operations used by the music
+commands, compared with copying the queue list on every call
+
+Run with `python -m benchmarks.queue_views`
+"""
+
+import random
+import timeit
+
+from bot.cogs.music.utils.queue import Queue
+
+SIZES = (100, 1_000, 5_000, 50_000)
+PAGE_SIZE = 10
+
+
+def make_queue(size: int) -> Queue:
+    """Builds a queue positioned in its middle"""
+    queue = Queue()
+    queue.add(*range(size))
+    queue.position = size // 2
+    return queue
+
+
+def copying_operations(queue: Queue) -> dict:
+    """The operations as they were done by slicing the whole list"""
+    # pylint: disable=W0212
+    return {
+        "upcoming check": lambda: bool(queue._queue[queue.position + 1 :]),
+        "history check": lambda: bool(queue._queue[: queue.position]),
+        "queue page": lambda: queue._queue[queue.position + 1 :][:PAGE_SIZE],
+        "shuffle": lambda: random.shuffle(queue._queue[queue.position + 1 :]),
+    }
+
+
+def view_operations(queue: Queue) -> dict:
+    """The operations through the `Queue` views"""
+    return {
+        "upcoming check": lambda: bool(queue.upcoming),
+        "history check": lambda: bool(queue.history),
+        "queue page": lambda: queue.upcoming[:PAGE_SIZE],
+        "shuffle": queue.shuffle,
+    }
+
+
+def bench(func, number: int) -> float:
+    """Returns the best time per call in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    print(f"{'operation':<16}{'size':>8}{'copying (us)':>16}{'views (us)':>14}")
+    for size in SIZES:
+        number = max(10, 200_000 // size)
+        copying = copying_operations(make_queue(size))
+        views = view_operations(make_queue(size))
+
+        for name, func in copying.items():
+            print(
+                f"{name:<16}{size:>8}"
+                f"{bench(func, number):>16.2f}{bench(views[name], number):>14.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measures the memory the queue holds per 10k tracks, as full
+`wavelink.Track` objects and as compact `TrackRecord`s
+
+Run with `python -m benchmarks.track_memory`
+"""
+
+import base64
+import gc
+import json
+import os
+import tracemalloc
+
+import wavelink
+
+from bot.cogs.music.utils.queue import Queue
+
+TRACKS = 10_000
+
+
+def make_payload(count: int) -> str:
+    """A lavalink `loadtracks` response of a playlist as it comes off the wire"""
+    return json.dumps(
+        {
+            "loadType": "PLAYLIST_LOADED",
+            "playlistInfo": {"name": "Benchmark", "selectedTrack": -1},
+            "tracks": [
+                {
+                    # Encoded tracks are around 130 bytes of base64
+                    "track": base64.b64encode(os.urandom(100)).decode(),
+                    "info": {
+                        "identifier": f"{i:011d}",
+                        "isSeekable": True,
+                        "author": f"Artist {i % 500}",
+                        "length": 180_000 + i,
+                        "isStream": False,
+                        "position": 0,
+                        "title": f"Artist {i % 500} - Song number {i}",
+                        "uri": f"https://www.youtube.com/watch?v={i:011d}",
+                        "sourceName": "youtube",
+                    },
+                }
+                for i in range(count)
+            ],
+        }
+    )
+
+
+def full_tracks(payload: str) -> list:
+    """What `Queue._queue` held before, the tracks of the playlist as they are"""
+    return wavelink.TrackPlaylist(json.loads(payload)).tracks
+
+
+def queued_tracks(payload: str) -> Queue:
+    """The playlist added to the queue, which keeps records of the tracks"""
+    queue = Queue()
+    queue.add(*wavelink.TrackPlaylist(json.loads(payload)).tracks)
+    return queue
+
+
+def retained(build, payload: str) -> int:
+    """Returns the bytes still allocated by the result of `build`"""
+    gc.collect()
+    tracemalloc.start()
+    result = build(payload)  # pylint: disable=W0612
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def main() -> None:
+    payload = make_payload(TRACKS)
+    before = retained(full_tracks, payload)
+    after = retained(queued_tracks, payload)
+
+    print(f"{'queue item':<16}{'KiB / 10k tracks':>18}{'bytes / track':>16}")
+    for name, size in (("wavelink.Track", before), ("TrackRecord", after)):
+        print(f"{name:<16}{size / 1024:>18.0f}{size / TRACKS:>16.0f}")
+    print(f"saved {1 - after / before:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
 """This is the core module for accessing using and accessing the bot"""
 
-from .core import Bot
+from .core import Bot, ShardedBot
@@ -4,10 +4,10 @@ This is the main file for running the Bot
 import logging
 import os
 
-from .core import Bot
-from .core.helpers import BotConfig
+from .core import Bot, ShardedBot
+from .core.helpers import BotConfig, ClusterConfig, ShardingConfig
 from .core.tortoise_config import tortoise_config
-from .env import bot_config, db_config, lavalink_config
+from .env import bot_config, cluster_config, db_config, lavalink_config
 
 os.environ.setdefault("JISHAKU_HIDE", "1")
 os.environ.setdefault("JISHAKU_RETAIN", "1")
@@ -15,7 +15,26 @@ os.environ.setdefault("JISHAKU_NO_UNDERSCORE", "1")
 
 logging.basicConfig(level=logging.INFO)
 
-cogs = ("bot.cogs.error_handler.error_handler",)
+cogs = (
+    "bot.cogs.error_handler.error_handler",
+    "bot.cogs.owner.owner",
+)
+
+sharding = None
+if bot_config.sharded or bot_config.shard_ids is not None:
+    sharding = ShardingConfig(
+        shard_count=bot_config.shard_count, shard_ids=bot_config.shard_ids
+    )
+
+# Set by the cluster launcher for the processes it starts
+cluster = None
+if cluster_config.id is not None:
+    cluster = ClusterConfig(
+        cluster_id=cluster_config.id,
+        ipc_host=cluster_config.ipc_host,
+        ipc_port=cluster_config.ipc_port,
+        ipc_secret=cluster_config.ipc_secret,
+    )
 
 new_bot_config = BotConfig(
     prefix=bot_config.prefix,
@@ -25,10 +44,12 @@ new_bot_config = BotConfig(
     log_webhook_url=bot_config.webhook_url,
     dev_env=bot_config.dev_env,
     cogs=cogs,
+    sharding=sharding,
+    cluster=cluster,
 )
 
-
-bot = Bot(config=new_bot_config, tortoise_config=tortoise_config)
+bot_class = ShardedBot if sharding else Bot
+bot = bot_class(config=new_bot_config, tortoise_config=tortoise_config)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,3 @@
+"""This is the init module for running the bot as clusters"""
+
+from .launcher import ClusterLauncher, fetch_shard_count, split_shards
@@ -0,0 +1,45 @@
+"""
+This is the main file for running the Bot as clusters
+
+Run with `python -m bot.cluster --clusters N [--shard-count N]`
+"""
+
+import argparse
+import asyncio
+import logging
+
+from bot.env import bot_config
+
+from .launcher import ClusterLauncher, fetch_shard_count
+
+logging.basicConfig(level=logging.INFO)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clusters", type=int, default=1)
+    parser.add_argument("--shard-count", type=int)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--health-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    shard_count = args.shard_count or await fetch_shard_count(bot_config.token)
+    if args.clusters > shard_count:
+        parser.error(f"Can't run {args.clusters} clusters with {shard_count} shards")
+
+    launcher = ClusterLauncher(
+        shard_count,
+        args.clusters,
+        host=args.host,
+        port=args.port,
+        health_timeout=args.health_timeout,
+    )
+    await launcher.run()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
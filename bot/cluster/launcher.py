@@ -0,0 +1,370 @@
+"""
+This module contains the launcher splitting the shards of the bot across
+clusters, each of them being a process running `ShardedBot`
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import secrets
+import signal
+import sys
+import time
+from typing import Iterable, Optional
+
+import discord
+
+from bot.core.ipc import MAX_MESSAGE_SIZE, read_message, write_message
+
+logger = logging.getLogger("bot.cluster")
+
+
+def split_shards(shard_count: int, clusters: int) -> list[list[int]]:
+    """
+    Splits the shards in contiguous ranges, one for each cluster
+    """
+    size, extra = divmod(shard_count, clusters)
+    shard_ranges, start = [], 0
+    for cluster_id in range(clusters):
+        end = start + size + (cluster_id < extra)
+        shard_ranges.append(list(range(start, end)))
+        start = end
+    return shard_ranges
+
+
+async def fetch_shard_count(token: str) -> int:
+    """
+    Fetches the shard count recommended by discord
+    """
+    http = discord.http.HTTPClient()
+    try:
+        await http.static_login(token, bot=True)
+        shard_count, _ = await http.get_bot_gateway()
+    finally:
+        await http.close()
+    return shard_count
+
+
+class Cluster:
+    """
+    This is a process of the launcher running a range of shards
+    """
+
+    def __init__(self, cluster_id: int, shard_ids: list[int]):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.health: dict = {}
+        self.ready = asyncio.Event()
+        self.started_at = 0.0
+        self.reported_at = 0.0
+        self.restart_at: Optional[float] = None
+        self.restarts = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def status(self) -> dict:
+        """
+        Returns the last health reported by the cluster along with
+        the state of its process
+        """
+        now = time.monotonic()
+        return {
+            **self.health,
+            "running": self.is_running,
+            "connected": self.writer is not None,
+            "shard_ids": self.shard_ids,
+            "restarts": self.restarts,
+            "last_report": now - self.reported_at if self.reported_at else None,
+        }
+
+
+class ClusterLauncher:
+    """
+    This starts the clusters one after the other, restarts the ones which
+    exit or stop reporting their health and routes the IPC requests
+    between them
+    """
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        shard_count: int,
+        clusters: int,
+        host: str = "127.0.0.1",
+        port: int = 9200,
+        health_timeout: float = 60.0,
+        startup_timeout: float = 300.0,
+        log_interval: float = 300.0,
+    ):
+        self.shard_count = shard_count
+        self.host = host
+        self.port = port
+        self.health_timeout = health_timeout
+        self.startup_timeout = startup_timeout
+        self.log_interval = log_interval
+        self.secret = secrets.token_hex(16)
+        self.clusters = {
+            cluster_id: Cluster(cluster_id, shard_ids)
+            for cluster_id, shard_ids in enumerate(split_shards(shard_count, clusters))
+        }
+        self._responses: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._logged_at = time.monotonic()
+
+    async def start_cluster(self, cluster: Cluster) -> None:
+        env = {
+            **os.environ,
+            "BOT_SHARD_COUNT": str(self.shard_count),
+            "BOT_SHARD_IDS": json.dumps(cluster.shard_ids),
+            "CLUSTER_ID": str(cluster.cluster_id),
+            "CLUSTER_IPC_HOST": self.host,
+            "CLUSTER_IPC_PORT": str(self.port),
+            "CLUSTER_IPC_SECRET": self.secret,
+        }
+
+        cluster.health = {}
+        cluster.ready.clear()
+        cluster.reported_at = 0.0
+        cluster.restart_at = None
+        cluster.started_at = time.monotonic()
+        cluster.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "bot", env=env
+        )
+        logger.info(
+            "Started cluster %s with shards %s-%s",
+            cluster.cluster_id,
+            cluster.shard_ids[0],
+            cluster.shard_ids[-1],
+        )
+
+    @staticmethod
+    async def stop_cluster(cluster: Cluster, timeout: float = 10.0) -> None:
+        if not cluster.is_running:
+            return
+
+        cluster.process.terminate()
+        try:
+            await asyncio.wait_for(cluster.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            cluster.process.kill()
+            await cluster.process.wait()
+
+    async def run(self) -> None:
+        """
+        Runs the clusters until the launcher is cancelled or terminated
+        """
+        server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_MESSAGE_SIZE
+        )
+        loop = asyncio.get_event_loop()
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        logger.info(
+            "Running %s shards across %s clusters", self.shard_count, len(self.clusters)
+        )
+
+        watcher = loop.create_task(self._watch())
+        try:
+            # Started one after the other so the clusters don't identify
+            # their shards at the same time
+            for cluster in self.clusters.values():
+                await self.start_cluster(cluster)
+                try:
+                    await asyncio.wait_for(cluster.ready.wait(), self.startup_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning("Cluster %s isn't ready", cluster.cluster_id)
+
+            await watcher
+        finally:
+            watcher.cancel()
+            server.close()
+            await asyncio.gather(
+                *(self.stop_cluster(cluster) for cluster in self.clusters.values())
+            )
+            loop.remove_signal_handler(signal.SIGTERM)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(5)
+            now = time.monotonic()
+
+            for cluster in self.clusters.values():
+                if cluster.process is None:
+                    continue
+
+                if not cluster.is_running:
+                    if cluster.restart_at is None:
+                        # Backs off from the clusters failing right away
+                        delay = min(2**cluster.restarts, 300)
+                        cluster.restart_at = now + delay
+                        logger.error(
+                            "Cluster %s exited with %s, restarting in %ss",
+                            cluster.cluster_id,
+                            cluster.process.returncode,
+                            delay,
+                        )
+                    elif now >= cluster.restart_at:
+                        cluster.restarts += 1
+                        await self.start_cluster(cluster)
+                    continue
+
+                last_seen = cluster.reported_at or cluster.started_at
+                timeout = (
+                    self.health_timeout if cluster.reported_at else self.startup_timeout
+                )
+                if now - last_seen > timeout:
+                    logger.error(
+                        "Cluster %s stopped reporting its health, stopping it",
+                        cluster.cluster_id,
+                    )
+                    await self.stop_cluster(cluster)
+
+            if now - self._logged_at > self.log_interval:
+                self._logged_at = now
+                self._log_health()
+
+    def _log_health(self) -> None:
+        for cluster in self.clusters.values():
+            status = cluster.status()
+            logger.info(
+                "Cluster %s: running=%s guilds=%s loop_lag=%s restarts=%s",
+                cluster.cluster_id,
+                status["running"],
+                status.get("guilds"),
+                status.get("loop_lag"),
+                status["restarts"],
+            )
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            identify = await asyncio.wait_for(read_message(reader), 10)
+        except (asyncio.TimeoutError, OSError, ValueError):
+            identify = None
+
+        if (
+            not isinstance(identify, dict)
+            or identify.get("op") != "identify"
+            or not secrets.compare_digest(str(identify.get("secret")), self.secret)
+            or identify.get("cluster_id") not in self.clusters
+        ):
+            logger.warning("Rejected an IPC connection")
+            writer.close()
+            return
+
+        cluster = self.clusters[identify["cluster_id"]]
+        if cluster.writer is not None:
+            cluster.writer.close()
+        cluster.writer = writer
+
+        try:
+            while (message := await read_message(reader)) is not None:
+                if message["op"] == "health":
+                    cluster.health = message["health"]
+                    cluster.reported_at = time.monotonic()
+                    if cluster.health.get("ready"):
+                        cluster.ready.set()
+                elif message["op"] == "request":
+                    asyncio.get_event_loop().create_task(self._route(cluster, message))
+                elif message["op"] == "response":
+                    future = self._responses.get(message["id"])
+                    if future is not None and not future.done():
+                        future.set_result(
+                            {
+                                key: value
+                                for key, value in message.items()
+                                if key in ("result", "error")
+                            }
+                        )
+        except (OSError, ValueError):
+            logger.warning("Lost the connection to cluster %s", cluster.cluster_id)
+        finally:
+            if cluster.writer is writer:
+                cluster.writer = None
+            writer.close()
+
+    async def _route(self, origin: Cluster, request: dict) -> None:
+        target = request["target"]
+
+        if target == "launcher":
+            results = {"launcher": self._answer(request)}
+        else:
+            clusters = (
+                self.clusters.values()
+                if target == "all"
+                else [self.clusters[target]] if target in self.clusters else []
+            )
+            results = await self.broadcast(
+                request["method"], request["args"], clusters, request["timeout"]
+            )
+
+        if origin.writer is not None:
+            try:
+                await write_message(
+                    origin.writer,
+                    {"op": "response", "id": request["id"], "results": results},
+                )
+            except OSError:
+                pass
+
+    def _answer(self, request: dict) -> dict:
+        """
+        Answers the requests sent to the launcher itself
+        """
+        if request["method"] == "health":
+            return {
+                "result": {
+                    str(cluster_id): cluster.status()
+                    for cluster_id, cluster in self.clusters.items()
+                }
+            }
+        return {"error": f"Unknown method {request['method']}"}
+
+    async def broadcast(
+        self, method: str, args: dict, clusters: Iterable[Cluster], timeout: float
+    ) -> dict[str, dict]:
+        """
+        Sends a request to the clusters and returns their responses
+        by cluster id, the clusters which don't answer in time
+        are reported as timed out
+        """
+        loop = asyncio.get_event_loop()
+        results: dict[str, dict] = {}
+        pending: dict[int, tuple[int, asyncio.Future]] = {}
+
+        for cluster in clusters:
+            if cluster.writer is None:
+                results[str(cluster.cluster_id)] = {"error": "Not connected"}
+                continue
+
+            request_id = next(self._ids)
+            future = self._responses[request_id] = loop.create_future()
+            pending[cluster.cluster_id] = request_id, future
+            try:
+                await write_message(
+                    cluster.writer,
+                    {"op": "request", "id": request_id, "method": method, "args": args},
+                )
+            except OSError:
+                future.set_result({"error": "Not connected"})
+
+        if pending:
+            await asyncio.wait(
+                [future for _, future in pending.values()], timeout=timeout
+            )
+
+        for cluster_id, (request_id, future) in pending.items():
+            self._responses.pop(request_id, None)
+            if future.done():
+                results[str(cluster_id)] = future.result()
+            else:
+                future.cancel()
+                results[str(cluster_id)] = {"error": "Timed out"}
+
+        return results
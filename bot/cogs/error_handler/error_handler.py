@@ -4,6 +4,7 @@ This Cog is used for handling errors
 
 import contextlib
 import re
+import sys
 import traceback
 
 import discord
@@ -12,7 +13,8 @@ from discord.ext import commands
 from bot.utils.bettercog import BetterCog
 
 from ...core import Bot
-from .utils.error_to_embed import error_to_embed
+from ...core.metrics import COMMAND_ERRORS
+from .utils.error_reporter import ErrorReporter
 
 
 class ErrorHandler(BetterCog):
@@ -22,19 +24,25 @@ class ErrorHandler(BetterCog):
 
     def __init__(self, bot: Bot) -> None:
         super().__init__(bot, cog_hidden=True)
+        self.reporter = ErrorReporter(self._send_report)
+
+    def cog_unload(self) -> None:
+        self.bot.loop.create_task(self.reporter.close())
+
+    async def _send_report(self, embeds: list[discord.Embed]) -> None:
+        await self.bot.log_webhook.send(embeds=embeds)
 
     @commands.Cog.listener()
     async def on_error(self, event_method: str, **_) -> None:
         """
         This is invoked when an error is raised in the bot
         """
-        embeds = error_to_embed()
         context_embed = discord.Embed(
             title="Context",
             description=f"**Event**: {event_method}",
             color=discord.Color.red(),
         )
-        await self.bot.log_webhook.send(embeds=[*embeds, context_embed])
+        self.reporter.report(sys.exc_info()[1], "Event error", [context_embed])
 
     @commands.Cog.listener()
     async def on_command_error(
@@ -46,6 +54,12 @@ class ErrorHandler(BetterCog):
         if isinstance(error, commands.CommandNotFound):
             return
 
+        if ctx.command is not None:
+            COMMAND_ERRORS.inc(
+                command=ctx.command.qualified_name,
+                error=type(getattr(error, "original", error)).__name__,
+            )
+
         # pylint: disable=R1705
         if not isinstance(error, commands.CommandInvokeError):
             if isinstance(error, commands.BotMissingPermissions):
@@ -92,13 +106,11 @@ class ErrorHandler(BetterCog):
         with contextlib.suppress(discord.NotFound, discord.Forbidden):
             await ctx.send(embed=embed)
 
-        traceback_embeds = error_to_embed(error)
-
         # Add message content
         info_embed = discord.Embed(
             title="Message content",
             description="```\n"
-            + discord.utils.escape_markdown(ctx.message.content)
+            + discord.utils.escape_markdown(ctx.message.content[:1000])
             + "\n```",
             color=discord.Color.red(),
         )
@@ -140,9 +152,11 @@ class ErrorHandler(BetterCog):
 
         info_embed.add_field(name="User", value=value)
 
-        await self.bot.log_webhook.send(
-            content="---------------\n\n**NEW ERROR**\n\n---------------",
-            embeds=[*traceback_embeds, info_embed],
+        # Reported in the background so the command isn't held up by the webhook
+        self.reporter.report(
+            getattr(error, "original", error),
+            f"Error in {ctx.command.qualified_name}",
+            [info_embed],
         )
 
 
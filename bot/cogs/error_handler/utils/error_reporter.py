@@ -0,0 +1,176 @@
+"""
+This module queues up errors and reports them through
+the log webhook in the background
+"""
+
+import asyncio
+import logging
+import time
+import traceback
+from collections import Counter, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from discord import Color, Embed
+
+from bot.utils.webhook import batch_embeds
+
+from .error_to_embed import error_to_embed
+
+logger = logging.getLogger("bot.error_reporter")
+
+Fingerprint = Tuple[str, ...]
+
+
+def fingerprint(error: Optional[BaseException], frames: int = 3) -> Fingerprint:
+    """
+    Identifies an error by its type and the innermost frames
+    of its traceback
+    """
+    if error is None:
+        return ("None",)
+
+    stack = traceback.extract_tb(error.__traceback__)[-frames:]
+    return (
+        f"{type(error).__module__}.{type(error).__qualname__}",
+        *(f"{frame.filename}:{frame.lineno}:{frame.name}" for frame in stack),
+    )
+
+
+class ErrorReport:
+    """
+    This is a report of an error along with how many times it repeated
+    """
+
+    __slots__ = ("fingerprint", "title", "embeds", "first_seen", "count", "reported")
+
+    def __init__(self, fingerprint_: Fingerprint, title: str, embeds: List[Embed]):
+        self.fingerprint = fingerprint_
+        self.title = title
+        self.embeds = embeds
+        self.first_seen = time.monotonic()
+        self.count = 1
+        self.reported = 0
+
+    def to_embeds(self) -> List[Embed]:
+        """
+        Returns the embeds of the report, headed by the repetitions
+        """
+        repeats = self.count - self.reported
+        self.reported = self.count
+
+        header = Embed(title=self.title, color=Color.red())
+        if repeats > 1:
+            header.description = f"Occurred **{repeats}** times"
+        return [header, *self.embeds]
+
+    def to_summary(self, window: float) -> Embed:
+        """
+        Returns an embed counting the repetitions since the report was sent
+        """
+        repeats = self.count - self.reported
+        self.reported = self.count
+
+        return Embed(
+            title=self.title,
+            description=(
+                f"Repeated **{repeats}** more times in the last {window:.0f}s\n"
+                f"```\n{self.fingerprint[-1]}\n```"
+            ),
+            color=Color.orange(),
+        )
+
+
+class ErrorReporter:
+    """
+    This is a bounded background queue of error reports, the repeats of an
+    error within `window` seconds are merged into its report
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[Embed]], Awaitable[None]],
+        maxsize: int = 100,
+        window: float = 60.0,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self._send = send
+        self.maxsize = maxsize
+        self.window = window
+        self.flush_interval = flush_interval
+        self._pending: Deque[ErrorReport] = deque()
+        self._summaries: Deque[Embed] = deque()
+        self._recent: Dict[Fingerprint, ErrorReport] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Counter = Counter(reported=0, merged=0, dropped=0, failed=0)
+
+    def report(
+        self,
+        error: Optional[BaseException],
+        title: str = "Error",
+        context: Optional[List[Embed]] = None,
+    ) -> None:
+        """
+        Queues up the error without waiting for it to be sent
+        """
+        key = fingerprint(error)
+
+        if (report := self._recent.get(key)) is not None:
+            report.count += 1
+            self.stats["merged"] += 1
+            return
+
+        if len(self._pending) >= self.maxsize:
+            self.stats["dropped"] += 1
+            return
+
+        # The embeds are built right away as the traceback changes once handled
+        report = ErrorReport(key, title, [*error_to_embed(error), *(context or [])])
+        self._recent[key] = report
+        self._pending.append(report)
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _expire(self, now: float) -> None:
+        for key, report in list(self._recent.items()):
+            if now - report.first_seen < self.window:
+                continue
+
+            del self._recent[key]
+            # Repeats after the report went out get a summary of their own
+            if report.count > report.reported and report not in self._pending:
+                self._summaries.append(report.to_summary(self.window))
+
+    async def flush(self, final: bool = False) -> None:
+        """
+        Sends the queued reports in as few webhook messages as possible
+        """
+        self._expire(float("inf") if final else time.monotonic())
+
+        embeds: List[Embed] = []
+        while self._pending:
+            embeds.extend(self._pending.popleft().to_embeds())
+            self.stats["reported"] += 1
+        while self._summaries:
+            embeds.append(self._summaries.popleft())
+
+        for batch in batch_embeds(embeds):
+            try:
+                await self._send(batch)
+            except Exception:  # pylint: disable=W0703
+                self.stats["failed"] += 1
+                logger.exception("Failed to send an error report")
+
+    async def close(self) -> None:
+        """
+        Stops the background task and sends what is left
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush(final=True)
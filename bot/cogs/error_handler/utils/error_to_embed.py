@@ -8,6 +8,10 @@ from typing import List
 
 from discord import Color, Embed
 
+# Longer tracebacks keep their end, which is where the error is raised
+MAX_TRACEBACK_LENGTH = 3980
+CHUNK_LENGTH = 1990
+
 
 def error_to_embed(error: Exception = None) -> List[Embed]:
     """
@@ -19,11 +23,14 @@ def error_to_embed(error: Exception = None) -> List[Embed]:
         else traceback.format_exc()
     )
 
+    if len(traceback_text) > MAX_TRACEBACK_LENGTH:
+        traceback_text = "...\n" + traceback_text[-(MAX_TRACEBACK_LENGTH - 4) :]
+
     length: int = len(traceback_text)
-    chunks: int = math.ceil(length / 1990)
+    chunks: int = math.ceil(length / CHUNK_LENGTH)
 
     traceback_texts: List[str] = [
-        traceback_text[l * 1990 : (l + 1) * 1990] for l in range(chunks)
+        traceback_text[l * CHUNK_LENGTH : (l + 1) * CHUNK_LENGTH] for l in range(chunks)
     ]
     return [
         Embed(
@@ -1,4 +1,8 @@
+import asyncio
+import contextlib
 import datetime as dt
+import math
+import time
 from typing import Any, Optional, Union
 
 import discord
@@ -6,55 +10,201 @@ import wavelink
 from discord.ext import commands
 
 from ...core import Bot
+from ...core.rate_limit import RateLimit, rate_limit
 from ...utils.bettercog import BetterCog
 from .utils import (
-    HZ_BANDS,
-    LYRICS_URL,
+    BULK_CONCURRENCY,
+    BULK_MAX_QUERIES,
+    BULK_PROGRESS_INTERVAL,
+    EQ_PRESETS,
+    PAGE_OPTIONS,
+    QUEUE_PAGE_SIZE,
     TIME_REGEX,
     URL_REGEX,
-    EQGainOutOfBounds,
+    IdleReaper,
+    InvalidEQBandGain,
     InvalidEQPreset,
     InvalidRepeatMode,
     InvalidTimeString,
+    LyricsService,
     MaxVolume,
     MinVolume,
     NoLyricsFound,
     NoMoreTracks,
-    NonExistentEQBand,
     NoPreviousTracks,
+    NoTracksFound,
     Player,
     PlayerIsAlreadyPaused,
     QueueIsEmpty,
+    QueuePersister,
     RepeatMode,
+    TooManyQueries,
+    TrackSearchCache,
     VolumeTooHigh,
     VolumeTooLow,
+    parse_band_gains,
 )
 
 
 class Music(BetterCog, wavelink.WavelinkMixin):
     def __init__(self, bot: Bot):
-        super().__init__(bot)
+        # Keeps a single user from flooding lavalink through any command
+        super().__init__(bot, rate_limits=(RateLimit(10, 10, scope="user"),))
         self.wavelink = bot.wavelink_client
 
+        config = bot.config.track_search_cache
+        self.search_cache = TrackSearchCache(
+            self.wavelink,
+            maxsize=config.maxsize,
+            ttl=config.ttl,
+            disk_path=config.disk_path,
+            disk_ttl=config.disk_ttl,
+        )
+        self.lyrics = LyricsService(lambda: self.bot.session)
+
+        self.listeners: dict[int, int] = {}
+        self.reaper = IdleReaper(bot.config.player_idle_timeout, self.reap_player)
+
+        self.persister = None
+        self._players_resumed = False
+        self._resume_task: Optional[asyncio.Task] = None
+        if config := bot.config.queue_store:
+            self.persister = QueuePersister.from_config(config)
+
+    def cog_unload(self):
+        if self._resume_task is not None:
+            self._resume_task.cancel()
+        self.reaper.stop()
+        self.lyrics.close()
+        self.bot.loop.create_task(self.search_cache.close())
+        if self.persister is not None:
+            self.bot.loop.create_task(self.persister.stop())
+
+    def _is_own_guild(self, guild_id: int) -> bool:
+        """Returns whether the guild belongs to the shards of this process"""
+        if not (shard_count := self.bot.shard_count):
+            return True
+        shard_ids = getattr(self.bot, "shard_ids", None) or [self.bot.shard_id or 0]
+        return (guild_id >> 22) % shard_count in shard_ids
+
+    async def resume_players(self):
+        # Guilds are only cached once the bot is ready
+        await self.bot.wait_until_ready()
+        if self.persister.config.backend == "database":
+            await self.bot.db_ready.wait()
+
+        for snapshot in await self.persister.store.load_all():
+            if (guild := self.bot.get_guild(snapshot.guild_id)) is None:
+                # The bot has left the guild since
+                if self._is_own_guild(snapshot.guild_id):
+                    self.persister.forget(snapshot.guild_id)
+                continue
+            if guild.unavailable:
+                continue
+
+            try:
+                await self.get_player(guild).resume(snapshot)
+            except Exception:  # pylint: disable=W0703
+                self.logger.exception("Couldn't resume the player of %s", guild.id)
+
+        self.persister.start()
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        if not member.bot and after.channel is None:
-            if not [m for m in before.channel.members if not m.bot]:
-                await self.get_player(member.guild).teardown()
+        if before.channel == after.channel:
+            return
+
+        guild = member.guild
+        if member == guild.me:
+            # Only counted in full when the bot itself joins or moves
+            if after.channel is None:
+                self.listeners.pop(guild.id, None)
+            else:
+                self.listeners[guild.id] = sum(not m.bot for m in after.channel.members)
+
+        elif not member.bot and guild.me.voice is not None:
+            channel = guild.me.voice.channel
+            if guild.id not in self.listeners:
+                # The member is already in or out of the channel in the cache
+                self.count_listeners(guild)
+            elif before.channel == channel:
+                self.listeners[guild.id] -= 1
+            elif after.channel == channel:
+                self.listeners[guild.id] += 1
+
+        self.update_idle(guild.id)
+
+    def find_player(self, guild_id: int) -> Optional[Player]:
+        # Doesn't create the player like `get_player`
+        for node in self.wavelink.nodes.values():
+            if (player := node.players.get(guild_id)) is not None:
+                return player
+        return None
+
+    def count_listeners(self, guild: discord.Guild) -> int:
+        """
+        Returns the listeners in the bot's voice channel, they're counted from
+        the channel when unknown, as after a reload or for resumed players
+        """
+        if (listeners := self.listeners.get(guild.id)) is not None:
+            return listeners
+        if guild.me.voice is None:
+            return 0
+
+        listeners = sum(not m.bot for m in guild.me.voice.channel.members)
+        self.listeners[guild.id] = listeners
+        return listeners
+
+    def is_idle(self, player: Player) -> bool:
+        if not player.is_playing:
+            return True
+        guild = self.bot.get_guild(player.guild_id)
+        return guild is None or not self.count_listeners(guild)
+
+    def update_idle(self, guild_id: int):
+        if (player := self.find_player(guild_id)) is None:
+            self.reaper.cancel(guild_id)
+        elif self.is_idle(player):
+            self.reaper.schedule(guild_id)
+        else:
+            self.reaper.cancel(guild_id)
+
+    async def reap_player(self, guild_id: int):
+        if (player := self.find_player(guild_id)) is not None and self.is_idle(player):
+            self.logger.info("Disconnecting the idle player of %s", guild_id)
+            self.listeners.pop(guild_id, None)
+            await player.teardown()
 
     @wavelink.WavelinkMixin.listener()
     async def on_node_ready(self, node):
         print(f" Wavelink node `{node.identifier}` ready.")
 
+        # Players are resumed once the first node can take them
+        if self.persister is not None and not self._players_resumed:
+            self._players_resumed = True
+            self._resume_task = self.bot.loop.create_task(self.resume_players())
+
+    # Exceptions aren't listened to as lavalink ends the track right after
     @wavelink.WavelinkMixin.listener("on_track_stuck")
     @wavelink.WavelinkMixin.listener("on_track_end")
-    @wavelink.WavelinkMixin.listener("on_track_exception")
     async def on_player_stop(self, _: wavelink.Node, payload: Any):
+        # Replaced tracks end once the next one is already playing
+        if isinstance(payload, wavelink.TrackEnd) and (
+            payload.reason == "REPLACED" or payload.player.ended_by_handoff
+        ):
+            return
+
         if payload.player.queue.repeat_mode == RepeatMode.ONE:
             await payload.player.repeat_track()
         else:
             await payload.player.advance()
 
+        self.update_idle(payload.player.guild_id)
+
+    @wavelink.WavelinkMixin.listener()
+    async def on_track_start(self, _: wavelink.Node, payload: wavelink.TrackStart):
+        self.update_idle(payload.player.guild_id)
+
     async def cog_check(self, ctx: commands.Context):
         if isinstance(ctx.channel, discord.DMChannel):
             await ctx.send("Music commands are not available in DMs.")
@@ -63,10 +213,36 @@ class Music(BetterCog, wavelink.WavelinkMixin):
         return True
 
     def get_player(self, obj: Union[discord.Guild, commands.Context]):
+        guild = obj.guild if isinstance(obj, commands.Context) else obj
+        # New players are reaped too unless they start playing
+        if self.find_player(guild.id) is None:
+            self.reaper.schedule(guild.id)
+
         if isinstance(obj, commands.Context):
-            return self.wavelink.get_player(obj.guild.id, cls=Player, context=obj)
+            return self.wavelink.get_player(
+                obj.guild.id,
+                cls=Player,
+                node_id=self.select_node_id(obj.guild),
+                context=obj,
+                lyrics=self.lyrics,
+                persister=self.persister,
+            )
         elif isinstance(obj, discord.Guild):
-            return self.wavelink.get_player(obj.id, cls=Player)
+            return self.wavelink.get_player(
+                obj.id,
+                cls=Player,
+                node_id=self.select_node_id(obj),
+                lyrics=self.lyrics,
+                persister=self.persister,
+            )
+
+    def select_node_id(self, guild: discord.Guild) -> Optional[str]:
+        # Existing players stay on their node
+        if guild.id in self.wavelink.players:
+            return None
+
+        node = self.bot.lavalink_pool.select_node_for_guild(guild)
+        return node.identifier if node else None
 
     @commands.command(name="connect", aliases=["join"])
     async def connect_command(
@@ -83,6 +259,7 @@ class Music(BetterCog, wavelink.WavelinkMixin):
         await ctx.send("Disconnected.")
 
     @commands.command(name="play", aliases=["p"])
+    @rate_limit(5, 10)
     async def play_command(self, ctx: commands.Context, *, query: Optional[str]):
         player: Player = self.get_player(ctx)
 
@@ -97,11 +274,132 @@ class Music(BetterCog, wavelink.WavelinkMixin):
             await ctx.send("Playback resumed.")
 
         else:
-            query = query.strip("<>")
-            if not URL_REGEX.match(query):
-                query = f"ytsearch:{query}"
+            await player.add_tracks(
+                ctx, await self.search_cache.get_tracks(self.search_query(query))
+            )
+
+    @commands.command(name="playmany", aliases=["pm", "bulkplay"])
+    @rate_limit(2, 30)
+    async def playmany_command(self, ctx: commands.Context, *, queries: str):
+        if not (queries := self.split_queries(queries)):
+            raise NoTracksFound()
+
+        if len(queries) > BULK_MAX_QUERIES:
+            raise TooManyQueries(
+                f"At most {BULK_MAX_QUERIES} queries can be added at once."
+            )
+
+        player: Player = self.get_player(ctx)
+
+        if not player.is_connected:
+            await player.connect(ctx)
+
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def resolve(query: str):
+            async with semaphore:
+                return await self.search_cache.get_tracks(self.search_query(query))
+
+        # Every lookup starts right away, the semaphore bounds how many hit lavalink
+        lookups = [asyncio.create_task(resolve(query)) for query in queries]
+        msg = await ctx.send(f"Resolving {len(queries)} queries...")
+        added = failed = 0
+        last_edit = time.monotonic()
+
+        try:
+            # Awaited in order so the queue keeps the order of the queries
+            for resolved, (query, lookup) in enumerate(zip(queries, lookups), 1):
+                try:
+                    result = await lookup
+                except Exception:  # pylint: disable=W0703
+                    self.logger.warning("Couldn't resolve %r", query, exc_info=True)
+                    result = None
+
+                if not result:
+                    failed += 1
+                    continue
+
+                tracks = (
+                    result.tracks
+                    if isinstance(result, wavelink.TrackPlaylist)
+                    else result[:1]
+                )
+                await player.enqueue(*tracks)
+                added += len(tracks)
+
+                if time.monotonic() - last_edit >= BULK_PROGRESS_INTERVAL:
+                    last_edit = time.monotonic()
+                    await msg.edit(
+                        content=(
+                            f"Resolved {resolved}/{len(queries)} queries, "
+                            f"added {added} tracks to the queue..."
+                        )
+                    )
+        finally:
+            for lookup in lookups:
+                lookup.cancel()
+
+        await msg.edit(
+            content=(
+                f"Added {added} tracks to the queue"
+                + (f", {failed} queries had no results." if failed else ".")
+            )
+        )
+
+    @staticmethod
+    def split_queries(queries: str) -> list[str]:
+        split = []
+        for line in queries.splitlines():
+            # Lines of links are split on spaces, other lines are one search
+            words = [word.strip("<>") for word in line.split()]
+            if words and all(URL_REGEX.match(word) for word in words):
+                split.extend(words)
+            elif line := line.strip():
+                split.append(line)
+        return split
+
+    @staticmethod
+    def search_query(query: str) -> str:
+        query = query.strip("<>")
+        if not URL_REGEX.match(query):
+            query = f"ytsearch:{query}"
+        return query
+
+    @commands.group(name="searchcache", invoke_without_command=True, hidden=True)
+    @commands.is_owner()
+    async def searchcache_group(self, ctx: commands.Context):
+        stats = self.search_cache.stats
+        await ctx.send(
+            f"**Entries**: {len(self.search_cache)}\n"
+            f"**Hit rate**: {self.search_cache.hit_rate:.1%}\n"
+            f"**Memory hits**: {stats['memory_hit']}\n"
+            f"**Disk hits**: {stats['disk_hit']}\n"
+            f"**Misses**: {stats['miss']}"
+        )
 
-            await player.add_tracks(ctx, await self.wavelink.get_tracks(query))
+    @searchcache_group.command(name="purge")
+    @commands.is_owner()
+    async def searchcache_purge_command(
+        self, ctx: commands.Context, *, query: Optional[str]
+    ):
+        await self.search_cache.purge(query and self.search_query(query))
+        await ctx.send("Search cache purged.")
+
+    @commands.command(name="transitions", hidden=True)
+    @commands.is_owner()
+    async def transitions_command(self, ctx: commands.Context):
+        player = self.get_player(ctx)
+
+        if (stats := player.transition_stats) is None:
+            return await ctx.send("No track transitions measured yet.")
+
+        await ctx.send(
+            f"**Samples**: {stats['samples']}\n"
+            f"**Last**: {stats['last'] * 1000:.0f}ms\n"
+            f"**Median**: {stats['median'] * 1000:.0f}ms\n"
+            f"**P95**: {stats['p95'] * 1000:.0f}ms\n"
+            f"**Max**: {stats['max'] * 1000:.0f}ms"
+        )
 
     @commands.command(name="pause")
     async def pause_command(self, ctx: commands.Context):
@@ -157,15 +455,53 @@ class Music(BetterCog, wavelink.WavelinkMixin):
         await ctx.send(f"The repeat mode has been set to {mode}.")
 
     @commands.command(name="queue")
-    async def queue_command(self, ctx: commands.Context, show: Optional[int] = 10):
+    async def queue_command(self, ctx: commands.Context, page: Optional[int] = 1):
         player = self.get_player(ctx)
 
         if player.queue.is_empty:
             raise QueueIsEmpty
 
+        pages = max(math.ceil(len(player.queue.upcoming) / QUEUE_PAGE_SIZE), 1)
+        page = min(max(page, 1), pages)
+        msg = await ctx.send(embed=self.queue_page_embed(ctx, player, page, pages))
+
+        if pages == 1:
+            return
+
+        for emoji in PAGE_OPTIONS:
+            await msg.add_reaction(emoji)
+
+        def _check(r, u):
+            return (
+                r.emoji in PAGE_OPTIONS and u == ctx.author and r.message.id == msg.id
+            )
+
+        while True:
+            try:
+                reaction, user = await self.bot.wait_for(
+                    "reaction_add", timeout=60.0, check=_check
+                )
+            except asyncio.TimeoutError:
+                with contextlib.suppress(discord.Forbidden, discord.NotFound):
+                    await msg.clear_reactions()
+                return
+
+            # The queue could have changed while paginating
+            if player.queue.is_empty:
+                return
+            pages = max(math.ceil(len(player.queue.upcoming) / QUEUE_PAGE_SIZE), 1)
+            page = min(max(page + PAGE_OPTIONS[reaction.emoji], 1), pages)
+            await msg.edit(embed=self.queue_page_embed(ctx, player, page, pages))
+            with contextlib.suppress(discord.Forbidden, discord.NotFound):
+                await msg.remove_reaction(reaction.emoji, user)
+
+    @staticmethod
+    def queue_page_embed(
+        ctx: commands.Context, player: Player, page: int, pages: int
+    ) -> discord.Embed:
         embed = discord.Embed(
             title="Queue",
-            description=f"Showing up to next {show} tracks",
+            description=f"Page {page}/{pages}",
             colour=ctx.author.colour,
             timestamp=dt.datetime.utcnow(),
         )
@@ -181,14 +517,19 @@ class Music(BetterCog, wavelink.WavelinkMixin):
             ),
             inline=False,
         )
-        if upcoming := player.queue.upcoming:
+
+        # Only the tracks of the page are copied out of the queue
+        start = (page - 1) * QUEUE_PAGE_SIZE
+        if tracks := player.queue.upcoming[start : start + QUEUE_PAGE_SIZE]:
             embed.add_field(
                 name="Next up",
-                value="\n".join(t.title for t in upcoming[:show]),
+                value="\n".join(
+                    f"**{start + i + 1}.** {t.title}" for i, t in enumerate(tracks)
+                ),
                 inline=False,
             )
 
-        await ctx.send(embed=embed)
+        return embed
 
     @commands.group(name="volume", invoke_without_command=True)
     async def volume_group(self, ctx: commands.Context, volume: int):
@@ -224,59 +565,50 @@ class Music(BetterCog, wavelink.WavelinkMixin):
         await ctx.send(f"Volume set to {value:,}%")
 
     @commands.command(name="lyrics")
+    @rate_limit(3, 30)
+    @rate_limit(60, 60, scope="global")
     async def lyrics_command(self, ctx: commands.Context, name: Optional[str]):
         player = self.get_player(ctx)
+        player.wants_lyrics = True
         name = name or player.queue.current_track.title
 
         async with ctx.typing():
-            async with self.bot.session.get(LYRICS_URL + name) as r:
-                if not 200 <= r.status <= 299:
-                    raise NoLyricsFound()
+            if (data := await self.lyrics.get(name)) is None:
+                raise NoLyricsFound()
 
-                data = await r.json()
+            if len(data["lyrics"]) > 2000:
+                return await ctx.send(f"<{data['links']['genius']}>")
 
-                if len(data["lyrics"]) > 2000:
-                    return await ctx.send(f"<{data['links']['genius']}>")
-
-                embed = discord.Embed(
-                    title=data["title"],
-                    description=data["lyrics"],
-                    colour=ctx.author.colour,
-                    timestamp=dt.datetime.utcnow(),
-                )
-                embed.set_thumbnail(url=data["thumbnail"]["genius"])
-                embed.set_author(name=data["author"])
-                await ctx.send(embed=embed)
+            embed = discord.Embed(
+                title=data["title"],
+                description=data["lyrics"],
+                colour=ctx.author.colour,
+                timestamp=dt.datetime.utcnow(),
+            )
+            embed.set_thumbnail(url=data["thumbnail"]["genius"])
+            embed.set_author(name=data["author"])
+            await ctx.send(embed=embed)
 
     @commands.command(name="eq")
+    @rate_limit(3, 10)
     async def eq_command(self, ctx, preset: str):
         player = self.get_player(ctx)
 
-        eq = getattr(wavelink.eqs.Equalizer, preset, None)
-        if not eq:
+        if (preset := preset.lower()) not in EQ_PRESETS:
             raise InvalidEQPreset()
 
-        await player.set_eq(eq())
+        await player.set_preset(preset)
         await ctx.send(f"Equaliser adjusted to the {preset} preset.")
 
     @commands.command(name="adveq", aliases=["aeq"])
-    async def adveq_command(self, ctx, band: int, gain: float):
+    @rate_limit(3, 10)
+    async def adveq_command(self, ctx, *band_gains: str):
         player = self.get_player(ctx)
 
-        if not 1 <= band <= 15 and band not in HZ_BANDS:
-            raise NonExistentEQBand
+        if not band_gains:
+            raise InvalidEQBandGain("Give the bands to adjust like `63=+3 1000=-2`")
 
-        if band > 15:
-            band = HZ_BANDS.index(band) + 1
-
-        if abs(gain) > 10:
-            raise EQGainOutOfBounds
-
-        player.eq_levels[band - 1] = gain / 10
-        eq = wavelink.eqs.Equalizer(
-            levels=[(i, gain) for i, gain in enumerate(player.eq_levels)]
-        )
-        await player.set_eq(eq)
+        player.update_eq(parse_band_gains(band_gains))
         await ctx.send("Equaliser adjusted.")
 
     @commands.command(name="playing", aliases=["np"])
@@ -338,6 +670,7 @@ class Music(BetterCog, wavelink.WavelinkMixin):
         await ctx.send("Track restarted.")
 
     @commands.command(name="seek")
+    @rate_limit(5, 10)
     async def seek_command(self, ctx, position: str):
         player = self.get_player(ctx)
 
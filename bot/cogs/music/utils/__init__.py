@@ -1,4 +1,9 @@
+from .eq import EQ_PRESETS, parse_band_gains
 from .errors import *
+from .idle import IdleReaper
+from .lyrics import LyricsService
+from .persistence import QueuePersister
 from .player import Player
 from .queue import Queue
+from .search_cache import TrackSearchCache
 from .types import *
@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+import wavelink
+
+from .errors import EQGainOutOfBounds, InvalidEQBandGain, NonExistentEQBand
+from .types import HZ_BANDS
+
+# Built once and shared by every player
+EQ_PRESETS = {
+    name: getattr(wavelink.Equalizer, name)()
+    for name in ("flat", "boost", "metal", "piano")
+}
+PRESET_LEVELS = {
+    name: [defaultdict(float, eq.raw)[band] for band in range(len(HZ_BANDS))]
+    for name, eq in EQ_PRESETS.items()
+}
+
+
+def parse_band(band: str) -> int:
+    """Returns the index of a band given by its number or frequency"""
+    try:
+        band = int(band.lower().removesuffix("hz"))
+    except ValueError as error:
+        raise NonExistentEQBand() from error
+
+    if 1 <= band <= len(HZ_BANDS):
+        return band - 1
+    if band in HZ_BANDS:
+        return HZ_BANDS.index(band)
+
+    raise NonExistentEQBand()
+
+
+def parse_gain(gain: str) -> float:
+    try:
+        gain = float(gain)
+    except ValueError as error:
+        raise InvalidEQBandGain(f"`{gain}` is not a gain") from error
+
+    if abs(gain) > 10:
+        raise EQGainOutOfBounds()
+
+    return gain / 10
+
+
+def parse_band_gains(args: tuple[str, ...]) -> dict[int, float]:
+    """
+    Parses `band=gain` pairs such as `63=+3 1000=-2`, the old
+    `band gain` form is still accepted
+    """
+    if len(args) == 2 and not any("=" in arg for arg in args):
+        args = (f"{args[0]}={args[1]}",)
+
+    gains = {}
+    for arg in args:
+        band, sep, gain = arg.partition("=")
+        if not sep:
+            raise InvalidEQBandGain(f"`{arg}` should look like `band=gain`")
+        gains[parse_band(band)] = parse_gain(gain)
+
+    return gains
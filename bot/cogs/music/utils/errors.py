@@ -67,3 +67,11 @@ class EQGainOutOfBounds(commands.CommandError):
 
 class InvalidTimeString(commands.CommandError):
     pass
+
+
+class TooManyQueries(commands.CommandError):
+    pass
+
+
+class InvalidEQBandGain(commands.CommandError):
+    pass
@@ -0,0 +1,80 @@
+import asyncio
+import heapq
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("bot.cogs.music.idle")
+
+
+class IdleReaper:
+    """Calls `on_idle` for guilds which stayed idle for `timeout` seconds"""
+
+    def __init__(self, timeout: float, on_idle: Callable[[int], Awaitable[None]]):
+        self.timeout = timeout
+        self._on_idle = on_idle
+        self._heap: list[tuple[float, int]] = []
+        self._deadlines: dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._deadlines
+
+    def schedule(self, guild_id: int) -> None:
+        """Starts the idle timer of the guild unless it's already running"""
+        if guild_id in self._deadlines:
+            return
+
+        deadline = asyncio.get_event_loop().time() + self.timeout
+        self._deadlines[guild_id] = deadline
+        heapq.heappush(self._heap, (deadline, guild_id))
+
+        # Cancelled timers are left in the heap, it's rebuilt once they pile up
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(d, g) for g, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        elif self._heap[0][1] == guild_id:
+            self._wakeup.set()
+
+    def cancel(self, guild_id: int) -> None:
+        self._deadlines.pop(guild_id, None)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_event_loop()
+
+        while True:
+            delay = None
+
+            while self._heap:
+                deadline, guild_id = self._heap[0]
+                if self._deadlines.get(guild_id) != deadline:
+                    heapq.heappop(self._heap)
+                    continue
+
+                if (delay := deadline - loop.time()) > 0:
+                    break
+
+                heapq.heappop(self._heap)
+                del self._deadlines[guild_id]
+                delay = None
+                try:
+                    await self._on_idle(guild_id)
+                except Exception:  # pylint: disable=W0703
+                    logger.exception("Failed to reap the player of %s", guild_id)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
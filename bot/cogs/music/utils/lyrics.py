@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Callable, Optional
+
+import aiohttp
+from cachetools import TTLCache
+
+from .types import LYRICS_URL
+
+logger = logging.getLogger("bot.cogs.music.lyrics")
+
+
+class LyricsService:
+    """Fetches lyrics with caching, request coalescing and a strict timeout"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], aiohttp.ClientSession],
+        maxsize: int = 500,
+        ttl: float = 24 * 60 * 60,
+        negative_ttl: float = 60 * 60,
+        timeout: float = 5.0,
+    ):
+        self._session_factory = session_factory
+        self._cache = TTLCache(maxsize, ttl)
+        self._negative_cache = TTLCache(maxsize, negative_ttl)
+        self._lookups: dict[str, asyncio.Future] = {}
+        self._prefetches: set[asyncio.Task] = set()
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self.stats: Counter = Counter(hit=0, negative_hit=0, miss=0, coalesced=0)
+
+    @staticmethod
+    def _key(title: str) -> str:
+        return " ".join(title.lower().split())
+
+    async def _request(self, title: str) -> Optional[dict]:
+        async with self._session_factory().get(
+            LYRICS_URL, params={"title": title}, timeout=self._timeout
+        ) as r:
+            if not 200 <= r.status <= 299:
+                return None
+            return await r.json()
+
+    async def get(self, title: str) -> Optional[dict]:
+        key = self._key(title)
+
+        if (data := self._cache.get(key)) is not None:
+            self.stats["hit"] += 1
+            return data
+
+        if key in self._negative_cache:
+            self.stats["negative_hit"] += 1
+            return None
+
+        # Another coroutine is already fetching these lyrics, wait for it
+        if (lookup := self._lookups.get(key)) is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(lookup)
+
+        self.stats["miss"] += 1
+        lookup = asyncio.get_event_loop().create_future()
+        self._lookups[key] = lookup
+
+        try:
+            data = await self._request(title)
+        except asyncio.CancelledError:
+            lookup.cancel()
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            # Failed requests aren't negatively cached so they get retried
+            logger.warning("Lyrics request for %r failed", title, exc_info=True)
+            data = None
+            lookup.set_result(data)
+        except Exception as error:
+            lookup.set_exception(error)
+            # Retrieves the exception so it isn't logged when nobody waits
+            lookup.exception()
+            raise
+        else:
+            if data is not None:
+                self._cache[key] = data
+            else:
+                self._negative_cache[key] = True
+            lookup.set_result(data)
+        finally:
+            del self._lookups[key]
+
+        return data
+
+    def prefetch(self, title: Optional[str]) -> None:
+        """Fetches the lyrics in the background so `get` answers from the cache"""
+        if not title:
+            return
+
+        key = self._key(title)
+        if key in self._cache or key in self._negative_cache or key in self._lookups:
+            return
+
+        task = asyncio.create_task(self.get(title))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetched)
+
+    def _prefetched(self, task: asyncio.Task) -> None:
+        self._prefetches.discard(task)
+        if not task.cancelled() and (error := task.exception()) is not None:
+            logger.error("Prefetching lyrics failed", exc_info=error)
+
+    def close(self) -> None:
+        """Cancels the prefetches still running"""
+        for task in self._prefetches:
+            task.cancel()
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from pydantic import BaseModel
+from tortoise.transactions import in_transaction
+
+from ....core.helpers import QueueStoreConfig
+from ....core.metrics import time_phase
+from ....core.models import PlayerQueueModel
+from .tracks import dump_track
+
+if TYPE_CHECKING:
+    from .player import Player
+
+logger = logging.getLogger("bot.cogs.music.persistence")
+
+
+class QueueSnapshot(BaseModel):
+    """The state of a player needed to resume it"""
+
+    guild_id: int
+    channel_id: int
+    position: int
+    repeat_mode: str
+    track_position: int
+    tracks: list[dict]
+
+    @classmethod
+    def from_player(cls, player: "Player") -> "QueueSnapshot":
+        queue = player.queue
+        return cls(
+            guild_id=player.guild_id,
+            channel_id=player.channel_id,
+            position=queue.position,
+            repeat_mode=queue.repeat_mode.name,
+            track_position=int(player.position),
+            tracks=[dump_track(track) for track in queue.tracks],
+        )
+
+
+class QueueStore(ABC):
+    """This is the base of the backends the snapshots are kept in"""
+
+    @abstractmethod
+    async def load_all(self) -> list[QueueSnapshot]:
+        """Returns every stored snapshot"""
+
+    @abstractmethod
+    async def save_many(self, snapshots: list[QueueSnapshot]) -> None:
+        """Stores the snapshots, replacing the ones of the same guilds"""
+
+    @abstractmethod
+    async def delete_many(self, guild_ids: list[int]) -> None:
+        """Removes the snapshots of the guilds"""
+
+
+class DatabaseQueueStore(QueueStore):
+    """Stores the snapshots in postgres through tortoise"""
+
+    async def load_all(self) -> list[QueueSnapshot]:
+        return [
+            QueueSnapshot(
+                guild_id=model.id,
+                channel_id=model.channel_id,
+                position=model.position,
+                repeat_mode=model.repeat_mode,
+                track_position=model.track_position,
+                tracks=model.tracks,
+            )
+            for model in await PlayerQueueModel.all()
+        ]
+
+    async def save_many(self, snapshots: list[QueueSnapshot]) -> None:
+        # Replacing the rows keeps a batch at two queries
+        async with in_transaction():
+            await PlayerQueueModel.filter(
+                id__in=[snapshot.guild_id for snapshot in snapshots]
+            ).delete()
+            await PlayerQueueModel.bulk_create(
+                [
+                    PlayerQueueModel(
+                        id=snapshot.guild_id,
+                        channel_id=snapshot.channel_id,
+                        position=snapshot.position,
+                        repeat_mode=snapshot.repeat_mode,
+                        track_position=snapshot.track_position,
+                        tracks=snapshot.tracks,
+                    )
+                    for snapshot in snapshots
+                ]
+            )
+
+    async def delete_many(self, guild_ids: list[int]) -> None:
+        await PlayerQueueModel.filter(id__in=guild_ids).delete()
+
+
+class FileQueueStore(QueueStore):
+    """Stores every snapshot as a json file in a directory"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    def _load_all(self) -> list[QueueSnapshot]:
+        if not self.path.is_dir():
+            return []
+        return [QueueSnapshot.parse_file(file) for file in self.path.glob("*.json")]
+
+    def _save_many(self, snapshots: list[QueueSnapshot]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        for snapshot in snapshots:
+            file = self.path / f"{snapshot.guild_id}.json"
+            # Written to a temporary file first so a crash can't corrupt it
+            temp_file = file.with_suffix(".tmp")
+            temp_file.write_text(json.dumps(snapshot.dict(), separators=(",", ":")))
+            temp_file.replace(file)
+
+    def _delete_many(self, guild_ids: list[int]) -> None:
+        for guild_id in guild_ids:
+            (self.path / f"{guild_id}.json").unlink(missing_ok=True)
+
+    async def load_all(self) -> list[QueueSnapshot]:
+        return await self._run(self._load_all)
+
+    async def save_many(self, snapshots: list[QueueSnapshot]) -> None:
+        await self._run(self._save_many, snapshots)
+
+    async def delete_many(self, guild_ids: list[int]) -> None:
+        await self._run(self._delete_many, guild_ids)
+
+
+class QueuePersister:
+    """Debounces queue changes into batched snapshot writes"""
+
+    def __init__(self, store: QueueStore, config: QueueStoreConfig):
+        self.store = store
+        self.config = config
+        self._dirty: dict[int, Optional["Player"]] = {}
+        self._players: dict[int, "Player"] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config: QueueStoreConfig) -> "QueuePersister":
+        if config.backend == "file":
+            return cls(FileQueueStore(config.path), config)
+        return cls(DatabaseQueueStore(), config)
+
+    def track(self, player: "Player") -> None:
+        """Marks the player's queue as changed"""
+        self._players[player.guild_id] = player
+        self._dirty[player.guild_id] = player
+
+    def forget(self, guild_id: int) -> None:
+        """Removes the guild's snapshot on the next flush"""
+        self._players.pop(guild_id, None)
+        self._dirty[guild_id] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        elapsed = 0.0
+        while True:
+            await asyncio.sleep(self.config.flush_interval)
+            elapsed += self.config.flush_interval
+
+            # Refreshes the track position of the players which are playing
+            if elapsed >= self.config.position_interval:
+                elapsed = 0.0
+                for guild_id, player in self._players.items():
+                    if player.is_playing:
+                        self._dirty.setdefault(guild_id, player)
+
+            try:
+                await self.flush()
+            except Exception:  # pylint: disable=W0703
+                logger.exception("Failed to flush queue snapshots")
+
+    async def flush(self) -> None:
+        dirty, self._dirty = self._dirty, {}
+        snapshots, deleted = [], []
+
+        for guild_id, player in dirty.items():
+            if player is None or not player.is_connected or player.queue.is_empty:
+                self._players.pop(guild_id, None)
+                deleted.append(guild_id)
+            else:
+                snapshots.append(QueueSnapshot.from_player(player))
+
+        try:
+            with time_phase("queue_store"):
+                if snapshots:
+                    await self.store.save_many(snapshots)
+                if deleted:
+                    await self.store.delete_many(deleted)
+        except Exception:
+            # Retried on the next flush unless changed again meanwhile
+            for guild_id, player in dirty.items():
+                self._dirty.setdefault(guild_id, player)
+            raise
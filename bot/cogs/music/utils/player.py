@@ -1,4 +1,8 @@
 import asyncio
+import logging
+import statistics
+import time
+from collections import deque
 from datetime import datetime
 from typing import Optional, Union
 
@@ -6,21 +10,139 @@ import discord
 import wavelink
 from discord.ext import commands
 
+from .eq import EQ_PRESETS, PRESET_LEVELS
 from .errors import (
     AlreadyConnectedToChannel,
     NoTracksFound,
     NoVoiceChannel,
     QueueIsEmpty,
 )
+from .lyrics import LyricsService
+from .persistence import QueuePersister, QueueSnapshot
 from .queue import Queue
-from .types import OPTIONS
+from .tracks import AnyTrack, TrackRecord
+from .types import (
+    EQ_DEBOUNCE,
+    HANDOFF_LEAD,
+    OPTIONS,
+    TRANSITION_SAMPLES,
+    RepeatMode,
+)
+
+logger = logging.getLogger("bot.cogs.music.player")
 
 
 class Player(wavelink.Player):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        lyrics: Optional[LyricsService] = None,
+        persister: Optional[QueuePersister] = None,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
-        self.queue = Queue()
+        self.queue = Queue(on_change=self._on_queue_change)
         self.eq_levels = [0.0] * 15
+        self._eq_flush: Optional[asyncio.TimerHandle] = None
+        self.lyrics = lyrics
+        # Lyrics are only prefetched once the guild has asked for them
+        self.wants_lyrics = False
+        self.persister = persister
+
+        # The following track is sent just before the current one ends
+        self._handoff: Optional[asyncio.TimerHandle] = None
+        self._handoff_task: Optional[asyncio.Task] = None
+        self._handed_off = False
+        # Whether the last track ended by handing off to the following one
+        self.ended_by_handoff = False
+
+        self._track_ended_at: Optional[float] = None
+        self.transition_gaps: deque[float] = deque(maxlen=TRANSITION_SAMPLES)
+
+    def _on_queue_change(self):
+        if self.persister is not None:
+            self.persister.track(self)
+
+    async def hook(self, event):
+        if isinstance(event, wavelink.TrackEnd):
+            self._cancel_handoff()
+            self.ended_by_handoff, self._handed_off = self._handed_off, False
+            if event.reason == "FINISHED" or self.ended_by_handoff:
+                self._track_ended_at = time.perf_counter()
+        elif isinstance(event, wavelink.TrackStart):
+            self._schedule_handoff()
+            if self._track_ended_at:
+                gap = time.perf_counter() - self._track_ended_at
+                self._track_ended_at = None
+                self.transition_gaps.append(gap)
+                logger.debug(
+                    "Transition gap of %.1fms in %s", gap * 1000, self.guild_id
+                )
+
+        await super().hook(event)
+
+    async def update_state(self, state: dict):
+        await super().update_state(state)
+        # Corrects the handoff for seeks and drift every position update
+        if self._handoff is not None:
+            self._schedule_handoff()
+
+    def _remaining(self) -> Optional[float]:
+        # Streams don't end and paused tracks don't get any closer to it
+        if self.current is None or self.current.is_stream or self.paused:
+            return None
+        return (self.current.length - self.position) / 1000
+
+    def _schedule_handoff(self):
+        self._cancel_handoff()
+        if (remaining := self._remaining()) is not None:
+            self._handoff = asyncio.get_event_loop().call_later(
+                max(remaining - HANDOFF_LEAD, 0), self._hand_off
+            )
+
+    def _cancel_handoff(self):
+        if self._handoff is not None:
+            self._handoff.cancel()
+            self._handoff = None
+
+    def _hand_off(self):
+        self._handoff = None
+        if (remaining := self._remaining()) is None:
+            return
+
+        if remaining > HANDOFF_LEAD * 2:
+            self._schedule_handoff()
+        elif self.following_track() is not None:
+            self._handoff_task = asyncio.create_task(self._play_following())
+
+    async def _play_following(self):
+        # Lavalink replaces the current track, the TrackEnd it sends
+        # for it mustn't advance the queue again
+        self._handed_off = True
+        try:
+            if self.queue.repeat_mode == RepeatMode.ONE:
+                await self.repeat_track()
+            else:
+                await self.advance()
+        except Exception:  # pylint: disable=W0703
+            self._handed_off = False
+            logger.exception(
+                "Failed to hand off to the next track in %s", self.guild_id
+            )
+
+    @property
+    def transition_stats(self) -> Optional[dict]:
+        if not self.transition_gaps:
+            return None
+
+        gaps = sorted(self.transition_gaps)
+        return {
+            "samples": len(gaps),
+            "last": self.transition_gaps[-1],
+            "median": statistics.median(gaps),
+            "p95": gaps[min(int(len(gaps) * 0.95), len(gaps) - 1)],
+            "max": gaps[-1],
+        }
 
     async def connect(
         self, ctx: commands.Context, channel: Optional[discord.TextChannel] = None
@@ -34,12 +156,89 @@ class Player(wavelink.Player):
         await super().connect(channel.id)
         return channel
 
+    def update_eq(self, gains: dict[int, float]):
+        for band, gain in gains.items():
+            self.eq_levels[band] = gain
+
+        # Changes made within the window are sent as a single equalizer op
+        if self._eq_flush is None:
+            self._eq_flush = asyncio.get_event_loop().call_later(
+                EQ_DEBOUNCE, lambda: asyncio.create_task(self._flush_eq())
+            )
+
+    async def _flush_eq(self):
+        self._eq_flush = None
+        eq = wavelink.Equalizer(levels=list(enumerate(self.eq_levels)))
+        try:
+            await self.set_eq(eq)
+        except Exception:  # pylint: disable=W0703
+            logger.exception("Failed to set the equalizer of %s", self.guild_id)
+
+    async def set_preset(self, name: str):
+        if self._eq_flush is not None:
+            self._eq_flush.cancel()
+            self._eq_flush = None
+
+        # Bands adjusted afterwards start off from the preset
+        self.eq_levels = PRESET_LEVELS[name].copy()
+        await self.set_eq(EQ_PRESETS[name])
+
     async def teardown(self):
+        if self.persister is not None:
+            self.persister.forget(self.guild_id)
+
+        if self._eq_flush is not None:
+            self._eq_flush.cancel()
+
+        self._cancel_handoff()
+        if self._handoff_task is not None:
+            self._handoff_task.cancel()
+
         try:
             await self.destroy()
         except KeyError:
             pass
 
+    async def resume(self, snapshot: QueueSnapshot):
+        # Bypasses `connect` as there is no context to take the channel from
+        await wavelink.Player.connect(self, snapshot.channel_id)
+        self.queue.restore(
+            [TrackRecord.from_data(track) for track in snapshot.tracks],
+            snapshot.position,
+            RepeatMode[snapshot.repeat_mode],
+        )
+
+        if (track := self.queue.current_track) is not None:
+            await self.play(track, start=snapshot.track_position)
+            self.track_started(track)
+
+    async def play(self, track: AnyTrack, **kwargs):
+        # The queue holds records, lavalink gets the full track
+        if isinstance(track, TrackRecord):
+            track = track.to_track()
+        await super().play(track, **kwargs)
+
+    async def set_pause(self, pause: bool):
+        await super().set_pause(pause)
+        self._schedule_handoff()
+
+    async def seek(self, position: int = 0):
+        await super().seek(position)
+        # The position is only reported back with the next update
+        self.last_position = position
+        self.last_update = time.time() * 1000
+        self._schedule_handoff()
+
+    def following_track(self) -> Optional[AnyTrack]:
+        if self.queue.is_empty:
+            return None
+        if self.queue.repeat_mode == RepeatMode.ONE:
+            return self.queue.current_track
+        return self.queue.peek_next()
+
+    def track_started(self, track: AnyTrack):
+        self.prefetch_lyrics(track)
+
     async def add_tracks(
         self,
         ctx: commands.Context,
@@ -58,7 +257,13 @@ class Player(wavelink.Player):
                 self.queue.add(track)
                 await ctx.send(f"Added {track.title} to the queue.")
 
-        if not self.is_playing and not self.queue.is_empty:
+        if not self.is_playing and self.queue.current_track is not None:
+            await self.start_playback()
+
+    async def enqueue(self, *tracks: wavelink.Track):
+        self.queue.add(*tracks)
+
+        if not self.is_playing and self.queue.current_track is not None:
             await self.start_playback()
 
     async def choose_track(self, ctx: commands.Context, tracks: wavelink.TrackPlaylist):
@@ -103,13 +308,25 @@ class Player(wavelink.Player):
 
     async def start_playback(self):
         await self.play(self.queue.current_track)
+        self.track_started(self.queue.current_track)
 
     async def advance(self):
         try:
-            if (track := self.queue.get_next_track()) is not None:
+            track = self.queue.get_next_track()
+            if track is not None:
                 await self.play(track)
+                self.track_started(track)
+                return
         except QueueIsEmpty:
             pass
 
+        # The next play starts a new session rather than being a transition
+        self._track_ended_at = None
+
+    def prefetch_lyrics(self, track: Optional[wavelink.Track]):
+        if self.wants_lyrics and self.lyrics is not None and track is not None:
+            self.lyrics.prefetch(track.title)
+
     async def repeat_track(self):
         await self.play(self.queue.current_track)
+        self.track_started(self.queue.current_track)
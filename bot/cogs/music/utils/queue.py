@@ -1,14 +1,66 @@
+import itertools
 import random
+from collections.abc import Sequence
+from typing import Callable, Optional
+
+import wavelink
 
 from .errors import QueueIsEmpty
+from .tracks import TrackRecord
 from .types import RepeatMode
 
 
+def compact(tracks):
+    # Tracks are stored as records, anything else is kept as it is
+    return [
+        TrackRecord.from_track(track) if isinstance(track, wavelink.Track) else track
+        for track in tracks
+    ]
+
+
+class QueueView(Sequence):
+    """Read-only window over a part of the queue which doesn't copy it"""
+
+    __slots__ = ("_queue", "_start", "_len")
+
+    def __init__(self, queue: list, start: int, stop: int):
+        self._queue = queue
+        self._start = start = max(start, 0)
+        self._len = max(min(stop, len(queue)) - start, 0)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # Only the requested window gets copied
+            start, stop, step = index.indices(self._len)
+            return self._queue[self._start + start : self._start + stop : step]
+
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("queue view index out of range")
+
+        return self._queue[self._start + index]
+
+    def __iter__(self):
+        return itertools.islice(self._queue, self._start, self._start + self._len)
+
+
 class Queue:
-    def __init__(self):
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
         self._queue = []
         self.position = 0
         self.repeat_mode = RepeatMode.NONE
+        self._on_change = on_change
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change()
 
     @property
     def is_empty(self):
@@ -27,27 +79,39 @@ class Queue:
         if not self._queue:
             raise QueueIsEmpty
 
-        return self._queue[self.position + 1 :]
+        return QueueView(self._queue, self.position + 1, len(self._queue))
 
     @property
     def history(self):
         if not self._queue:
             raise QueueIsEmpty
 
-        return self._queue[: self.position]
+        return QueueView(self._queue, 0, self.position)
+
+    @property
+    def tracks(self):
+        return QueueView(self._queue, 0, len(self._queue))
 
     @property
     def length(self):
         return len(self._queue)
 
     def add(self, *args):
-        self._queue.extend(args)
+        self._queue.extend(compact(args))
+        self._changed()
+
+    def restore(self, tracks, position, repeat_mode):
+        self._queue = compact(tracks)
+        self.position = position
+        self.repeat_mode = repeat_mode
+        self._changed()
 
     def get_next_track(self):
         if not self._queue:
             raise QueueIsEmpty
 
         self.position += 1
+        self._changed()
 
         if self.position < 0:
             return None
@@ -59,14 +123,29 @@ class Queue:
 
         return self._queue[self.position]
 
+    def peek_next(self):
+        """Returns the track `get_next_track` would without moving to it"""
+        if not self._queue:
+            return None
+
+        position = self.position + 1
+        if position > len(self._queue) - 1:
+            if self.repeat_mode != RepeatMode.ALL:
+                return None
+            position = 0
+
+        return self._queue[position] if position >= 0 else None
+
     def shuffle(self):
         if not self._queue:
             raise QueueIsEmpty
 
-        upcoming = self.upcoming
+        # Only the upcoming tracks are copied and written back in place
+        start = self.position + 1
+        upcoming = self._queue[start:]
         random.shuffle(upcoming)
-        self._queue = self._queue[: self.position + 1]
-        self._queue.extend(upcoming)
+        self._queue[start:] = upcoming
+        self._changed()
 
     def set_repeat_mode(self, mode):
         if mode == "none":
@@ -75,7 +154,9 @@ class Queue:
             self.repeat_mode = RepeatMode.ONE
         elif mode == "all":
             self.repeat_mode = RepeatMode.ALL
+        self._changed()
 
     def empty(self):
         self._queue.clear()
         self.position = 0
+        self._changed()
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+import wavelink
+from cachetools import TTLCache
+
+from ....core.metrics import time_phase
+from .tracks import dump_track, load_track
+
+SearchResult = Union[list, wavelink.TrackPlaylist, None]
+
+
+def normalize_query(query: str) -> str:
+    query = query.strip()
+
+    # Searches are case insensitive unlike URLs
+    source, sep, terms = query.partition("search:")
+    if sep and source.isalpha():
+        return f"{source.lower()}{sep}{' '.join(terms.lower().split())}"
+
+    return query
+
+
+def dump_result(result: Union[list, wavelink.TrackPlaylist]) -> dict:
+    if isinstance(result, wavelink.TrackPlaylist):
+        playlist_info, tracks = result.data["playlistInfo"], result.tracks
+    else:
+        playlist_info, tracks = None, result
+
+    return {
+        "playlist_info": playlist_info,
+        "tracks": [dump_track(track) for track in tracks],
+    }
+
+
+def load_result(entry: dict) -> Union[list, wavelink.TrackPlaylist]:
+    # New objects are built for every hit so tracks aren't shared between queues
+    if entry["playlist_info"]:
+        return wavelink.TrackPlaylist(
+            data={"playlistInfo": entry["playlist_info"], "tracks": entry["tracks"]}
+        )
+
+    return [load_track(track) for track in entry["tracks"]]
+
+
+class DiskSearchCache:
+    """Sqlite backed search cache which survives restarts"""
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        # sqlite connections can only be used from the thread creating them
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._connection: Optional[sqlite3.Connection] = None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache "
+                "(query TEXT PRIMARY KEY, entry TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS search_cache_expires_at "
+                "ON search_cache (expires_at)"
+            )
+        return self._connection
+
+    def _get(self, query: str) -> Optional[dict]:
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT entry, expires_at FROM search_cache WHERE query = ?", (query,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        entry, expires_at = row
+        if expires_at <= time.time():
+            with connection:
+                connection.execute("DELETE FROM search_cache WHERE query = ?", (query,))
+            return None
+
+        return json.loads(entry)
+
+    def _set(self, query: str, entry: dict) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            # Expired rows are swept on every write so the file doesn't keep growing
+            connection.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+            connection.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?)",
+                (query, json.dumps(entry), now + self.ttl),
+            )
+
+    def _purge(self, query: Optional[str]) -> None:
+        with self._connect() as connection:
+            if query is None:
+                connection.execute("DELETE FROM search_cache")
+            else:
+                connection.execute("DELETE FROM search_cache WHERE query = ?", (query,))
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def get(self, query: str) -> Optional[dict]:
+        return await self._run(self._get, query)
+
+    async def set(self, query: str, entry: dict) -> None:
+        await self._run(self._set, query, entry)
+
+    async def purge(self, query: Optional[str] = None) -> None:
+        await self._run(self._purge, query)
+
+    async def close(self) -> None:
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+
+class TrackSearchCache:
+    """Caches the results of `wavelink.Client.get_tracks` by normalized query"""
+
+    def __init__(
+        self,
+        client: wavelink.Client,
+        maxsize: int = 1000,
+        ttl: float = 6 * 60 * 60,
+        disk_path: Optional[Path] = None,
+        disk_ttl: float = 7 * 24 * 60 * 60,
+    ):
+        self.client = client
+        self.stats: Counter = Counter(memory_hit=0, disk_hit=0, miss=0)
+        self._memory = TTLCache(maxsize, ttl)
+        self._disk = DiskSearchCache(disk_path, disk_ttl) if disk_path else None
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hit"] + self.stats["disk_hit"]
+        total = hits + self.stats["miss"]
+        return hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    async def get_tracks(self, query: str) -> SearchResult:
+        key = normalize_query(query)
+
+        if (entry := self._memory.get(key)) is not None:
+            self.stats["memory_hit"] += 1
+            return load_result(entry)
+
+        if self._disk and (entry := await self._disk.get(key)) is not None:
+            self.stats["disk_hit"] += 1
+            self._memory[key] = entry
+            return load_result(entry)
+
+        self.stats["miss"] += 1
+        with time_phase("lavalink_rest"):
+            result = await self.client.get_tracks(query)
+
+        # Failed and empty searches aren't cached
+        if not result:
+            return result
+
+        entry = dump_result(result)
+        self._memory[key] = entry
+        if self._disk:
+            await self._disk.set(key, entry)
+
+        return result
+
+    async def purge(self, query: Optional[str] = None) -> None:
+        """Removes the query, or every query, from both tiers"""
+        key = None if query is None else normalize_query(query)
+
+        if key is None:
+            self._memory.clear()
+        else:
+            self._memory.pop(key, None)
+
+        if self._disk:
+            await self._disk.purge(key)
+
+    async def close(self) -> None:
+        if self._disk:
+            await self._disk.close()
@@ -0,0 +1,91 @@
+from typing import Union
+
+import wavelink
+
+# Only the info the queue and the embeds use is kept
+TRACK_INFO_KEYS = ("title", "author", "length", "uri", "identifier", "isStream")
+
+
+class TrackRecord:
+    """
+    Compact stand-in for `wavelink.Track` which the queue holds, the full
+    track is only built again when it gets played
+    """
+
+    __slots__ = ("id", "title", "author", "length", "uri", "identifier", "is_stream")
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        id_: str,
+        title: str,
+        author: str,
+        length: int,
+        uri: str,
+        identifier: str,
+        is_stream: bool,
+    ):
+        self.id = id_
+        self.title = title
+        self.author = author
+        self.length = length
+        self.uri = uri
+        self.identifier = identifier
+        self.is_stream = is_stream
+
+    @classmethod
+    def from_track(cls, track: wavelink.Track) -> "TrackRecord":
+        return cls(
+            track.id,
+            track.title,
+            track.author,
+            track.length,
+            track.uri,
+            track.identifier,
+            track.is_stream,
+        )
+
+    @classmethod
+    def from_data(cls, data: dict) -> "TrackRecord":
+        info = data["info"]
+        return cls(
+            data["track"],
+            info.get("title"),
+            info.get("author"),
+            info.get("length"),
+            info.get("uri"),
+            info.get("identifier", ""),
+            info.get("isStream"),
+        )
+
+    @property
+    def info(self) -> dict:
+        return {
+            "title": self.title,
+            "author": self.author,
+            "length": self.length,
+            "uri": self.uri,
+            "identifier": self.identifier,
+            "isStream": self.is_stream,
+        }
+
+    def to_track(self) -> wavelink.Track:
+        return wavelink.Track(id_=self.id, info=self.info)
+
+    def __str__(self):
+        return self.title
+
+
+AnyTrack = Union[wavelink.Track, TrackRecord]
+
+
+def dump_track(track: AnyTrack) -> dict:
+    info = track.info
+    return {
+        "track": track.id,
+        "info": {key: info[key] for key in TRACK_INFO_KEYS if key in info},
+    }
+
+
+def load_track(data: dict) -> wavelink.Track:
+    return wavelink.Track(id_=data["track"], info=data["info"])
@@ -2,9 +2,9 @@ import re
 from enum import Enum, auto
 
 URL_REGEX = re.compile(
-    "(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))"
+    r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))"
 )
-LYRICS_URL = "https://some-random-api.ml/lyrics?title="
+LYRICS_URL = "https://some-random-api.ml/lyrics"
 HZ_BANDS = (
     20,
     40,
@@ -33,6 +33,19 @@ OPTIONS = {
     "5️⃣": 5,
 }
 
+QUEUE_PAGE_SIZE = 10
+BULK_MAX_QUERIES = 50
+BULK_CONCURRENCY = 4
+BULK_PROGRESS_INTERVAL = 2.0
+TRANSITION_SAMPLES = 50
+# How long before the end of a track the following one is sent
+HANDOFF_LEAD = 0.2
+EQ_DEBOUNCE = 0.3
+PAGE_OPTIONS = {
+    "⬅️": -1,
+    "➡️": 1,
+}
+
 
 class RepeatMode(Enum):
     NONE = auto()
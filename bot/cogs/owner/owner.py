@@ -0,0 +1,365 @@
+"""
+This Cog contains the commands for the owner of the bot
+"""
+
+import math
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+import discord
+import wavelink
+from discord.ext import commands
+from pydantic import ValidationError
+
+from bot.utils.bettercog import BetterCog
+
+from ...core import Bot
+from ...core.helpers import LavalinkConfig, VoiceRegions
+from ...core.ipc import IPCError
+from ...core.lavalink_pool import node_load
+from ...core.loop_monitor import LOOP_LAG, LOOP_LAG_MAX
+from ...core.metrics import (
+    COMMAND_ERRORS,
+    COMMAND_LATENCY,
+    COMMANDS,
+    PHASE_LATENCY,
+    HistogramValue,
+)
+
+
+def format_quantile(latency: HistogramValue, quantile: float) -> str:
+    """
+    Formats the bucket bound a latency quantile falls under
+    """
+    bound = latency.quantile(quantile)
+    if math.isinf(bound):
+        return f">{latency.buckets[-1]:.0f}s"
+    return f"<{bound * 1000:.0f}ms"
+
+
+class Owner(BetterCog):
+    """
+    This is the cog for inspecting the bot's internals
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        super().__init__(bot, cog_hidden=True)
+
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        """
+        Only the owner of the bot can use these commands
+        """
+        if not await self.bot.is_owner(ctx.author):
+            raise commands.NotOwner("You do not own this bot.")
+        return True
+
+    @commands.group(name="cache", invoke_without_command=True)
+    async def cache_group(self, ctx: commands.Context) -> None:
+        """
+        Shows the stats of every registered model cache
+        """
+        embed = discord.Embed(title="Model caches", color=discord.Color.blue())
+
+        for name, model_cache in self.bot.model_caches.items():
+            stats = model_cache.stats
+            embed.add_field(
+                name=name,
+                value=(
+                    f"**Size**: {len(model_cache)}/{model_cache.maxsize}\n"
+                    f"**Hit rate**: {model_cache.hit_rate:.1%}\n"
+                    f"**Hits**: {stats['hit']}\n"
+                    f"**Negative hits**: {stats['negative_hit']}\n"
+                    f"**Coalesced**: {stats['coalesced']}\n"
+                    f"**Misses**: {stats['miss']}\n"
+                    f"**Evictions**: {stats['eviction']}\n"
+                    f"**Expirations**: {stats['expiration']}"
+                ),
+            )
+
+        await ctx.send(embed=embed)
+
+    @cache_group.command(name="clear")
+    async def cache_clear_command(
+        self, ctx: commands.Context, name: Optional[str] = None
+    ) -> None:
+        """
+        Clears one or all of the registered model caches
+        """
+        if name is None:
+            for model_cache_name in list(self.bot.model_caches):
+                self.bot.clear_model_cache(model_cache_name)
+            return await ctx.send("Cleared every model cache.")
+
+        if name not in self.bot.model_caches:
+            raise commands.BadArgument(f"No model cache named `{name}`")
+
+        self.bot.clear_model_cache(name)
+        await ctx.send(f"Cleared the `{name}` model cache.")
+
+    @commands.command(name="stats")
+    async def stats_command(self, ctx: commands.Context, limit: int = 10) -> None:
+        """
+        Shows the latency and error rate of the most used commands
+        and the time spent in each phase
+        """
+        errors = Counter()
+        for (command, _), count in COMMAND_ERRORS.values.items():
+            errors[command] += count
+
+        latencies = COMMAND_LATENCY.by("command")
+        invoked = sorted(
+            COMMANDS.values.items(), key=lambda item: item[1], reverse=True
+        )[: min(limit, 15)]
+
+        embed = discord.Embed(title="Command stats", color=discord.Color.blue())
+        for (command,), count in invoked:
+            latency = latencies.get(command)
+            embed.add_field(
+                name=command,
+                value=(
+                    f"**Invoked**: {count:.0f}\n"
+                    f"**Error rate**: {errors[command] / count:.1%}\n"
+                    + (
+                        f"**p50**: {format_quantile(latency, 0.5)}\n"
+                        f"**p95**: {format_quantile(latency, 0.95)}"
+                        if latency
+                        else ""
+                    )
+                ),
+            )
+
+        for phase, latency in PHASE_LATENCY.by("phase").items():
+            embed.add_field(
+                name=f"Phase: {phase}",
+                value=(
+                    f"**Count**: {latency.count}\n"
+                    f"**Mean**: {latency.sum / latency.count * 1000:.1f}ms\n"
+                    f"**p95**: {format_quantile(latency, 0.95)}"
+                ),
+            )
+
+        await ctx.send(embed=embed)
+
+    @commands.command(name="loop")
+    async def loop_command(self, ctx: commands.Context) -> None:
+        """
+        Shows the lag of the event loop and what blocked it lately
+        """
+        if (monitor := self.bot.loop_monitor) is None:
+            raise commands.BadArgument("The loop monitor isn't enabled")
+
+        embed = discord.Embed(title="Event loop", color=discord.Color.blue())
+        if LOOP_LAG.values:
+            lag = LOOP_LAG.values[()]
+            embed.add_field(
+                name="Lag",
+                value=(
+                    f"**Samples**: {lag.count}\n"
+                    f"**Mean**: {lag.sum / lag.count * 1000:.1f}ms\n"
+                    f"**p99**: {format_quantile(lag, 0.99)}\n"
+                    f"**Max in window**: {LOOP_LAG_MAX.get() * 1000:.0f}ms"
+                ),
+                inline=False,
+            )
+
+        embed.add_field(
+            name="Slow callbacks",
+            value="\n".join(
+                f"`{duration * 1000:.0f}ms` {discord.utils.escape_markdown(name)}"
+                f" ({datetime.utcfromtimestamp(at):%H:%M:%S})"
+                for at, name, duration in list(monitor.slow_callbacks)[-10:]
+            )[:1024]
+            or "None",
+            inline=False,
+        )
+
+        await ctx.send(embed=embed)
+
+    async def _cluster_request(self, method: str, target="all", **args) -> dict:
+        """
+        Sends an IPC request, this process answers by itself
+        when the bot isn't running as clusters
+        """
+        if self.bot.ipc is None:
+            if method == "health":
+                return {"launcher": {"result": {"0": self.bot.cluster_health()}}}
+            if method == "reload_extension":
+                self.bot.reload_extension(**args)
+                return {"0": {"result": None}}
+            return {"0": {"result": self.bot.cluster_health()}}
+
+        try:
+            return await self.bot.ipc.request(method, target, **args)
+        except IPCError as error:
+            raise commands.BadArgument(str(error)) from error
+
+    @commands.group(name="cluster", invoke_without_command=True)
+    async def cluster_group(self, ctx: commands.Context) -> None:
+        """
+        Shows the live stats of every cluster along with the bot-wide totals
+        """
+        results = await self._cluster_request("stats")
+        stats = [result["result"] for result in results.values() if "result" in result]
+
+        embed = discord.Embed(
+            title="Clusters",
+            description=(
+                f"**Guilds**: {sum(stat['guilds'] for stat in stats)}\n"
+                f"**Users**: {sum(stat['users'] for stat in stats)}\n"
+                f"**Players**: {sum(stat['players'] for stat in stats)}\n"
+                f"**Shards**: {sum(len(stat['shards']) for stat in stats)}"
+            ),
+            color=discord.Color.blue(),
+        )
+
+        for cluster_id, result in sorted(results.items(), key=lambda x: int(x[0])):
+            if "error" in result:
+                embed.add_field(name=f"Cluster {cluster_id}", value=result["error"])
+                continue
+
+            stat = result["result"]
+            latencies = [value for value in stat["shards"].values() if value]
+            embed.add_field(
+                name=f"Cluster {cluster_id}",
+                value=(
+                    f"**Shards**: {', '.join(map(str, stat['shards']))}\n"
+                    f"**Guilds**: {stat['guilds']}\n"
+                    f"**Latency**: "
+                    + (
+                        f"{sum(latencies) / len(latencies) * 1000:.0f}ms\n"
+                        if latencies
+                        else "N/A\n"
+                    )
+                    + f"**Loop lag**: {stat['loop_lag'] * 1000:.0f}ms\n"
+                    f"**Memory**: {stat['memory'] / 2 ** 20:.0f}MiB"
+                ),
+            )
+
+        await ctx.send(embed=embed)
+
+    @cluster_group.command(name="health")
+    async def cluster_health_command(self, ctx: commands.Context) -> None:
+        """
+        Shows the health of the clusters as last reported to the launcher
+        """
+        response = (await self._cluster_request("health", "launcher"))["launcher"]
+        if "error" in response:
+            raise commands.BadArgument(response["error"])
+
+        embed = discord.Embed(title="Cluster health", color=discord.Color.blue())
+        for cluster_id, status in response["result"].items():
+            last_report = status.get("last_report")
+            embed.add_field(
+                name=f"Cluster {cluster_id}",
+                value=(
+                    f"**Running**: {status.get('running', True)}\n"
+                    f"**Ready**: {status.get('ready', False)}\n"
+                    f"**Restarts**: {status.get('restarts', 0)}\n"
+                    f"**Last report**: "
+                    + (f"{last_report:.0f}s ago" if last_report is not None else "N/A")
+                ),
+            )
+
+        await ctx.send(embed=embed)
+
+    @cluster_group.command(name="reload")
+    async def cluster_reload_command(self, ctx: commands.Context, name: str) -> None:
+        """
+        Reloads an extension in every cluster
+        """
+        async with ctx.typing():
+            results = await self._cluster_request("reload_extension", name=name)
+
+        await ctx.send(
+            "\n".join(
+                f"Cluster {cluster_id}: {result.get('error', 'reloaded')}"
+                for cluster_id, result in sorted(
+                    results.items(), key=lambda x: int(x[0])
+                )
+            )
+        )
+
+    @commands.group(name="lavalink", invoke_without_command=True)
+    async def lavalink_group(self, ctx: commands.Context) -> None:
+        """
+        Shows the lavalink nodes and their load
+        """
+        embed = discord.Embed(title="Lavalink nodes", color=discord.Color.blue())
+
+        for node in self.bot.wavelink_client.nodes.values():
+            stats = node.stats
+            embed.add_field(
+                name=node.identifier,
+                value=(
+                    f"**Region**: {node.region}\n"
+                    f"**Available**: {node.is_available}\n"
+                    f"**Players**: {len(node.players)}\n"
+                    f"**CPU**: {f'{stats.system_load:.1%}' if stats else 'N/A'}\n"
+                    f"**Frame deficit**: {stats.frames_deficit if stats else 'N/A'}\n"
+                    f"**Load**: {node_load(node):.2f}"
+                ),
+            )
+
+        await ctx.send(embed=embed)
+
+    # pylint: disable=R0913
+    @lavalink_group.command(name="add")
+    async def lavalink_add_command(
+        self,
+        ctx: commands.Context,
+        identifier: str,
+        host: str,
+        port: int,
+        password: str,
+        rest_url: str,
+        region: Optional[str] = VoiceRegions.INDIA.value,
+    ) -> None:
+        """
+        Connects to a new lavalink node
+        """
+        try:
+            lavalink_config = LavalinkConfig(
+                identifier=identifier,
+                host=host,
+                port=port,
+                password=password,
+                rest_url=rest_url,
+                region=region,
+            )
+        except ValidationError as error:
+            raise commands.BadArgument(str(error)) from error
+
+        async with ctx.typing():
+            try:
+                await self.bot.lavalink_pool.add_node(lavalink_config)
+            except wavelink.NodeOccupied as error:
+                raise commands.BadArgument(str(error)) from error
+
+        await ctx.send(f"Added lavalink node `{identifier}`.")
+
+    @lavalink_group.command(name="remove")
+    async def lavalink_remove_command(
+        self, ctx: commands.Context, identifier: str
+    ) -> None:
+        """
+        Moves the players off a lavalink node and disconnects from it
+        """
+        async with ctx.typing():
+            try:
+                left = await self.bot.lavalink_pool.remove_node(identifier)
+            except KeyError as error:
+                raise commands.BadArgument(
+                    f"No lavalink node named `{identifier}`"
+                ) from error
+
+        if left:
+            return await ctx.send(
+                f"Couldn't move {left} players off `{identifier}`, they were "
+                "stopped and the node is kept drained."
+            )
+        await ctx.send(f"Removed lavalink node `{identifier}`.")
+
+
+def setup(bot: Bot) -> None:
+    bot.add_cog(Owner(bot))
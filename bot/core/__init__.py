@@ -1,3 +1,3 @@
 """This is the init module for core"""
 
-from .bot import Bot
+from .bot import Bot, ShardedBot
@@ -1,22 +1,57 @@
 """This is the core for `Bot`"""
 
 import asyncio
+import heapq
+import itertools
 import logging
+import math
+import resource
+import time
 import traceback
+from collections import defaultdict, deque
+from functools import partial
 from typing import Optional, Sequence
 
 import discord
 import wavelink
 from aiohttp import ClientSession
-from cachetools import TTLCache
+from cachetools import Cache, LRUCache, TTLCache
 from discord.ext import commands
 from tortoise import Tortoise
 
 from bot.utils.cog_manager import AutoReloader
+from bot.utils.webhook_logging import WebhookLogHandler, WebhookLogListener
 
-from .help_command import HelpCommand
+from .help_command import HelpCache, HelpCommand
 from .helpers.config import BotConfig, LavalinkConfig
+from .invalidation import (
+    InMemoryInvalidationChannel,
+    InvalidationChannel,
+    PostgresInvalidationChannel,
+)
+from .ipc import IPCClient
+from .lavalink_pool import LavalinkPool
+from .loop_monitor import LOOP_LAG_MAX, LoopMonitor
+from .metrics import (
+    COMMAND_LATENCY,
+    COMMANDS,
+    PHASE_LATENCY,
+    REGISTRY,
+    MetricsServer,
+    current_command,
+    time_phase,
+)
+from .model_cache import ModelCache
 from .models import GuildModel, UserModel
+from .rate_limit import RateLimiter
+
+
+class TimedContext(commands.Context):
+    """This is the `Context` which times sending messages"""
+
+    async def send(self, *args, **kwargs) -> discord.Message:
+        with time_phase("discord_send"):
+            return await super().send(*args, **kwargs)
 
 
 class Bot(commands.Bot):
@@ -28,24 +63,82 @@ class Bot(commands.Bot):
             command_prefix=self._determine_prefix,
             description=config.description,
             help_command=HelpCommand(),
+            **self._sharding_options(config),
         )
+        self.started_at = time.monotonic()
+
+        # Buckets of the rate limits set by cogs and commands
+        self.rate_limiter = RateLimiter()
+
+        # Parts of the help pages, rebuilt after cogs are (re)loaded
+        self.help_cache = HelpCache(check_ttl=config.help_check_ttl)
 
         # lock_bot doesn't recieve message until its False
         self.lock_bot = True
+        self.db_ready = asyncio.Event()
+
+        # Messages received while lock_bot is set, replayed after unlocking
+        self._message_buffer: defaultdict[Optional[int], deque] = defaultdict(
+            partial(deque, maxlen=config.message_buffer_size)
+        )
+        self._message_buffer_counter = itertools.count()
 
         # Config object
         self.config = config
         self.tortoise_config = tortoise_config
 
+        # Metrics, served over HTTP when configured
+        self.metrics = REGISTRY
+        self.metrics_server: Optional[MetricsServer] = None
+        if self.config.metrics:
+            self.metrics_server = MetricsServer(
+                self.metrics, self.config.metrics.host, self.config.metrics.port
+            )
+        self.before_invoke(self._record_checks_phase)
+
+        # Watches for lag and the callbacks blocking the loop
+        self.loop_monitor: Optional[LoopMonitor] = None
+        if self.config.loop_monitor:
+            self.loop_monitor = LoopMonitor(**self.config.loop_monitor.dict())
+
+        # Talks to the cluster launcher and the other clusters
+        self.ipc: Optional[IPCClient] = None
+        if self.config.cluster:
+            self.ipc = IPCClient(self.config.cluster, self.cluster_health)
+            self.ipc.register("stats", self._ipc_stats)
+            self.ipc.register("reload_extension", self._ipc_reload_extension)
+
         # Checks and connects to lavalink/DB according to config
         self._config_checker(self.config)
 
         # Cache Stuffs
-        self._guild_model_cache = TTLCache(100, 1000)
-        self._user_model_cache = TTLCache(100, 1000)
+        self.model_caches: dict[str, ModelCache] = {}
+        self.guild_cache: ModelCache[GuildModel] = self.register_model_cache(
+            ModelCache.from_config(
+                GuildModel, config.guild_cache, loader=self._load_guild_model
+            )
+        )
+        self.user_cache: ModelCache[UserModel] = self.register_model_cache(
+            ModelCache.from_config(
+                UserModel, config.user_cache, loader=self._load_user_model
+            )
+        )
+
+        # Prefixes of the guilds seen recently, used for filtering messages
+        # which can't be commands without awaiting anything. They're kept
+        # with the same size and ttl as the guild models
+        self._prefix_index: Cache = (
+            TTLCache(config.guild_cache.maxsize, config.guild_cache.ttl)
+            if config.guild_cache.ttl
+            else LRUCache(config.guild_cache.maxsize)
+        )
+
+        # Broadcasts model changes to other bot processes
+        self.invalidation_channel = self._create_invalidation_channel(self.config)
 
         # Wavelink Client
         self.wavelink_client = wavelink.Client(bot=self)
+        self.lavalink_pool = LavalinkPool(self.wavelink_client)
 
         # Loads cogs
         if self.config.load_jishaku:
@@ -57,6 +150,19 @@ class Bot(commands.Bot):
         # Logger
         self.logger = logging.getLogger("bot.main")
 
+        # Sends the warnings of the `bot.*` loggers to the log webhook
+        self._log_webhook: Optional[discord.Webhook] = None
+        self.log_handler: Optional[WebhookLogHandler] = None
+        self.log_listener: Optional[WebhookLogListener] = None
+        if self.config.webhook_log_level is not None:
+            self.log_handler = WebhookLogHandler(
+                logging.getLevelName(self.config.webhook_log_level.upper())
+            )
+            self.log_listener = WebhookLogListener(
+                self.log_handler, self._send_log_embeds
+            )
+            logging.getLogger("bot").addHandler(self.log_handler)
+
         # Auto Reloader
         if self.config.dev_env:
             autoreloader = AutoReloader(self)
@@ -88,10 +194,16 @@ class Bot(commands.Bot):
         This returns the discord.WebHook for
         logging info and errors
         """
-        return discord.Webhook.from_url(
-            self.config.log_webhook_url,
-            adapter=discord.AsyncWebhookAdapter(self.session),
-        )
+        # Built once the session exists and reused from then on
+        if self._log_webhook is None:
+            self._log_webhook = discord.Webhook.from_url(
+                self.config.log_webhook_url,
+                adapter=discord.AsyncWebhookAdapter(self.session),
+            )
+        return self._log_webhook
+
+    async def _send_log_embeds(self, embeds: list[discord.Embed]) -> None:
+        await self.log_webhook.send(embeds=embeds)
 
     def _config_checker(self, config: BotConfig) -> None:
         """
@@ -102,46 +214,126 @@ class Bot(commands.Bot):
             self.lock_bot = True
             self.event_loop.create_task(self._connect_db(self.tortoise_config))
 
-        if config.lavalink_config:
-            self.event_loop.create_task(self._connect_wavelink(config.lavalink_config))
+        if config.lavalink_configs:
+            self.event_loop.create_task(self._connect_wavelink(config.lavalink_configs))
+
+        if self.metrics_server:
+            self.event_loop.create_task(self.metrics_server.start())
+
+        if self.loop_monitor:
+            self.loop_monitor.start()
+
+        if self.ipc:
+            self.ipc.start()
 
         if config.load_jishaku:
             self.load_extension("jishaku")
 
+    @staticmethod
+    def _sharding_options(config: BotConfig) -> dict:
+        """
+        Returns the kwargs picking the shards of the bot according to config
+        """
+        if not config.sharding:
+            return {}
+
+        return {
+            "shard_count": config.sharding.shard_count,
+            "shard_ids": config.sharding.shard_ids,
+        }
+
+    @staticmethod
+    def _create_invalidation_channel(
+        config: BotConfig,
+    ) -> Optional[InvalidationChannel]:
+        """
+        Creates the cache invalidation channel according to config
+        """
+        if config.cache_invalidation == "memory":
+            return InMemoryInvalidationChannel()
+
+        if config.cache_invalidation == "postgres":
+            if not config.db_config:
+                raise ValueError("Postgres cache invalidation requires db_config")
+            return PostgresInvalidationChannel(config.db_config)
+
+        return None
+
     async def _connect_db(self, tortoise_config: dict) -> None:
         """
         Connects to the postresql database
         """
-        await self.wait_until_ready()
-
         if not tortoise_config:
             raise ValueError("Tortoise config must be passed")
 
         self.logger.info("Connecting to database")
         await Tortoise.init(tortoise_config)
         self.logger.info("Connected to database")
+
+        if self.invalidation_channel:
+            self.invalidation_channel.subscribe(self._on_model_invalidated)
+            self.invalidation_channel.subscribe_reconnect(
+                self._on_invalidation_reconnect
+            )
+            await self.invalidation_channel.connect()
+
+        if self.config.warm_guild_cache:
+            await self.wait_until_ready()
+            await self._warm_guild_cache()
+
+        await self._replay_buffered_messages()
         self.lock_bot = False
+        self.db_ready.set()
 
-    async def _connect_wavelink(self, lavalink_config: LavalinkConfig) -> None:
+    async def _connect_wavelink(self, lavalink_configs: list[LavalinkConfig]) -> None:
         """
         Connects to the wavelink nodes
         """
-        await self.wait_until_ready()
+        # The nodes need the bot's user id which is known after READY
+        if self.user is None:
+            await self.wait_for(
+                "socket_response", check=lambda msg: msg.get("t") == "READY"
+            )
+
+        results = await asyncio.gather(
+            *(
+                self.lavalink_pool.add_node(lavalink_config)
+                for lavalink_config in lavalink_configs
+            ),
+            return_exceptions=True,
+        )
+        for lavalink_config, result in zip(lavalink_configs, results):
+            if isinstance(result, Exception):
+                self.logger.error(
+                    "Couldn't connect to wavelink node %s",
+                    lavalink_config.identifier,
+                    exc_info=result,
+                )
+        self.logger.info("Connected to wavelink nodes")
 
-        nodes = {
-            lavalink_config.identifier: {
-                "host": lavalink_config.host,
-                "port": lavalink_config.port,
-                "password": lavalink_config.password,
-                "identifier": lavalink_config.identifier,
-                "region": lavalink_config.region.value,
-                "rest_uri": lavalink_config.rest_url,
+    async def _warm_guild_cache(self) -> None:
+        """
+        Fills the guild model cache for the bot's guilds
+        using chunked `WHERE id IN (...)` queries
+        """
+        chunk_size = self.config.warm_guild_cache_chunk_size
+        guild_ids = [guild.id for guild in self.guilds][: self.guild_cache.maxsize]
+
+        for start in range(0, len(guild_ids), chunk_size):
+            chunk = guild_ids[start : start + chunk_size]
+            guild_models = {
+                guild_model.id: guild_model
+                for guild_model in await GuildModel.filter(id__in=chunk)
             }
-        }
-        _ = [
-            await self.wavelink_client.initiate_node(**node) for node in nodes.values()
-        ]
-        self.logger.info("Connected to wavelink nodes")
+
+            for guild_id in chunk:
+                # Unsaved models carry the default prefix and are
+                # only written to the database when they get saved
+                self._cache_guild_model(
+                    guild_models.get(guild_id) or GuildModel(id=guild_id)
+                )
+
+        self.logger.info("Warmed guild cache with %s guilds", len(guild_ids))
 
     async def _determine_prefix(
         self, bot: commands.Bot, message: discord.Message
@@ -167,39 +359,212 @@ class Bot(commands.Bot):
                 except commands.ExtensionError:
                     traceback.print_exc()
 
+    def add_cog(self, cog: commands.Cog) -> None:
+        """
+        Adds the cog and drops the help pages built without it
+        """
+        super().add_cog(cog)
+        self.help_cache.clear()
+
+    def remove_cog(self, name: str) -> None:
+        """
+        Removes the cog and drops the help pages built with it
+        """
+        super().remove_cog(name)
+        self.help_cache.clear()
+
+    def _is_command_candidate(self, message: discord.Message) -> bool:
+        """
+        Checks without awaiting if the message could invoke a command,
+        messages from guilds with an unknown prefix are always candidates
+        """
+        if not message.guild or message.content.lstrip().startswith("<@"):
+            return True
+
+        prefix = self._prefix_index.get(message.guild.id)
+        return prefix is None or message.content.startswith(prefix)
+
     # Working with cache
-    async def get_local_guild(self, guild_id: int) -> GuildModel:
+    def register_model_cache(self, model_cache: ModelCache) -> ModelCache:
         """
-        Get the Guild Model from the local database
+        Registers a `ModelCache` so it is invalidated across
+        bot processes and shows up in the cache stats,
+        a cache registered under the same name gets replaced
         """
-        guild_model = self._guild_model_cache.get(guild_id)
+        self.model_caches[model_cache.name] = model_cache
+        return model_cache
 
-        if not guild_model:
-            guild_model, _ = await GuildModel.get_or_create(id=guild_id)
-            self._guild_model_cache[guild_id] = guild_model
+    def unregister_model_cache(self, name: str) -> None:
+        """
+        Removes a `ModelCache` registered with `register_model_cache`
+        """
+        self.model_caches.pop(name, None)
+
+    def clear_model_cache(self, name: str) -> None:
+        """
+        Clears a `ModelCache` registered with `register_model_cache`,
+        clearing the guild models clears the prefix index too
+        """
+        model_cache = self.model_caches[name]
+        model_cache.clear()
+        if model_cache is self.guild_cache:
+            self._prefix_index.clear()
 
+    async def invalidate_model(self, model_cache: ModelCache, primary_key: int) -> None:
+        """
+        Invalidates the model in the other bot processes
+        """
+        if self.invalidation_channel:
+            await self.invalidation_channel.publish(model_cache.name, primary_key)
+
+    def _cache_guild_model(self, guild_model: GuildModel) -> None:
+        """
+        Stores the Guild Model in the cache and the prefix index
+        """
+        self.guild_cache.set(guild_model)
+        self._prefix_index[guild_model.id] = guild_model.prefix
+
+    async def _load_guild_model(self, guild_id: int) -> GuildModel:
+        """
+        Loads the Guild Model from the database for `guild_cache`
+        """
+        with time_phase("db"):
+            guild_model, _ = await GuildModel.get_or_create(id=guild_id)
+        self._prefix_index[guild_id] = guild_model.prefix
         return guild_model
 
+    # pylint: disable=R0201
+    async def _load_user_model(self, user_id: int) -> UserModel:
+        """
+        Loads the User Model from the database for `user_cache`
+        """
+        with time_phase("db"):
+            user_model, _ = await UserModel.get_or_create(id=user_id)
+        return user_model
+
+    async def get_local_guild(self, guild_id: int) -> GuildModel:
+        """
+        Get the Guild Model from the local database
+        """
+        return await self.guild_cache.get(guild_id)
+
     async def update_local_guild(self, guild_model: GuildModel) -> None:
         """
         Updates the local Guild Models cache
+        and invalidates it in the other bot processes
         """
-        self._guild_model_cache[guild_model.id] = guild_model
+        self._cache_guild_model(guild_model)
+        await self.invalidate_model(self.guild_cache, guild_model.id)
 
-    async def get_local_user(self, user_id: int) -> None:
+    async def get_local_user(self, user_id: int) -> UserModel:
         """
         Get the User Model from the local database
         """
-        user_model = self._user_model_cache.get(user_id)
-
-        if not user_model:
-            user_model, _ = await UserModel.get_or_create(id=user_id)
+        return await self.user_cache.get(user_id)
 
     async def update_local_user(self, user_model: UserModel) -> None:
         """
         Updates the local User Models cache
+        and invalidates it in the other bot processes
+        """
+        self.user_cache.set(user_model)
+        await self.invalidate_model(self.user_cache, user_model.id)
+
+    async def _on_model_invalidated(self, name: str, primary_key: int) -> None:
+        """
+        Evicts a model changed by another bot process from the local cache
+        """
+        if (model_cache := self.model_caches.get(name)) is not None:
+            model_cache.invalidate(primary_key)
+
+        if model_cache is self.guild_cache:
+            self._prefix_index.pop(primary_key, None)
+
+    async def _on_invalidation_reconnect(self) -> None:
+        """
+        Clears the model caches as invalidations could have been
+        missed while the invalidation channel was disconnected
+        """
+        for name in list(self.model_caches):
+            self.clear_model_cache(name)
+
+    # Clustering
+    def cluster_health(self) -> dict:
+        """
+        Returns the health of this process, reported to the cluster launcher
+        and answered to the `stats` requests of the other clusters
+        """
+        latencies = dict(
+            getattr(self, "latencies", [(self.shard_id or 0, self.latency)])
+        )
+        # Shards which haven't connected yet have no latency
+        for shard_id in getattr(self, "shard_ids", None) or ():
+            latencies.setdefault(shard_id, math.nan)
+
+        return {
+            "ready": self.is_ready(),
+            "guilds": len(self.guilds),
+            "users": len(self.users),
+            "players": len(self.wavelink_client.players),
+            "shards": {
+                shard_id: None if math.isnan(latency) else round(latency, 4)
+                for shard_id, latency in latencies.items()
+            },
+            "loop_lag": LOOP_LAG_MAX.get(),
+            # ru_maxrss is in KiB on linux
+            "memory": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "uptime": time.monotonic() - self.started_at,
+        }
+
+    async def _ipc_stats(self) -> dict:
+        return self.cluster_health()
+
+    async def _ipc_reload_extension(self, name: str) -> None:
+        self.reload_extension(name)
+        self.logger.info("Reloaded %s as requested by another cluster", name)
+
+    def _buffer_message(self, message: discord.Message) -> None:
+        """
+        Buffers a message received while the bot is locked,
+        the oldest message of the guild is dropped when its buffer is full
+        """
+        if message.author.bot:
+            return
+
+        guild_id = message.guild.id if message.guild else None
+        self._message_buffer[guild_id].append(
+            (time.monotonic(), next(self._message_buffer_counter), message)
+        )
+
+    async def _replay_buffered_messages(self) -> None:
+        """
+        Handles the buffered messages in the order they were received,
+        dropping the ones older than `message_buffer_max_age`
         """
-        self._user_model_cache[user_model.id] = user_model
+        replayed = dropped = 0
+
+        # Messages received during the replay get buffered again
+        while self._message_buffer:
+            buffers = self._message_buffer.values()
+            self._message_buffer = defaultdict(
+                partial(deque, maxlen=self.config.message_buffer_size)
+            )
+
+            for received_at, _, message in list(heapq.merge(*buffers)):
+                if time.monotonic() - received_at > self.config.message_buffer_max_age:
+                    dropped += 1
+                    continue
+
+                try:
+                    await self._handle_message(message)
+                except Exception:  # pylint: disable=W0703
+                    self.logger.exception("Failed to replay message %s", message.id)
+                replayed += 1
+
+        if replayed or dropped:
+            self.logger.info(
+                "Replayed %s buffered messages, dropped %s", replayed, dropped
+            )
 
     # Event Listeners
     async def on_message(self, message: discord.Message) -> None:
@@ -207,6 +572,17 @@ class Bot(commands.Bot):
         Handles the `messages` for further processing
         """
         if self.lock_bot:
+            if self.config.db_config:
+                self._buffer_message(message)
+            return
+
+        await self._handle_message(message)
+
+    async def _handle_message(self, message: discord.Message) -> None:
+        """
+        Processes the commands of an unlocked message
+        """
+        if self.config.prefix_prefilter and not self._is_command_candidate(message):
             return
 
         if f"<@!{self.user.id}>" == message.content.strip():
@@ -220,9 +596,103 @@ class Bot(commands.Bot):
 
         await self.process_commands(message)
 
+    async def get_context(self, message: discord.Message, *, cls=None):
+        """
+        Gets the context as a `TimedContext` unless told otherwise, resolving
+        the prefix is timed as the `prefix` phase of the command found
+        """
+        started_at = time.perf_counter()
+        ctx = await super().get_context(message, cls=cls or TimedContext)
+        # The command is only known once the prefix is resolved
+        PHASE_LATENCY.observe(
+            time.perf_counter() - started_at,
+            phase="prefix",
+            command=ctx.command.qualified_name if ctx.command else "none",
+        )
+        return ctx
+
+    async def invoke(self, ctx: commands.Context) -> None:
+        """
+        Invokes the command recording its latency, phases timed meanwhile
+        are attributed to it
+        """
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        name = ctx.command.qualified_name
+        token = current_command.set(name)
+        ctx.invoked_at = time.perf_counter()
+        COMMANDS.inc(command=name)
+
+        try:
+            await super().invoke(ctx)
+        finally:
+            current_command.reset(token)
+            COMMAND_LATENCY.observe(
+                time.perf_counter() - ctx.invoked_at,
+                command=name,
+                status="error" if ctx.command_failed else "ok",
+            )
+
+    async def _record_checks_phase(self, ctx: commands.Context) -> None:
+        """
+        Records the time from invoking the command until its checks
+        and converters passed
+        """
+        if (invoked_at := getattr(ctx, "invoked_at", None)) is not None:
+            PHASE_LATENCY.observe(
+                time.perf_counter() - invoked_at,
+                phase="checks",
+                command=ctx.command.qualified_name,
+            )
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        """
+        Drops the guild from the prefix index after leaving it
+        """
+        self._prefix_index.pop(guild.id, None)
+
     async def on_ready(self):
         """
         This method is executed when the bot is ready
         after startup
         """
         self.logger.info("Logged in with %s", self.user)
+
+        if self.log_listener is not None:
+            self.log_listener.start()
+
+    async def close(self) -> None:
+        """
+        Sends the remaining log records and stops serving metrics
+        before the session is closed
+        """
+        if self.log_handler is not None:
+            logging.getLogger("bot").removeHandler(self.log_handler)
+
+        if self.log_listener is not None:
+            try:
+                await self.log_listener.stop()
+            except Exception:  # pylint: disable=W0703
+                traceback.print_exc()
+
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+
+        if self.ipc is not None:
+            await self.ipc.close()
+
+        if self.invalidation_channel is not None:
+            await self.invalidation_channel.close()
+
+        await super().close()
+
+
+class ShardedBot(Bot, commands.AutoShardedBot):
+    """
+    This is the `Bot` running its shards in one process,
+    `BotConfig.sharding` picks which shards it runs
+    """
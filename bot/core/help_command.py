@@ -1,12 +1,44 @@
 """This module contains the HelpCommand for PeaceBot"""
 
-from typing import List, Mapping, Optional
+import asyncio
+import copy
+from typing import Any, Callable, Hashable, List, Mapping, Optional, TypeVar
 
+from cachetools import TTLCache
 from discord import Color, Embed
 from discord.ext import commands
 
+from .rate_limit import command_rate_limits
+
 NO_ACCESS_COGS = ["Jishaku"]
 
+T = TypeVar("T")
+
+
+class HelpCache:
+    """
+    This keeps the parts of the help pages which only change when cogs
+    are (re)loaded, along with the recent check results of the users
+    """
+
+    def __init__(self, check_ttl: float = 30.0, check_maxsize: int = 10000):
+        self.pages: dict[Hashable, Any] = {}
+        self.checks: TTLCache = TTLCache(check_maxsize, check_ttl)
+
+    def page(self, key: Hashable, build: Callable[[], T]) -> T:
+        """
+        Returns a cached part of a help page, building it on a miss
+        """
+        try:
+            return self.pages[key]
+        except KeyError:
+            value = self.pages[key] = build()
+            return value
+
+    def clear(self) -> None:
+        self.pages.clear()
+        self.checks.clear()
+
 
 class HelpCommand(commands.HelpCommand):
     """This is the HelpCommand for the bot"""
@@ -15,6 +47,51 @@ class HelpCommand(commands.HelpCommand):
         super().__init__(show_hidden=False, verify_checks=True, *args, **kwargs)
         self.qualified_name = "Help"
 
+    @property
+    def cache(self) -> HelpCache:
+        """This returns the bot's `HelpCache`, shared by every help invocation"""
+        return self.context.bot.help_cache
+
+    def get_bot_mapping(self):
+        """This is the mapping of cogs to their commands, built once per reload"""
+        return self.cache.page("mapping", super().get_bot_mapping)
+
+    def command_usage(self, command: commands.Command) -> str:
+        """This returns the signature of the command without the prefix"""
+        return self.get_command_signature(command)[len(self.clean_prefix) :]
+
+    async def filter_runnable(
+        self, commands_: List[commands.Command]
+    ) -> List[commands.Command]:
+        """
+        Returns the commands the author can run, checking them concurrently.
+        Results are cached briefly for the author in the channel as long as
+        their permissions stay the same
+        """
+        ctx = self.context
+        scope = (
+            ctx.guild.id if ctx.guild else None,
+            ctx.channel.id,
+            ctx.author.id,
+            ctx.channel.permissions_for(ctx.author).value,
+        )
+        checks = self.cache.checks
+
+        async def can_run(command: commands.Command) -> bool:
+            key = (command.qualified_name, *scope)
+            if (result := checks.get(key)) is None:
+                try:
+                    # `can_run` swaps `ctx.command` while checking, every
+                    # concurrent check gets its own context for that
+                    result = await command.can_run(copy.copy(ctx))
+                except commands.CommandError:
+                    result = False
+                checks[key] = result
+            return result
+
+        results = await asyncio.gather(*(can_run(command) for command in commands_))
+        return [command for command, result in zip(commands_, results) if result]
+
     def command_not_found(self, string: str) -> str:
         """This is called when a command is not found"""
         return f"I don't have the command `{string}`"
@@ -48,12 +125,17 @@ class HelpCommand(commands.HelpCommand):
             text="Please keep in mind that these extensions are case sensitive!"
         )
 
-        for cog in mapping.keys():
-            if (
-                getattr(cog, "qualified_name", None) in NO_ACCESS_COGS
-                or getattr(cog, "hidden", False)
-                or not getattr(cog, "cog_help_check", lambda _: False)(self.context)
-            ):
+        cogs = self.cache.page(
+            "cogs",
+            lambda: [
+                cog
+                for cog in mapping.keys()
+                if getattr(cog, "qualified_name", None) not in NO_ACCESS_COGS
+                and not getattr(cog, "hidden", False)
+            ],
+        )
+        for cog in cogs:
+            if not getattr(cog, "cog_help_check", lambda _: False)(self.context):
                 continue
             embed.add_field(
                 name=cog.qualified_name,
@@ -63,46 +145,59 @@ class HelpCommand(commands.HelpCommand):
 
     async def send_command_help(self, command: commands.Command) -> None:
         """This is called when sending help of a command"""
-        if not await command.can_run(self.context):
-            raise self.command_not_found(command.name)
+        if not await self.filter_runnable([command]):
+            return await self.send_error_message(self.command_not_found(command.name))
+
+        page = self.cache.page(
+            ("command", command.qualified_name), lambda: self._command_page(command)
+        )
         embed = Embed(
-            title=f"Help for command: `{command.name}`",
-            description=f"Let me show you what the command {command.qualified_name} is all about!",
-            color=Color.blue(),
+            title=page["title"], description=page["description"], color=Color.blue()
         )
         embed.add_field(
             name="What does this command do?", value=command.help, inline=False
         )
         embed.add_field(
-            name="Usage", value=f"`{self.get_command_signature(command)}`", inline=False
-        )
-
-        # pylint: disable=W0212
-        cooldown = command._buckets._cooldown
-        embed.add_field(
-            name="Cooldown",
-            value=(f"`{cooldown.per} seconds`") if cooldown else "None",
-            inline=False,
+            name="Usage", value=f"`{self.clean_prefix}{page['usage']}`", inline=False
         )
+        embed.add_field(name="Rate limits", value=page["rate_limits"], inline=False)
         await self.dispatch_help(embed)
 
+    def _command_page(self, command: commands.Command) -> dict:
+        """This builds the parts of a command's help which don't depend on the user"""
+        rate_limits = command_rate_limits(command)
+        return {
+            "title": f"Help for command: `{command.name}`",
+            "description": f"Let me show you what the command {command.qualified_name} is all about!",
+            "usage": self.command_usage(command),
+            "rate_limits": "\n".join(f"`{limit}`" for limit in rate_limits) or "None",
+        }
+
     async def send_group_help(self, group: commands.Group) -> None:
         """This is called while sending help of a group"""
+        page = self.cache.page(
+            ("command", group.qualified_name), lambda: self._command_page(group)
+        )
         embed = Embed(
-            title=f"Help for command: `{group.name}`",
-            description=f"Let me show you what the command {group.qualified_name} is all about!",
-            color=Color.blue(),
+            title=page["title"], description=page["description"], color=Color.blue()
         )
         embed.add_field(
             name="What does this command do?", value=group.help, inline=False
         )
         embed.add_field(
-            name="Usage", value=f"`{self.get_command_signature(group)}`", inline=False
+            name="Usage", value=f"`{self.clean_prefix}{page['usage']}`", inline=False
         )
+
+        subcommands = self.cache.page(
+            ("subcommands", group.qualified_name),
+            lambda: {
+                command: self.command_usage(command) for command in group.commands
+            },
+        )
+        prefix = self.clean_prefix
         subcommand_help = [
-            f"**`{self.get_command_signature(command)}`**\n{command.help}"
-            for command in group.commands
-            if await command.can_run(self.context)
+            f"**`{prefix}{subcommands[command]}`**\n{command.help}"
+            for command in await self.filter_runnable(list(subcommands))
         ]
         newline = "\n"
         embed.add_field(
@@ -115,8 +210,18 @@ class HelpCommand(commands.HelpCommand):
     async def send_cog_help(self, cog: commands.Cog) -> None:
         """This is called while sending help of a cog"""
         if cog.qualified_name in NO_ACCESS_COGS or not cog.help_check(self.context):
-            raise self.command_not_found(cog.qualified_name)
+            return await self.send_error_message(
+                self.command_not_found(cog.qualified_name)
+            )
+
+        embed = self.cache.page(
+            ("cog", cog.qualified_name), lambda: self._cog_page(cog)
+        )
+        await self.dispatch_help(embed)
 
+    @staticmethod
+    def _cog_page(cog: commands.Cog) -> Embed:
+        """This builds the help of a cog, the same for every user"""
         embed = Embed(
             title=f"Help for extension: `{cog.qualified_name}`",
             description="Ooooh ther's lots of fun stuff in here!",
@@ -134,8 +239,10 @@ class HelpCommand(commands.HelpCommand):
 
         embed.add_field(
             name="Commands:",
-            value=(", ".join(commands_in_cog))
-            if commands_in_cog
-            else "No Commands Found!",
+            value=(
+                (", ".join(commands_in_cog))
+                if commands_in_cog
+                else "No Commands Found!"
+            ),
         )
-        await self.dispatch_help(embed)
+        return embed
@@ -37,6 +37,82 @@ class LavalinkConfig(BaseModel):
     password: str
 
 
+class ModelCacheConfig(BaseModel):
+    """
+    This is a model containing the config of a `ModelCache`
+    """
+
+    maxsize: int = 1000
+    ttl: Optional[float] = 1000
+    # Caches with a ttl are always lru, "lfu" requires ttl to be None
+    policy: Literal["lru", "lfu"] = "lru"
+    negative_ttl: Optional[float]
+
+
+class TrackSearchCacheConfig(BaseModel):
+    """
+    This is a model containing the config of the music track search cache
+    """
+
+    maxsize: int = 1000
+    ttl: float = 6 * 60 * 60
+    disk_path: Optional[Path]
+    disk_ttl: float = 7 * 24 * 60 * 60
+
+
+class QueueStoreConfig(BaseModel):
+    """
+    This is a model containing the config of the music queue snapshots
+    """
+
+    backend: Literal["database", "file"] = "database"
+    path: Path = Path("queues")
+    flush_interval: float = 5.0
+    position_interval: float = 30.0
+
+
+class MetricsConfig(BaseModel):
+    """
+    This is a model containing the config of the metrics endpoint
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 9100
+
+
+class LoopMonitorConfig(BaseModel):
+    """
+    This is a model containing the config of the event loop monitor
+    """
+
+    interval: float = 0.5
+    lag_threshold: float = 0.1
+    slow_callback_duration: float = 0.1
+    log_interval: float = 60.0
+
+
+class ShardingConfig(BaseModel):
+    """
+    This is a model containing the shards run by an `AutoShardedBot`,
+    discord recommends the shard count when it isn't set
+    """
+
+    shard_count: Optional[int]
+    shard_ids: Optional[list[int]]
+
+
+class ClusterConfig(BaseModel):
+    """
+    This is a model containing the config of a cluster started by the launcher
+    """
+
+    cluster_id: int
+    ipc_host: str = "127.0.0.1"
+    ipc_port: int = 9200
+    ipc_secret: str
+    health_interval: float = 10.0
+
+
 class BotConfig(BaseModel):
     """
     This is a model containg the bot config info
@@ -48,8 +124,34 @@ class BotConfig(BaseModel):
     cogs: Optional[Sequence[str]]
     cogs_dir: Optional[Path]
     lavalink_config: Optional[LavalinkConfig]
+    lavalink_nodes: Sequence[LavalinkConfig] = ()
+    track_search_cache: TrackSearchCacheConfig = TrackSearchCacheConfig()
+    queue_store: Optional[QueueStoreConfig]
     db_config: Optional[DatabaseConfig]
+    cache_invalidation: Optional[Literal["memory", "postgres"]]
+    webhook_log_level: Optional[str] = None
+    metrics: Optional[MetricsConfig]
+    loop_monitor: Optional[LoopMonitorConfig] = None
+    sharding: Optional[ShardingConfig]
+    cluster: Optional[ClusterConfig]
+    guild_cache: ModelCacheConfig = ModelCacheConfig(maxsize=10000)
+    user_cache: ModelCacheConfig = ModelCacheConfig()
     dev_env = True
     private_bot = False
     description = "A simple and shitty discord bot"
     load_jishaku = True
+    warm_guild_cache = False
+    warm_guild_cache_chunk_size = 500
+    prefix_prefilter = True
+    message_buffer_size = 20
+    message_buffer_max_age = 30.0
+    player_idle_timeout = 120.0
+    help_check_ttl = 30.0
+
+    @property
+    def lavalink_configs(self) -> list[LavalinkConfig]:
+        """
+        This returns `lavalink_config` along with `lavalink_nodes`
+        """
+        configs = [self.lavalink_config] if self.lavalink_config else []
+        return [*configs, *self.lavalink_nodes]
@@ -0,0 +1,200 @@
+"""
+This module contains the channels used for invalidating
+the model caches of every running bot process
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+
+from .helpers.config import DatabaseConfig
+
+InvalidationCallback = Callable[[str, int], Awaitable[None]]
+ReconnectCallback = Callable[[], Awaitable[None]]
+
+logger = logging.getLogger("bot.invalidation")
+
+
+class InvalidationChannel(ABC):
+    """
+    Base class for channels which broadcast changed model
+    primary keys to every subscribed bot process
+    """
+
+    def __init__(self, name: str = "bot_cache_invalidation"):
+        self.name = name
+        self._callbacks: list[InvalidationCallback] = []
+        self._reconnect_callbacks: list[ReconnectCallback] = []
+
+    def subscribe(self, callback: InvalidationCallback) -> None:
+        """
+        Registers a coroutine called with the cache name and primary key
+        of every model invalidated through this channel
+        """
+        self._callbacks.append(callback)
+
+    def subscribe_reconnect(self, callback: ReconnectCallback) -> None:
+        """
+        Registers a coroutine called once the channel has reconnected,
+        the invalidations sent while it was disconnected are lost
+        """
+        self._reconnect_callbacks.append(callback)
+
+    async def _dispatch(self, cache_name: str, primary_key: int) -> None:
+        """
+        Calls all the subscribed callbacks for an invalidation
+        """
+        for callback in self._callbacks:
+            try:
+                await callback(cache_name, primary_key)
+            except Exception:  # pylint: disable=W0703
+                logger.exception("Invalidation callback failed for %s", cache_name)
+
+    async def _dispatch_reconnect(self) -> None:
+        """
+        Calls all the subscribed callbacks for a reconnect
+        """
+        for callback in self._reconnect_callbacks:
+            try:
+                await callback()
+            except Exception:  # pylint: disable=W0703
+                logger.exception("Reconnect callback failed for %s", self.name)
+
+    async def connect(self) -> None:
+        """
+        Starts receiving invalidations from the channel
+        """
+
+    async def close(self) -> None:
+        """
+        Stops receiving invalidations from the channel
+        """
+
+    @abstractmethod
+    async def publish(self, cache_name: str, primary_key: int) -> None:
+        """
+        Broadcasts that the model with the primary key has changed
+        to every other process subscribed to the channel
+        """
+
+
+class InMemoryInvalidationChannel(InvalidationChannel):
+    """
+    Invalidation channel shared by every bot in the same process,
+    this is mostly useful as a stand-in for tests
+    """
+
+    _subscribers: defaultdict[str, list["InMemoryInvalidationChannel"]] = defaultdict(
+        list
+    )
+
+    async def connect(self) -> None:
+        self._subscribers[self.name].append(self)
+
+    async def close(self) -> None:
+        if self in self._subscribers[self.name]:
+            self._subscribers[self.name].remove(self)
+
+    async def publish(self, cache_name: str, primary_key: int) -> None:
+        await asyncio.gather(
+            *(
+                channel._dispatch(cache_name, primary_key)
+                for channel in self._subscribers[self.name]
+                if channel is not self
+            )
+        )
+
+
+class PostgresInvalidationChannel(InvalidationChannel):
+    """
+    Invalidation channel using postgres `LISTEN/NOTIFY`
+    on a dedicated connection, which is opened again when it drops
+    """
+
+    def __init__(self, db_config: DatabaseConfig, name: str = "bot_cache_invalidation"):
+        super().__init__(name)
+        self.db_config = db_config
+        self._connection: Optional[asyncpg.Connection] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def connect(self) -> None:
+        connection = await asyncpg.connect(
+            database=self.db_config.db,
+            host=str(self.db_config.host),
+            password=self.db_config.password,
+            port=self.db_config.port,
+            user=self.db_config.user,
+        )
+        await connection.add_listener(self.name, self._on_notification)
+        connection.add_termination_listener(self._on_termination)
+        self._connection = connection
+        logger.info("Listening for cache invalidations on %s", self.name)
+
+    async def close(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+
+        for task in self._tasks:
+            task.cancel()
+
+        # Unset first so the termination isn't taken for a dropped connection
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+    def _on_termination(self, connection: asyncpg.Connection) -> None:
+        """
+        This is called by asyncpg once the connection is closed
+        """
+        if connection is not self._connection:
+            return
+
+        logger.warning("Lost the connection listening on %s", self.name)
+        self._connection = None
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 1.0
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.connect()
+            except Exception:  # pylint: disable=W0703
+                delay = min(delay * 2, 60.0)
+                logger.warning("Failed to reconnect, retrying in %ss", delay)
+            else:
+                break
+
+        self._reconnect_task = None
+        # Invalidations sent meanwhile are lost so the caches can't be trusted
+        await self._dispatch_reconnect()
+
+    async def publish(self, cache_name: str, primary_key: int) -> None:
+        if self._connection is None:
+            return
+
+        await self._connection.execute(
+            "SELECT pg_notify($1, $2)", self.name, f"{cache_name}:{primary_key}"
+        )
+
+    # pylint: disable=W0613
+    def _on_notification(
+        self, connection: asyncpg.Connection, pid: int, channel: str, payload: str
+    ) -> None:
+        """
+        This is called by asyncpg whenever a notification is received
+        """
+        # Notifications are delivered to the publishing connection as well
+        if pid == connection.get_server_pid():
+            return
+
+        cache_name, _, primary_key = payload.rpartition(":")
+        task = asyncio.create_task(self._dispatch(cache_name, int(primary_key)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -0,0 +1,182 @@
+"""
+This module contains the IPC used by the clusters of the bot
+to talk to their launcher and, through it, to each other
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from .helpers.config import ClusterConfig
+
+IPCHandler = Callable[..., Awaitable[Any]]
+
+# Messages are lines of json, a line can't be longer than this
+MAX_MESSAGE_SIZE = 2**20
+
+logger = logging.getLogger("bot.ipc")
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[dict]:
+    """
+    Reads a message, returns None once the connection is closed
+    """
+    line = await reader.readline()
+    return json.loads(line) if line else None
+
+
+async def write_message(writer: asyncio.StreamWriter, message: dict) -> None:
+    writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+    await writer.drain()
+
+
+class IPCError(Exception):
+    """
+    Raised when a request can't be sent to the launcher
+    """
+
+
+class IPCClient:
+    """
+    This connects a cluster to its launcher, answering the requests
+    of the other clusters and reporting the cluster's health
+    """
+
+    def __init__(self, config: ClusterConfig, health: Callable[[], dict]):
+        self.config = config
+        self.health = health
+        self.handlers: dict[str, IPCHandler] = {}
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def cluster_id(self) -> int:
+        return self.config.cluster_id
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def register(self, method: str, handler: IPCHandler) -> None:
+        """
+        Registers the coroutine answering the requests for `method`,
+        it's called with the arguments of the request
+        """
+        self.handlers[method] = handler
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def request(
+        self,
+        method: str,
+        target: Union[int, str] = "all",
+        timeout: float = 5.0,
+        **args,
+    ) -> dict[str, dict]:
+        """
+        Sends a request to the clusters, or to one of them by id, and
+        returns their results by cluster id. Requests targeting the
+        launcher are answered by the launcher itself
+        """
+        if not self.is_connected:
+            raise IPCError("Not connected to the cluster launcher")
+
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_event_loop().create_future()
+        try:
+            await write_message(
+                self._writer,
+                {
+                    "op": "request",
+                    "id": request_id,
+                    "method": method,
+                    "target": target,
+                    "timeout": timeout,
+                    "args": args,
+                },
+            )
+            # The launcher answers for the clusters which timed out
+            return await asyncio.wait_for(future, timeout + 1)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(
+                    self.config.ipc_host, self.config.ipc_port, limit=MAX_MESSAGE_SIZE
+                )
+                await write_message(
+                    self._writer,
+                    {
+                        "op": "identify",
+                        "cluster_id": self.cluster_id,
+                        "secret": self.config.ipc_secret,
+                    },
+                )
+                logger.info("Connected to the cluster launcher")
+                delay = 1.0
+
+                reporter = asyncio.get_event_loop().create_task(self._report_health())
+                try:
+                    await self._listen(reader)
+                finally:
+                    reporter.cancel()
+            except (OSError, ValueError):
+                logger.warning("Lost the connection to the cluster launcher")
+
+            self._writer = None
+            for future in self._pending.values():
+                future.cancel()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def _report_health(self) -> None:
+        while True:
+            try:
+                await write_message(
+                    self._writer, {"op": "health", "health": self.health()}
+                )
+            except Exception:  # pylint: disable=W0703
+                logger.exception("Failed to report the cluster's health")
+            await asyncio.sleep(self.config.health_interval)
+
+    async def _listen(self, reader: asyncio.StreamReader) -> None:
+        while (message := await read_message(reader)) is not None:
+            if message["op"] == "request":
+                asyncio.get_event_loop().create_task(self._answer(message))
+            elif message["op"] == "response":
+                future = self._pending.get(message["id"])
+                if future is not None and not future.done():
+                    future.set_result(message["results"])
+
+    async def _answer(self, request: dict) -> None:
+        response = {"op": "response", "id": request["id"]}
+
+        if (handler := self.handlers.get(request["method"])) is None:
+            response["error"] = f"Unknown method {request['method']}"
+        else:
+            try:
+                response["result"] = await handler(**request["args"])
+            except Exception as error:  # pylint: disable=W0703
+                logger.exception("Failed to answer %s", request["method"])
+                response["error"] = f"{type(error).__name__}: {error}"
+
+        if self.is_connected:
+            await write_message(self._writer, response)
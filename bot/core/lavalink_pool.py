@@ -0,0 +1,125 @@
+"""
+This module contains `LavalinkPool` for spreading the
+players of the bot across multiple lavalink nodes
+"""
+
+import logging
+from typing import Optional
+
+import discord
+import wavelink
+
+from .helpers.config import LavalinkConfig
+
+logger = logging.getLogger("bot.lavalink_pool")
+
+
+def node_load(node: wavelink.Node) -> float:
+    """
+    Returns the load of the node, this is wavelink's penalty
+    but counts the players created since the last stats update
+    """
+    load = float(len(node.players))
+
+    if stats := node.stats:
+        penalty = stats.penalty
+        load += (
+            penalty.cpu_penalty
+            + penalty.null_frame_penalty
+            + penalty.deficit_frame_penalty
+        )
+
+    return load
+
+
+class LavalinkPool:
+    """
+    Manages the lavalink nodes of `wavelink.Client`
+    and picks the node new players are created on
+    """
+
+    def __init__(self, client: wavelink.Client):
+        self.client = client
+        # Nodes being removed, wavelink reopens them while moving players
+        self.draining: set[str] = set()
+
+    @property
+    def nodes(self) -> list[wavelink.Node]:
+        """
+        This returns the nodes which can take new players
+        """
+        return [
+            node
+            for node in self.client.nodes.values()
+            if node.is_available and node.identifier not in self.draining
+        ]
+
+    async def add_node(self, lavalink_config: LavalinkConfig) -> wavelink.Node:
+        """
+        Connects to a lavalink node and adds it to the pool
+        """
+        node = await self.client.initiate_node(
+            host=str(lavalink_config.host),
+            port=lavalink_config.port,
+            password=lavalink_config.password,
+            identifier=lavalink_config.identifier,
+            region=lavalink_config.region.value,
+            rest_uri=lavalink_config.rest_url,
+        )
+        logger.info("Added lavalink node %s", lavalink_config.identifier)
+        return node
+
+    async def remove_node(self, identifier: str) -> int:
+        """
+        Moves the node's players to the other nodes and removes it from
+        the pool. Players which couldn't be moved are stopped and the node
+        is kept drained, returns how many of them are left on it
+        """
+        if not (node := self.client.get_node(identifier)):
+            raise KeyError(identifier)
+
+        # Stops new players from being created on the node
+        self.draining.add(identifier)
+        node.close()
+
+        for player in list(node.players.values()):
+            try:
+                if (new_node := self.select_node(node.region)) is None:
+                    raise wavelink.WavelinkException("No nodes to move the player to")
+                await player.change_node(new_node.identifier)
+            except wavelink.WavelinkException:
+                logger.exception("Couldn't move player of guild %s", player.guild_id)
+                await player.stop()
+            finally:
+                # `Player.change_node` opens the node it moved away from
+                node.close()
+
+        if left := len(node.players):
+            logger.warning(
+                "Kept lavalink node %s drained, %s players are left on it",
+                identifier,
+                left,
+            )
+            return left
+
+        await self.client.destroy_node(identifier=identifier)
+        self.draining.discard(identifier)
+        logger.info("Removed lavalink node %s", identifier)
+        return 0
+
+    def select_node(self, region: Optional[str] = None) -> Optional[wavelink.Node]:
+        """
+        Returns the least loaded node, preferring nodes in the region
+        """
+        nodes = self.nodes
+        if region:
+            region = region.replace("-", "_").lower()
+            nodes = [node for node in nodes if node.region.lower() == region] or nodes
+
+        return min(nodes, key=node_load, default=None)
+
+    def select_node_for_guild(self, guild: discord.Guild) -> Optional[wavelink.Node]:
+        """
+        Returns the node a new player of the guild should be created on
+        """
+        return self.select_node(str(guild.region))
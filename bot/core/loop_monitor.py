@@ -0,0 +1,154 @@
+"""
+This module watches the event loop for lag and for the callbacks
+which block it, outside of asyncio's debug mode too
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from asyncio import events
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from .metrics import REGISTRY, Counter, Gauge, Histogram
+
+logger = logging.getLogger("bot.loop_monitor")
+
+LOOP_LAG = REGISTRY.register(
+    Histogram(
+        "bot_loop_lag_seconds",
+        "How late the loop lag sampler woke up",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    )
+)
+LOOP_LAG_MAX = REGISTRY.register(
+    Gauge("bot_loop_lag_max_seconds", "Highest loop lag in the current window")
+)
+SLOW_CALLBACKS = REGISTRY.register(
+    Counter(
+        "bot_slow_callbacks_total",
+        "Callbacks which blocked the loop for too long",
+        ("callback",),
+    )
+)
+SLOW_CALLBACK_DURATION = REGISTRY.register(
+    Histogram(
+        "bot_slow_callback_seconds",
+        "Time the loop was blocked by slow callbacks",
+        buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    )
+)
+
+_original_run: Optional[Callable[[events.Handle], None]] = None
+
+
+def describe_callback(handle: events.Handle) -> str:
+    """
+    Names the callback of the handle, tasks are named by the
+    coroutines they're awaiting
+    """
+    # pylint: disable=protected-access
+    callback = handle._callback
+    task = getattr(callback, "__self__", None)
+
+    if not isinstance(task, asyncio.Task):
+        if isinstance(callback, functools.partial):
+            callback = callback.func
+        # Names are kept free of addresses as they become metric labels
+        return getattr(callback, "__qualname__", type(callback).__qualname__)
+
+    names = []
+    coro = task.get_coro()
+    while hasattr(coro, "cr_code") or hasattr(coro, "gi_code"):
+        names.append(coro.__qualname__)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+
+    # The innermost coroutines tell more about what was running
+    return " > ".join(names[-3:]) or "Task"
+
+
+class LoopMonitor:
+    """
+    This samples the lag of the event loop and times every callback
+    it runs, reporting the ones slower than `slow_callback_duration`
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.5,
+        lag_threshold: float = 0.1,
+        slow_callback_duration: float = 0.1,
+        log_interval: float = 60.0,
+    ) -> None:
+        self.interval = interval
+        self.lag_threshold = lag_threshold
+        self.slow_callback_duration = slow_callback_duration
+        self.log_interval = log_interval
+        self.slow_callbacks: Deque[Tuple[float, str, float]] = deque(maxlen=50)
+        self._last_logged: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Starts sampling the lag and timing the callbacks
+        """
+        global _original_run  # pylint: disable=W0603
+        if _original_run is None:
+            _original_run = events.Handle._run
+        monitor = self
+
+        def _run(handle: events.Handle) -> None:
+            start = time.perf_counter()
+            _original_run(handle)
+            if (duration := time.perf_counter() - start) >= (
+                monitor.slow_callback_duration
+            ):
+                monitor.record_slow_callback(handle, duration)
+
+        events.Handle._run = _run  # pylint: disable=protected-access
+
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._sample())
+
+    def stop(self) -> None:
+        if _original_run is not None:
+            events.Handle._run = _original_run  # pylint: disable=protected-access
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def record_slow_callback(self, handle: events.Handle, duration: float) -> None:
+        name = describe_callback(handle)
+        SLOW_CALLBACKS.inc(callback=name)
+        SLOW_CALLBACK_DURATION.observe(duration)
+        self.slow_callbacks.append((time.time(), name, duration))
+
+        if self._should_log(name):
+            logger.warning("Event loop blocked for %.0fms by %s", duration * 1000, name)
+
+    def _should_log(self, key: str) -> bool:
+        # Logged once in a while so a hot spot can't flood the logs
+        now = time.monotonic()
+        if now - self._last_logged.get(key, -self.log_interval) < self.log_interval:
+            return False
+        self._last_logged[key] = now
+        return True
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_event_loop()
+        highest, window_start = 0.0, loop.time()
+
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+
+            LOOP_LAG.observe(lag)
+            if loop.time() - window_start >= self.log_interval:
+                highest, window_start = 0.0, loop.time()
+            highest = max(highest, lag)
+            LOOP_LAG_MAX.set(highest)
+
+            if lag >= self.lag_threshold and self._should_log("loop lag"):
+                logger.warning("Event loop lagged by %.0fms", lag * 1000)
@@ -0,0 +1,298 @@
+"""
+This module contains the metrics of the bot, kept in memory and
+rendered in the Prometheus text format
+"""
+
+import contextlib
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger("bot.metrics")
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Sequence[str], LabelValues, float]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The command being invoked, tasks created by it inherit the value
+current_command: ContextVar[str] = ContextVar("current_command", default="none")
+
+
+def _escape_label(value: str) -> str:
+    """
+    Escapes the label value as the Prometheus text format expects
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric(ABC):
+    """
+    This is the base of the metrics, which are kept per set of label values
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, labels: dict) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        """
+        Yields the suffix, label names, label values and value of every sample
+        """
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    """
+    This is a value which only goes up
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield "", self.labels, key, value
+
+
+class Gauge(Metric):
+    """
+    This is a value which is set to the latest measurement
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self._key(labels)] = value
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield "", self.labels, key, value
+
+
+class HistogramValue:
+    """
+    This holds the bucket counts of one set of label values
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def merge(self, other: "HistogramValue") -> None:
+        self.sum += other.sum
+        self.count += other.count
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the quantile as the upper bound of the bucket it falls in
+        """
+        rank = math.ceil(q * self.count)
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+
+class Histogram(Metric):
+    """
+    This counts observations in cumulative buckets
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self.values: Dict[LabelValues, HistogramValue] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        if (histogram := self.values.get(key)) is None:
+            histogram = self.values[key] = HistogramValue(self.buckets)
+        histogram.observe(value)
+
+    def get(self, **labels) -> Optional[HistogramValue]:
+        return self.values.get(self._key(labels))
+
+    def by(self, label: str) -> Dict[str, HistogramValue]:
+        """
+        Returns the histograms merged by the values of `label`
+        """
+        index = self.labels.index(label)
+        merged: Dict[str, HistogramValue] = {}
+
+        for key, histogram in self.values.items():
+            if (total := merged.get(key[index])) is None:
+                total = merged[key[index]] = HistogramValue(self.buckets)
+            total.merge(histogram)
+
+        return merged
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        names = (*self.labels, "le")
+        for key, histogram in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                yield "_bucket", names, (*key, bound), cumulative
+            yield "_bucket", names, (*key, "+Inf"), histogram.count
+            yield "_sum", self.labels, key, histogram.sum
+            yield "_count", self.labels, key, histogram.count
+
+
+class MetricsRegistry:
+    """
+    This holds every metric and renders them for scraping
+    """
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+COMMANDS = REGISTRY.register(
+    Counter("bot_commands_total", "Commands invoked", ("command",))
+)
+COMMAND_ERRORS = REGISTRY.register(
+    Counter("bot_command_errors_total", "Commands which failed", ("command", "error"))
+)
+COMMAND_LATENCY = REGISTRY.register(
+    Histogram(
+        "bot_command_latency_seconds",
+        "Time taken to invoke commands, checks included",
+        ("command", "status"),
+    )
+)
+PHASE_LATENCY = REGISTRY.register(
+    Histogram(
+        "bot_phase_latency_seconds",
+        "Time spent in each phase of handling commands",
+        ("phase", "command"),
+    )
+)
+
+
+def time_phase(phase: str):
+    """
+    Times the block as `phase` of the command being invoked
+    """
+    return PHASE_LATENCY.time(phase=phase, command=current_command.get())
+
+
+class MetricsServer:
+    """
+    This serves the registry over HTTP for Prometheus to scrape
+    """
+
+    def __init__(
+        self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9100
+    ) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, _: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,200 @@
+"""
+This module contains `ModelCache`, a typed cache for Tortoise models
+which cogs can register on `Bot`
+"""
+
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Generic, Literal, Optional, Type, TypeVar
+
+from cachetools import Cache, LFUCache, LRUCache, TTLCache
+from tortoise import Model
+
+from .helpers.config import ModelCacheConfig
+
+ModelT = TypeVar("ModelT", bound=Model)
+ModelLoader = Callable[[int], Awaitable[Optional[ModelT]]]
+
+CACHE_POLICIES: dict[str, Type[Cache]] = {"lru": LRUCache, "lfu": LFUCache}
+
+
+def _counting_cache(cache_cls: Type[Cache], stats: Counter, *args, **kwargs) -> Cache:
+    """
+    Creates a cache of `cache_cls` which counts its
+    evictions and expirations in `stats`
+    """
+
+    class CountingCache(cache_cls):
+        """Cache which records why items were removed from it"""
+
+        def popitem(self):
+            item = super().popitem()
+            stats["eviction"] += 1
+            return item
+
+    if issubclass(cache_cls, TTLCache):
+
+        def expire(self, *expire_args, **expire_kwargs):
+            size = Cache.__len__(self)
+            TTLCache.expire(self, *expire_args, **expire_kwargs)
+            stats["expiration"] += size - Cache.__len__(self)
+
+        CountingCache.expire = expire
+
+    return CountingCache(*args, **kwargs)
+
+
+class ModelCache(Generic[ModelT]):
+    """
+    Caches Tortoise models by primary key, concurrent misses
+    for the same key share one lookup of the `loader`
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelT],
+        maxsize: int = 1000,
+        ttl: Optional[float] = None,
+        policy: Literal["lru", "lfu"] = "lru",
+        negative_ttl: Optional[float] = None,
+        loader: Optional[ModelLoader] = None,
+        name: Optional[str] = None,
+    ):
+        if ttl and policy != "lru":
+            raise ValueError(
+                f"The {policy} policy can't be used with a ttl, set ttl to None"
+            )
+
+        self.model = model
+        self.name = name or model.__name__
+        self.maxsize = maxsize
+        self.stats: Counter = Counter(
+            hit=0,
+            miss=0,
+            coalesced=0,
+            negative_hit=0,
+            eviction=0,
+            expiration=0,
+        )
+
+        self._loader = loader or self._get_or_none
+        # TTLCache is an LRU cache with a per item time to live
+        self._cache = (
+            _counting_cache(TTLCache, self.stats, maxsize, ttl)
+            if ttl
+            else _counting_cache(CACHE_POLICIES[policy], self.stats, maxsize)
+        )
+        self._negative_cache = TTLCache(maxsize, negative_ttl) if negative_ttl else None
+        self._lookups: dict[int, asyncio.Future] = {}
+
+    @classmethod
+    def from_config(
+        cls,
+        model: Type[ModelT],
+        config: ModelCacheConfig,
+        loader: Optional[ModelLoader] = None,
+    ) -> "ModelCache[ModelT]":
+        """
+        Creates the cache from a `ModelCacheConfig`
+        """
+        return cls(
+            model,
+            maxsize=config.maxsize,
+            ttl=config.ttl,
+            policy=config.policy,
+            negative_ttl=config.negative_ttl,
+            loader=loader,
+        )
+
+    async def _get_or_none(self, primary_key: int) -> Optional[ModelT]:
+        """
+        This is the default loader of the cache
+        """
+        return await self.model.get_or_none(pk=primary_key)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, primary_key: int) -> bool:
+        return primary_key in self._cache
+
+    def get_cached(self, primary_key: int) -> Optional[ModelT]:
+        """
+        Gets the model from the cache without loading it
+        """
+        return self._cache.get(primary_key)
+
+    async def get(self, primary_key: int) -> Optional[ModelT]:
+        """
+        Gets the model from the cache or loads it with the `loader`
+        """
+        if (model := self._cache.get(primary_key)) is not None:
+            self.stats["hit"] += 1
+            return model
+
+        if self._negative_cache is not None and primary_key in self._negative_cache:
+            self.stats["negative_hit"] += 1
+            return None
+
+        # Another coroutine is already loading this model, wait for it
+        if (lookup := self._lookups.get(primary_key)) is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(lookup)
+
+        self.stats["miss"] += 1
+        lookup = asyncio.get_event_loop().create_future()
+        self._lookups[primary_key] = lookup
+
+        try:
+            model = await self._loader(primary_key)
+        except asyncio.CancelledError:
+            lookup.cancel()
+            raise
+        except Exception as error:
+            lookup.set_exception(error)
+            # Retrieves the exception so it isn't logged when nobody waits
+            lookup.exception()
+            raise
+        else:
+            if model is not None:
+                self._cache[primary_key] = model
+            elif self._negative_cache is not None:
+                self._negative_cache[primary_key] = True
+            lookup.set_result(model)
+        finally:
+            del self._lookups[primary_key]
+
+        return model
+
+    def set(self, model: ModelT) -> None:
+        """
+        Stores the model in the cache
+        """
+        self._cache[model.pk] = model
+        if self._negative_cache is not None:
+            self._negative_cache.pop(model.pk, None)
+
+    def invalidate(self, primary_key: int) -> None:
+        """
+        Removes the model from the cache
+        """
+        self._cache.pop(primary_key, None)
+        if self._negative_cache is not None:
+            self._negative_cache.pop(primary_key, None)
+
+    def clear(self) -> None:
+        """
+        Removes every model from the cache
+        """
+        self._cache.clear()
+        if self._negative_cache is not None:
+            self._negative_cache.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        This returns the share of lookups answered from the cache
+        """
+        hits = self.stats["hit"] + self.stats["negative_hit"] + self.stats["coalesced"]
+        total = hits + self.stats["miss"]
+        return hits / total if total else 0.0
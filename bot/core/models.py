@@ -44,3 +44,30 @@ class UserModel(Model):
 
         table = "users"
         description = "Represent a discord user"
+
+
+class PlayerQueueModel(Model):
+    """
+    `PlayerQueueModel` is used to store the snapshot of a guild's
+    music queue so it can be resumed after a restart
+    """
+
+    id = fields.BigIntField(pk=True, description="Guild ID")
+    channel_id = fields.BigIntField(description="Voice channel ID of the player")
+    position = fields.IntField(description="Position of the current track")
+    repeat_mode = fields.CharField(max_length=8, description="Repeat mode")
+    track_position = fields.BigIntField(
+        description="Playback position in the current track in milliseconds"
+    )
+    tracks = fields.JSONField(description="Encoded tracks of the queue")
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    # pylint: disable=R0903
+    class Meta:
+        """
+        `PlayerQueueModel.Meta` is a meta class containg `PlayerQueueModel`
+        database table's info and description
+        """
+
+        table = "player_queues"
+        description = "Represent the music queue of a discord guild"
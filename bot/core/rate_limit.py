@@ -0,0 +1,184 @@
+"""
+This module contains the token bucket rate limits of the commands,
+set on cogs through `BetterCog` or on commands with `rate_limit`
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Literal, Optional, Sequence
+from weakref import WeakKeyDictionary
+
+from discord.ext import commands
+
+from .metrics import REGISTRY, Counter
+
+Scope = Literal["global", "guild", "user"]
+
+RATE_LIMITED = REGISTRY.register(
+    Counter(
+        "bot_rate_limited_total",
+        "Command invocations refused by a rate limit",
+        ("command", "scope"),
+    )
+)
+
+
+class RateLimit:
+    """
+    This is a token bucket allowing `rate` invocations every `per` seconds,
+    bursts of up to `burst` of them, with a bucket for every `scope`
+    """
+
+    __slots__ = ("rate", "per", "burst", "scope", "__weakref__")
+
+    def __init__(
+        self, rate: int, per: float, scope: Scope = "guild", burst: Optional[int] = None
+    ):
+        self.rate = rate
+        self.per = per
+        self.scope = scope
+        self.burst = burst or rate
+
+    @property
+    def refill_rate(self) -> float:
+        """This returns the tokens added to a bucket every second"""
+        return self.rate / self.per
+
+    @property
+    def refill_time(self) -> float:
+        """This returns the time an empty bucket takes to fill up"""
+        return self.burst / self.refill_rate
+
+    def key(self, ctx: commands.Context) -> int:
+        """
+        Returns the id of the bucket for the invocation,
+        DMs are limited per user in place of per guild
+        """
+        if self.scope == "global":
+            return 0
+        if self.scope == "guild" and ctx.guild is not None:
+            return ctx.guild.id
+        return ctx.author.id
+
+    def __str__(self) -> str:
+        text = f"{self.rate} per {self.per:g}s"
+        if self.burst != self.rate:
+            text += f" (bursts of {self.burst})"
+        return (
+            f"{text} globally" if self.scope == "global" else f"{text} per {self.scope}"
+        )
+
+
+class TokenBucket:
+    """
+    This is the state of one bucket of a `RateLimit`
+    """
+
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class RateLimited(commands.CommandError):
+    """
+    Raised when a rate limit of the command is out of tokens
+    """
+
+    def __init__(self, limit: RateLimit, retry_after: float):
+        self.limit = limit
+        self.retry_after = retry_after
+        super().__init__(
+            f"This command is limited to {limit}, "
+            f"try again in {retry_after:.1f} seconds."
+        )
+
+
+def rate_limit(
+    rate: int, per: float, scope: Scope = "guild", burst: Optional[int] = None
+) -> Callable:
+    """
+    Adds a rate limit to the command, it can be used more than once
+    """
+    limit = RateLimit(rate, per, scope, burst)
+
+    def decorator(func):
+        callback = func.callback if isinstance(func, commands.Command) else func
+        if not hasattr(callback, "__rate_limits__"):
+            callback.__rate_limits__ = []
+        callback.__rate_limits__.append(limit)
+        return func
+
+    return decorator
+
+
+def command_rate_limits(command: commands.Command) -> list[RateLimit]:
+    """
+    Returns the rate limits of the command, the ones of its cog
+    and of its parents included
+    """
+    limits = list(getattr(command.cog, "rate_limits", ()))
+    parents = reversed([command, *command.parents])
+    for parent in parents:
+        limits.extend(getattr(parent.callback, "__rate_limits__", ()))
+    return limits
+
+
+class RateLimiter:
+    """
+    This keeps the buckets of every rate limit of the bot. Buckets are kept
+    ordered by their last use, the ones idle long enough to fill up again
+    are evicted as they're the same as new ones
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        # Limits of unloaded cogs take their buckets with them
+        self._buckets: WeakKeyDictionary = WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for buckets in self._buckets.values())
+
+    def _bucket(self, limit: RateLimit, key: int, now: float) -> TokenBucket:
+        """
+        Returns the refilled bucket of `key`, evicting idle buckets on the way
+        """
+        if (buckets := self._buckets.get(limit)) is None:
+            buckets = self._buckets[limit] = OrderedDict()
+
+        refill_time = limit.refill_time
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if now - oldest.updated_at < refill_time:
+                break
+            buckets.popitem(last=False)
+
+        if (bucket := buckets.get(key)) is None:
+            bucket = buckets[key] = TokenBucket(limit.burst, now)
+        else:
+            bucket.tokens = min(
+                limit.burst,
+                bucket.tokens + (now - bucket.updated_at) * limit.refill_rate,
+            )
+            bucket.updated_at = now
+            buckets.move_to_end(key)
+        return bucket
+
+    def acquire(self, ctx: commands.Context, limits: Sequence[RateLimit]) -> None:
+        """
+        Takes a token from every limit for the invocation, none are taken
+        and `RateLimited` is raised when one of them is out of tokens
+        """
+        now = self.clock()
+        buckets = [
+            (limit, self._bucket(limit, limit.key(ctx), now)) for limit in limits
+        ]
+
+        for limit, bucket in buckets:
+            if bucket.tokens < 1:
+                RATE_LIMITED.inc(command=ctx.command.qualified_name, scope=limit.scope)
+                raise RateLimited(limit, (1 - bucket.tokens) / limit.refill_rate)
+
+        for _, bucket in buckets:
+            bucket.tokens -= 1
@@ -8,7 +8,7 @@ from pydantic import BaseSettings, HttpUrl
 
 from .core.helpers.config import DatabaseConfig, LavalinkConfig
 
-__all__ = ("bot_config", "db_config", "lavalink_config")
+__all__ = ("bot_config", "cluster_config", "db_config", "lavalink_config")
 
 
 class BotConfig(BaseSettings):
@@ -22,6 +22,9 @@ class BotConfig(BaseSettings):
     dev_env = False
     private_bot: Optional[bool]
     load_jishaku: Optional[bool]
+    sharded = False
+    shard_count: Optional[int]
+    shard_ids: Optional[list[int]]
 
     class Config:
         """This is the config class containg info about env prefix and file"""
@@ -54,7 +57,25 @@ class BotLavalinkConfig(BaseSettings, LavalinkConfig):
         env_prefix = "lavalink_"
 
 
+class BotClusterConfig(BaseSettings):
+    """
+    Parses the cluster config set by the cluster launcher
+    """
+
+    id: Optional[int]
+    ipc_host = "127.0.0.1"
+    ipc_port = 9200
+    ipc_secret: Optional[str]
+
+    class Config:
+        """This is the config class containg info about env prefix and file"""
+
+        env_file = ".env"
+        env_prefix = "cluster_"
+
+
 bot_config = BotConfig()
+cluster_config = BotClusterConfig()
 
 db_config = BotDatabaseConfig()
 lavalink_config = BotLavalinkConfig()
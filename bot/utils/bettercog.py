@@ -1,11 +1,12 @@
 """This module contains BetterCog and other required methods for it"""
 import logging
-from typing import Optional, Union
+from typing import Optional, Sequence, Union
 
 import discord
 from discord.ext import commands
 
 from bot import Bot
+from bot.core.rate_limit import RateLimit, command_rate_limits
 
 
 class CommandCannotRun(commands.CommandError):
@@ -23,10 +24,12 @@ class BetterCog(commands.Cog):
         bot: Bot,
         error_msg: Optional[str] = None,
         cog_hidden: Optional[bool] = False,
+        rate_limits: Sequence[RateLimit] = (),
         **kwargs,
     ):
         self.bot = bot
         self.hidden = cog_hidden
+        self.rate_limits = rate_limits
         self.error_msg = error_msg
         super().__init__(**kwargs)
 
@@ -41,6 +44,14 @@ class BetterCog(commands.Cog):
             return True
         raise CommandCannotRun(self.error_msg)
 
+    async def cog_before_invoke(self, ctx: commands.Context) -> None:
+        """
+        This takes a token from the rate limits of the command and its cog,
+        cogs overriding it need to call it through super()
+        """
+        if limits := command_rate_limits(ctx.command):
+            self.bot.rate_limiter.acquire(ctx, limits)
+
     # pylint: disable=W0613, R0201
     def cog_help_check(self, ctx: commands.Context) -> bool:
         """
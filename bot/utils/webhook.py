@@ -0,0 +1,37 @@
+"""
+This module contains helpers for sending embeds through webhooks
+"""
+
+from typing import Iterable, List
+
+from discord import Embed
+
+# Limits discord puts on a single webhook message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARACTERS = 6000
+
+
+def batch_embeds(embeds: Iterable[Embed]) -> List[List[Embed]]:
+    """
+    Splits the embeds into as few webhook messages as the limits allow,
+    keeping their order
+    """
+    batches: List[List[Embed]] = []
+    batch: List[Embed] = []
+    characters = 0
+
+    for embed in embeds:
+        size = len(embed)
+        if batch and (
+            len(batch) == MAX_EMBEDS or characters + size > MAX_EMBED_CHARACTERS
+        ):
+            batches.append(batch)
+            batch, characters = [], 0
+
+        batch.append(embed)
+        characters += size
+
+    if batch:
+        batches.append(batch)
+
+    return batches
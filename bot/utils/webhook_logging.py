@@ -0,0 +1,145 @@
+"""
+This module forwards log records to the log webhook
+without awaiting anything where they are logged
+"""
+
+import asyncio
+import logging
+import logging.handlers
+import queue
+from typing import Awaitable, Callable, List, Optional
+
+from discord import Color, Embed
+
+from .webhook import batch_embeds
+
+logger = logging.getLogger("bot.webhook_logging")
+
+# Records longer than this are cut so they fit in an embed's description
+MAX_RECORD_LENGTH = 1900
+
+# Loggers of the code posting to the log webhook, their records about
+# failing to post would otherwise feed themselves
+WEBHOOK_LOGGERS = (logger.name, "bot.error_reporter")
+
+LEVEL_COLORS = {
+    logging.WARNING: Color.orange(),
+    logging.ERROR: Color.red(),
+    logging.CRITICAL: Color.dark_red(),
+}
+
+
+class WebhookLogHandler(logging.handlers.QueueHandler):
+    """
+    This handler puts the records on a bounded queue, records are
+    dropped and counted once it's full
+    """
+
+    def __init__(self, level: int = logging.WARNING, maxsize: int = 1000) -> None:
+        super().__init__(queue.Queue(maxsize))
+        self.setLevel(level)
+        self.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name not in WEBHOOK_LOGGERS and super().filter(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class WebhookLogListener:
+    """
+    This drains the queue of a `WebhookLogHandler` on a background task and
+    sends the records in batches
+    """
+
+    def __init__(
+        self,
+        handler: WebhookLogHandler,
+        send: Callable[[List[Embed]], Awaitable[None]],
+        interval: float = 5.0,
+    ) -> None:
+        self.handler = handler
+        self._send = send
+        self.interval = interval
+        self._reported_dropped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:  # pylint: disable=W0703
+                logger.exception("Failed to send log records")
+
+    def _drain(self) -> List[logging.LogRecord]:
+        records = []
+        while True:
+            try:
+                records.append(self.handler.queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    @staticmethod
+    def _to_embeds(records: List[logging.LogRecord]) -> List[Embed]:
+        # As many records as fit are put in each embed
+        embeds: List[Embed] = []
+        lines: List[str] = []
+        length = levelno = 0
+
+        for record in records:
+            line = (
+                f"[{record.levelname}] {record.name}: "
+                f"{record.getMessage()}"[:MAX_RECORD_LENGTH]
+            )
+            if lines and length + len(line) > MAX_RECORD_LENGTH:
+                embeds.append(_records_embed(lines, levelno))
+                lines, length, levelno = [], 0, 0
+
+            lines.append(line)
+            length += len(line) + 1
+            levelno = max(levelno, record.levelno)
+
+        if lines:
+            embeds.append(_records_embed(lines, levelno))
+
+        return embeds
+
+    async def flush(self) -> None:
+        embeds = self._to_embeds(self._drain())
+
+        if (dropped := self.handler.dropped - self._reported_dropped) > 0:
+            self._reported_dropped += dropped
+            embeds.append(
+                Embed(
+                    title="Dropped log records",
+                    description=f"**{dropped}** records didn't fit in the buffer",
+                    color=Color.dark_red(),
+                )
+            )
+
+        for batch in batch_embeds(embeds):
+            await self._send(batch)
+
+
+def _records_embed(lines: List[str], levelno: int) -> Embed:
+    return Embed(
+        title="Log records",
+        description="```\n" + "\n".join(lines) + "\n```",
+        color=LEVEL_COLORS.get(levelno, Color.orange()),
+    )
@@ -0,0 +1,24 @@
+"""
+Sets up the environment so the bot package can be imported without
+discord, lavalink or the database being reachable
+"""
+
+import os
+
+# `bot.env` parses these when the bot package is imported
+TEST_ENV = {
+    "BOT_PREFIX": "!",
+    "BOT_TOKEN": "test",
+    "BOT_WEBHOOK_URL": "https://discord.com/api/webhooks/0/test",
+    "POSTGRES_DB": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_USER": "test",
+    "LAVALINK_HOST": "localhost",
+    "LAVALINK_PORT": "2333",
+    "LAVALINK_REST_URL": "http://localhost:2333",
+    "LAVALINK_PASSWORD": "test",
+}
+
+for key, value in TEST_ENV.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,70 @@
+import pytest
+
+from bot.cogs.music.utils.eq import (
+    EQ_PRESETS,
+    PRESET_LEVELS,
+    parse_band,
+    parse_band_gains,
+    parse_gain,
+)
+from bot.cogs.music.utils.errors import (
+    EQGainOutOfBounds,
+    InvalidEQBandGain,
+    NonExistentEQBand,
+)
+from bot.cogs.music.utils.types import HZ_BANDS
+
+
+def test_bands_by_number_and_frequency():
+    assert parse_band("1") == 0
+    assert parse_band("15") == 14
+    assert parse_band("63") == HZ_BANDS.index(63)
+    assert parse_band("1000Hz") == HZ_BANDS.index(1000)
+    assert parse_band("16000hz") == 14
+
+
+@pytest.mark.parametrize("band", ["0", "16", "64", "-1", "bass", ""])
+def test_unknown_bands(band):
+    with pytest.raises(NonExistentEQBand):
+        parse_band(band)
+
+
+def test_gains():
+    assert parse_gain("+3") == 0.3
+    assert parse_gain("-10") == -1
+    assert parse_gain("0") == 0
+
+    with pytest.raises(EQGainOutOfBounds):
+        parse_gain("10.5")
+    with pytest.raises(InvalidEQBandGain):
+        parse_gain("loud")
+
+
+def test_band_gain_pairs():
+    assert parse_band_gains(("63=+3", "1000=-2", "1=1")) == {
+        HZ_BANDS.index(63): 0.3,
+        HZ_BANDS.index(1000): -0.2,
+        0: 0.1,
+    }
+
+    # The last gain given for a band wins
+    assert parse_band_gains(("1=1", "20=2")) == {0: 0.2}
+
+
+def test_old_band_gain_form():
+    assert parse_band_gains(("63", "3")) == {HZ_BANDS.index(63): 0.3}
+
+
+@pytest.mark.parametrize("args", [("63",), ("63", "3", "1"), ("63=3", "1000")])
+def test_malformed_pairs(args):
+    with pytest.raises(InvalidEQBandGain):
+        parse_band_gains(args)
+
+
+def test_preset_levels_cover_every_band():
+    assert set(PRESET_LEVELS) == set(EQ_PRESETS)
+    for levels in PRESET_LEVELS.values():
+        assert len(levels) == len(HZ_BANDS)
+
+    assert PRESET_LEVELS["flat"] == [0.0] * len(HZ_BANDS)
+    assert any(PRESET_LEVELS["boost"])
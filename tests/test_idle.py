@@ -0,0 +1,127 @@
+import asyncio
+
+from bot.cogs.music.utils.idle import IdleReaper
+
+TIMEOUT = 0.05
+
+
+def run_with_reaper(test, timeout: float = TIMEOUT):
+    """Runs the coroutine function with a reaper recording the reaped guilds"""
+
+    async def main():
+        reaped = []
+
+        async def on_idle(guild_id):
+            reaped.append(guild_id)
+
+        reaper = IdleReaper(timeout, on_idle)
+        try:
+            await test(reaper, reaped)
+        finally:
+            reaper.stop()
+
+    asyncio.run(main())
+
+
+def test_idle_guilds_are_reaped_once():
+    async def test(reaper, reaped):
+        reaper.schedule(1)
+        reaper.schedule(2)
+        assert len(reaper) == 2
+
+        await asyncio.sleep(TIMEOUT * 3)
+        assert sorted(reaped) == [1, 2]
+        assert len(reaper) == 0
+
+    run_with_reaper(test)
+
+
+def test_cancelled_guilds_are_left_alone():
+    async def test(reaper, reaped):
+        reaper.schedule(1)
+        reaper.schedule(2)
+        reaper.cancel(1)
+
+        await asyncio.sleep(TIMEOUT * 3)
+        assert reaped == [2]
+
+    run_with_reaper(test)
+
+
+def test_scheduling_again_doesnt_extend_the_timer():
+    async def test(reaper, reaped):
+        reaper.schedule(1)
+        await asyncio.sleep(TIMEOUT / 2)
+        reaper.schedule(1)
+
+        await asyncio.sleep(TIMEOUT * 0.75)
+        assert reaped == [1]
+
+    run_with_reaper(test)
+
+
+def test_rescheduling_after_a_cancel_restarts_the_timer():
+    async def test(reaper, reaped):
+        reaper.schedule(1)
+        await asyncio.sleep(TIMEOUT / 2)
+        reaper.cancel(1)
+        reaper.schedule(1)
+
+        # The cancelled deadline has passed, the new one hasn't
+        await asyncio.sleep(TIMEOUT * 0.75)
+        assert reaped == [] and 1 in reaper
+
+        await asyncio.sleep(TIMEOUT)
+        assert reaped == [1]
+
+    run_with_reaper(test)
+
+
+def test_new_earliest_deadline_wakes_the_reaper():
+    async def test(reaper, reaped):
+        # The reaper sleeps until the deadline of the first guild
+        reaper.timeout = 10
+        reaper.schedule(1)
+        await asyncio.sleep(0)
+
+        reaper.cancel(1)
+        reaper.timeout = TIMEOUT
+        reaper.schedule(2)
+
+        await asyncio.sleep(TIMEOUT * 3)
+        assert reaped == [2]
+
+    run_with_reaper(test)
+
+
+def test_cancelled_timers_dont_pile_up():
+    async def test(reaper, _):
+        reaper.timeout = 10
+        for guild_id in range(1000):
+            reaper.schedule(guild_id)
+            reaper.cancel(guild_id)
+
+        assert len(reaper) == 0
+        assert len(reaper._heap) < 100
+
+    run_with_reaper(test)
+
+
+def test_failures_dont_stop_the_reaper():
+    async def main():
+        reaped = []
+
+        async def on_idle(guild_id):
+            if guild_id == 1:
+                raise RuntimeError("teardown failed")
+            reaped.append(guild_id)
+
+        reaper = IdleReaper(TIMEOUT, on_idle)
+        reaper.schedule(1)
+        reaper.schedule(2)
+        await asyncio.sleep(TIMEOUT * 3)
+        reaper.stop()
+
+        assert reaped == [2]
+
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+import math
+
+import pytest
+
+from bot.core.metrics import (
+    PHASE_LATENCY,
+    Counter,
+    Gauge,
+    Histogram,
+    HistogramValue,
+    Metric,
+    MetricsRegistry,
+    current_command,
+    time_phase,
+)
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_total", "Test", ("command",))
+    counter.inc(command='say "hi"\\\nbye')
+
+    assert counter.render()[-1] == r'test_total{command="say \"hi\"\\\nbye"} 1'
+
+
+def test_counters_and_gauges():
+    counter = Counter("test_total", "Test", ("command",))
+    counter.inc(command="play")
+    counter.inc(2, command="play")
+    gauge = Gauge("test_players", "Test")
+    gauge.set(3)
+    gauge.set(4)
+
+    assert counter.get(command="play") == 3
+    assert counter.get(command="skip") == 0
+    assert gauge.render() == [
+        "# HELP test_players Test",
+        "# TYPE test_players gauge",
+        "test_players 4",
+    ]
+
+
+def test_metrics_must_have_samples():
+    with pytest.raises(TypeError):
+        Metric("test", "Test")
+
+
+def test_quantiles_are_bucket_upper_bounds():
+    histogram = HistogramValue((0.1, 0.5, 1.0))
+    for value in (0.05, 0.05, 0.2, 0.3, 0.7):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 2, 1]
+    assert histogram.quantile(0.4) == 0.1
+    assert histogram.quantile(0.5) == 0.5
+    assert histogram.quantile(0.99) == 1.0
+
+    histogram.observe(5)
+    assert histogram.count == 6
+    assert histogram.quantile(1) == math.inf
+
+
+def test_histograms_are_merged_by_label():
+    histogram = Histogram("test_seconds", "Test", ("command", "status"), (1, 2))
+    histogram.observe(0.5, command="play", status="ok")
+    histogram.observe(1.5, command="play", status="error")
+    histogram.observe(1.5, command="skip", status="ok")
+
+    merged = histogram.by("command")
+    assert merged["play"].counts == [1, 1]
+    assert merged["play"].sum == 2
+    assert merged["skip"].count == 1
+
+    # The merged histograms are copies
+    assert histogram.get(command="play", status="ok").count == 1
+
+
+def test_histograms_render_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test", ("command",), (1, 2))
+    histogram.observe(0.5, command="play")
+    histogram.observe(1.5, command="play")
+    histogram.observe(3, command="play")
+
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{command="play",le="1"} 1',
+        'test_seconds_bucket{command="play",le="2"} 2',
+        'test_seconds_bucket{command="play",le="+Inf"} 3',
+        'test_seconds_sum{command="play"} 5.0',
+        'test_seconds_count{command="play"} 3',
+    ]
+
+
+def test_registry_renders_every_metric():
+    registry = MetricsRegistry()
+    registry.register(Counter("a_total", "A")).inc()
+    registry.register(Gauge("b", "B")).set(1)
+
+    text = registry.render()
+    assert text.endswith("\n")
+    assert "a_total 1" in text and "b 1" in text
+
+
+def test_phases_are_labelled_with_the_current_command():
+    token = current_command.set("test_phase_command")
+    try:
+        with time_phase("test"):
+            pass
+    finally:
+        current_command.reset(token)
+
+    assert PHASE_LATENCY.get(phase="test", command="test_phase_command").count == 1
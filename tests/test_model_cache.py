@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from bot.core.model_cache import ModelCache
+from bot.core.models import GuildModel
+
+
+class Loader:
+    """Loads made up models, counting the lookups and holding them until released"""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, primary_key):
+        self.calls += 1
+        await self.release.wait()
+        if primary_key in self.missing:
+            return None
+        return SimpleNamespace(pk=primary_key)
+
+
+def test_concurrent_misses_share_one_lookup():
+    async def main():
+        loader = Loader()
+        cache = ModelCache(GuildModel, loader=loader)
+
+        lookups = [asyncio.ensure_future(cache.get(1)) for _ in range(5)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        models = await asyncio.gather(*lookups)
+
+        assert loader.calls == 1
+        assert all(model is models[0] for model in models)
+        assert cache.stats["miss"] == 1
+        assert cache.stats["coalesced"] == 4
+
+        assert await cache.get(1) is models[0]
+        assert cache.stats["hit"] == 1
+
+    asyncio.run(main())
+
+
+def test_failed_lookup_fails_every_waiter():
+    async def main():
+        async def loader(_):
+            await asyncio.sleep(0)
+            raise RuntimeError("database is down")
+
+        cache = ModelCache(GuildModel, loader=loader)
+        results = await asyncio.gather(
+            cache.get(1), cache.get(1), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert 1 not in cache
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_doesnt_cancel_the_lookup():
+    async def main():
+        loader = Loader()
+        cache = ModelCache(GuildModel, loader=loader)
+
+        first = asyncio.ensure_future(cache.get(1))
+        waiter = asyncio.ensure_future(cache.get(1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        loader.release.set()
+
+        assert (await first).pk == 1
+        assert 1 in cache
+
+    asyncio.run(main())
+
+
+def test_negative_cache():
+    async def main():
+        loader = Loader(missing={1})
+        loader.release.set()
+        cache = ModelCache(GuildModel, loader=loader, negative_ttl=60)
+
+        assert await cache.get(1) is None
+        assert await cache.get(1) is None
+        assert loader.calls == 1
+        assert cache.stats["negative_hit"] == 1
+
+        # Storing the model replaces the negative entry
+        cache.set(SimpleNamespace(pk=1))
+        assert (await cache.get(1)).pk == 1
+
+    asyncio.run(main())
+
+
+def test_misses_without_negative_cache_are_retried():
+    async def main():
+        loader = Loader(missing={1})
+        loader.release.set()
+        cache = ModelCache(GuildModel, loader=loader)
+
+        assert await cache.get(1) is None
+        assert await cache.get(1) is None
+        assert loader.calls == 2
+
+    asyncio.run(main())
+
+
+def test_invalidate_and_clear():
+    cache = ModelCache(GuildModel, negative_ttl=60)
+    cache.set(SimpleNamespace(pk=1))
+    cache.set(SimpleNamespace(pk=2))
+
+    cache.invalidate(1)
+    assert 1 not in cache and 2 in cache
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_evictions_are_counted():
+    cache = ModelCache(GuildModel, maxsize=2, ttl=None)
+    for primary_key in range(3):
+        cache.set(SimpleNamespace(pk=primary_key))
+
+    assert len(cache) == 2
+    assert 0 not in cache
+    assert cache.stats["eviction"] == 1
+
+
+def test_lfu_policy_rejects_a_ttl():
+    with pytest.raises(ValueError):
+        ModelCache(GuildModel, ttl=60, policy="lfu")
+
+    assert ModelCache(GuildModel, ttl=None, policy="lfu").maxsize == 1000
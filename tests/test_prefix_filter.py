@@ -0,0 +1,100 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from bot.core import Bot
+from bot.core.helpers import BotConfig, ModelCacheConfig
+
+
+def run_with_bot(test, **config):
+    """Runs the coroutine function with a bot which can't connect to anything"""
+
+    async def main():
+        bot = Bot(
+            BotConfig(
+                prefix="!",
+                token="test",
+                log_webhook_url="https://discord.com/api/webhooks/0/test",
+                dev_env=False,
+                load_jishaku=False,
+                **config,
+            )
+        )
+        try:
+            await test(bot)
+        finally:
+            await bot.wavelink_client.session.close()
+
+    asyncio.run(main())
+
+
+def message(content: str, guild_id=1):
+    guild = None if guild_id is None else SimpleNamespace(id=guild_id)
+    return SimpleNamespace(content=content, guild=guild)
+
+
+def guild_model(guild_id: int, prefix: str):
+    return SimpleNamespace(id=guild_id, pk=guild_id, prefix=prefix)
+
+
+def test_messages_of_indexed_guilds_are_filtered():
+    async def test(bot):
+        bot._cache_guild_model(guild_model(1, "?"))
+
+        assert not bot._is_command_candidate(message("hello"))
+        assert not bot._is_command_candidate(message("!play"))
+        assert bot._is_command_candidate(message("?play"))
+        assert bot._is_command_candidate(message("<@1> play"))
+        assert bot._is_command_candidate(message("  <@!1> play"))
+
+    run_with_bot(test)
+
+
+def test_unknown_guilds_and_dms_are_candidates():
+    async def test(bot):
+        assert bot._is_command_candidate(message("hello", guild_id=2))
+        assert bot._is_command_candidate(message("hello", guild_id=None))
+
+    run_with_bot(test)
+
+
+def test_prefix_changes_reach_the_index():
+    async def test(bot):
+        bot._cache_guild_model(guild_model(1, "?"))
+
+        # Changed by another process
+        await bot._on_model_invalidated("GuildModel", 1)
+        assert bot._is_command_candidate(message("hello"))
+
+        bot._cache_guild_model(guild_model(1, "?"))
+        bot.clear_model_cache("GuildModel")
+        assert bot._is_command_candidate(message("hello"))
+
+        await bot.update_local_guild(guild_model(1, "$"))
+        assert bot._is_command_candidate(message("$play"))
+        assert not bot._is_command_candidate(message("?play"))
+
+    run_with_bot(test)
+
+
+def test_index_expires_with_the_guild_models():
+    async def test(bot):
+        bot._cache_guild_model(guild_model(1, "?"))
+        assert not bot._is_command_candidate(message("hello"))
+
+        time.sleep(0.06)
+        assert 1 not in bot.guild_cache
+        assert bot._is_command_candidate(message("hello"))
+
+    run_with_bot(test, guild_cache=ModelCacheConfig(ttl=0.05))
+
+
+def test_index_is_bounded_like_the_guild_models():
+    async def test(bot):
+        for guild_id in range(3):
+            bot._cache_guild_model(guild_model(guild_id, "?"))
+
+        assert bot._is_command_candidate(message("hello", guild_id=0))
+        assert not bot._is_command_candidate(message("hello", guild_id=2))
+
+    run_with_bot(test, guild_cache=ModelCacheConfig(maxsize=2, ttl=None))
@@ -0,0 +1,105 @@
+import pytest
+
+from bot.cogs.music.utils.errors import QueueIsEmpty
+from bot.cogs.music.utils.queue import Queue, QueueView
+from bot.cogs.music.utils.types import RepeatMode
+
+
+def make_queue(count: int = 5, position: int = 0) -> Queue:
+    queue = Queue()
+    queue.add(*(f"track {i}" for i in range(count)))
+    queue.position = position
+    return queue
+
+
+def test_view_indexing():
+    items = list(range(10))
+    view = QueueView(items, 3, 7)
+
+    assert len(view) == 4
+    assert list(view) == [3, 4, 5, 6]
+    assert view[0] == 3 and view[-1] == 6
+    assert view[1:3] == [4, 5]
+    assert view[::2] == [3, 5]
+    with pytest.raises(IndexError):
+        view[4]
+    with pytest.raises(IndexError):
+        view[-5]
+
+
+def test_view_bounds_are_clamped():
+    items = list(range(3))
+
+    assert list(QueueView(items, -2, 2)) == [0, 1]
+    assert list(QueueView(items, 1, 10)) == [1, 2]
+    assert not QueueView(items, 5, 10)
+    assert len(QueueView(items, 2, 1)) == 0
+
+
+def test_view_follows_the_queue_without_copying():
+    items = [0, 1, 2]
+    view = QueueView(items, 0, 3)
+    items[1] = "changed"
+
+    assert view[1] == "changed"
+
+
+def test_upcoming_and_history():
+    queue = make_queue(position=2)
+
+    assert list(queue.history) == ["track 0", "track 1"]
+    assert queue.current_track == "track 2"
+    assert list(queue.upcoming) == ["track 3", "track 4"]
+    assert queue.upcoming[:1] == ["track 3"]
+    assert len(queue.tracks) == 5
+
+
+def test_empty_queue():
+    queue = Queue()
+
+    assert queue.is_empty
+    assert not queue.tracks
+    assert queue.peek_next() is None
+    for attribute in ("current_track", "upcoming", "history"):
+        with pytest.raises(QueueIsEmpty):
+            getattr(queue, attribute)
+    with pytest.raises(QueueIsEmpty):
+        queue.get_next_track()
+
+
+def test_peek_next_matches_get_next_track():
+    for repeat_mode in RepeatMode:
+        queue = make_queue(count=3)
+        queue.repeat_mode = repeat_mode
+        for _ in range(4):
+            expected = queue.peek_next()
+            assert queue.get_next_track() == expected
+
+
+def test_repeat_all_wraps_around():
+    queue = make_queue(count=2, position=1)
+    queue.set_repeat_mode("all")
+
+    assert queue.get_next_track() == "track 0"
+    assert queue.position == 0
+
+
+def test_shuffle_keeps_the_history_and_current_track():
+    queue = make_queue(count=50, position=10)
+    queue.shuffle()
+
+    assert list(queue.history) == [f"track {i}" for i in range(10)]
+    assert queue.current_track == "track 10"
+    assert sorted(queue.upcoming) == sorted(f"track {i}" for i in range(11, 50))
+
+
+def test_changes_are_reported():
+    changes = []
+    queue = Queue(on_change=lambda: changes.append(queue.length))
+
+    queue.add("track 0", "track 1")
+    queue.get_next_track()
+    queue.set_repeat_mode("1")
+    queue.empty()
+
+    assert changes == [2, 2, 2, 0]
@@ -0,0 +1,146 @@
+import gc
+from types import SimpleNamespace
+
+import pytest
+
+from bot.core.rate_limit import RateLimit, RateLimited, RateLimiter
+
+
+class Clock:
+    """A clock which only moves when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def context(guild_id=1, author_id=10):
+    guild = None if guild_id is None else SimpleNamespace(id=guild_id)
+    return SimpleNamespace(
+        guild=guild,
+        author=SimpleNamespace(id=author_id),
+        command=SimpleNamespace(qualified_name="play"),
+    )
+
+
+def make_limiter():
+    clock = Clock()
+    return RateLimiter(clock), clock
+
+
+def test_bursts_then_refills():
+    limiter, clock = make_limiter()
+    limit = RateLimit(2, 10)
+
+    limiter.acquire(context(), [limit])
+    limiter.acquire(context(), [limit])
+    with pytest.raises(RateLimited) as error:
+        limiter.acquire(context(), [limit])
+    assert error.value.retry_after == pytest.approx(5)
+
+    clock.now = 5
+    limiter.acquire(context(), [limit])
+    with pytest.raises(RateLimited):
+        limiter.acquire(context(), [limit])
+
+
+def test_burst_is_separate_from_the_rate():
+    limiter, clock = make_limiter()
+    limit = RateLimit(1, 10, burst=3)
+
+    for _ in range(3):
+        limiter.acquire(context(), [limit])
+    with pytest.raises(RateLimited):
+        limiter.acquire(context(), [limit])
+
+    # Idle buckets don't fill past the burst
+    clock.now = 1000
+    for _ in range(3):
+        limiter.acquire(context(), [limit])
+    with pytest.raises(RateLimited):
+        limiter.acquire(context(), [limit])
+
+
+def test_tokens_are_taken_from_every_limit_or_none():
+    limiter, _ = make_limiter()
+    loose = RateLimit(5, 10)
+    strict = RateLimit(1, 10)
+
+    limiter.acquire(context(), [loose, strict])
+    for _ in range(3):
+        with pytest.raises(RateLimited) as error:
+            limiter.acquire(context(), [loose, strict])
+        assert error.value.limit is strict
+
+    # The refused invocations left the tokens of the loose limit alone
+    for _ in range(4):
+        limiter.acquire(context(), [loose])
+    with pytest.raises(RateLimited):
+        limiter.acquire(context(), [loose])
+
+
+def test_scopes():
+    limiter, _ = make_limiter()
+    per_guild = RateLimit(1, 10)
+    per_user = RateLimit(1, 10, scope="user")
+    everywhere = RateLimit(1, 10, scope="global")
+
+    limiter.acquire(context(guild_id=1), [per_guild])
+    limiter.acquire(context(guild_id=2), [per_guild])
+    with pytest.raises(RateLimited):
+        limiter.acquire(context(guild_id=1, author_id=11), [per_guild])
+
+    limiter.acquire(context(author_id=10), [per_user])
+    limiter.acquire(context(author_id=11), [per_user])
+    with pytest.raises(RateLimited):
+        limiter.acquire(context(guild_id=2, author_id=10), [per_user])
+
+    limiter.acquire(context(guild_id=1), [everywhere])
+    with pytest.raises(RateLimited):
+        limiter.acquire(context(guild_id=2), [everywhere])
+
+
+def test_dms_are_limited_per_user():
+    limit = RateLimit(1, 10)
+
+    assert limit.key(context(guild_id=None, author_id=10)) == 10
+    assert limit.key(context(guild_id=5, author_id=10)) == 5
+
+
+def test_full_buckets_are_evicted():
+    limiter, clock = make_limiter()
+    limit = RateLimit(1, 10)
+
+    for guild_id in range(100):
+        limiter.acquire(context(guild_id=guild_id), [limit])
+    assert len(limiter) == 100
+
+    clock.now = 5
+    limiter.acquire(context(guild_id=100), [limit])
+    assert len(limiter) == 101
+
+    # Every bucket but the last one has filled up again
+    clock.now = 10
+    limiter.acquire(context(guild_id=0), [limit])
+    assert len(limiter) == 2
+
+
+def test_buckets_go_with_their_limit():
+    limiter, _ = make_limiter()
+    limit = RateLimit(1, 10)
+    limiter.acquire(context(), [limit])
+    assert len(limiter) == 1
+
+    del limit
+    gc.collect()
+    assert len(limiter) == 0
+
+
+def test_description():
+    assert str(RateLimit(3, 10)) == "3 per 10s per guild"
+    assert str(RateLimit(1, 2.5, "user", burst=3)) == (
+        "1 per 2.5s (bursts of 3) per user"
+    )
+    assert str(RateLimit(5, 60, "global")) == "5 per 60s globally"
@@ -0,0 +1,41 @@
+from discord import Embed
+
+from bot.utils.webhook import MAX_EMBED_CHARACTERS, MAX_EMBEDS, batch_embeds
+
+
+def embed(characters: int, title: str = "") -> Embed:
+    """Makes an embed counting `characters` towards the limit"""
+    return Embed(title=title, description="x" * (characters - len(title)))
+
+
+def test_no_embeds():
+    assert batch_embeds([]) == []
+
+
+def test_batches_hold_at_most_ten_embeds():
+    embeds = [embed(10, title=str(i)) for i in range(25)]
+    batches = batch_embeds(embeds)
+
+    assert [len(batch) for batch in batches] == [MAX_EMBEDS, MAX_EMBEDS, 5]
+    assert [e for batch in batches for e in batch] == embeds
+
+
+def test_batches_stay_under_the_character_limit():
+    embeds = [embed(2500) for _ in range(5)]
+    batches = batch_embeds(embeds)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    for batch in batches:
+        assert sum(len(e) for e in batch) <= MAX_EMBED_CHARACTERS
+
+
+def test_batches_can_be_filled_exactly():
+    batches = batch_embeds([embed(3000), embed(3000), embed(1)])
+
+    assert [len(batch) for batch in batches] == [2, 1]
+
+
+def test_oversized_embeds_are_sent_alone():
+    batches = batch_embeds([embed(10), embed(MAX_EMBED_CHARACTERS + 1), embed(10)])
+
+    assert [len(batch) for batch in batches] == [1, 1, 1]